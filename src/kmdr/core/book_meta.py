@@ -0,0 +1,96 @@
+import json
+import time
+from typing import Optional
+
+from .cache import cache_path, read_json, write_json
+from .console import debug
+from .encoder import KmdrJSONEncoder
+from .structure import BookInfo, VolInfo
+
+CACHE_FILENAME = "books.json"
+
+BOOK_META_TTL = 6 * 60 * 60
+"""书籍信息与卷列表的默认缓存时长（秒）"""
+
+UNVERIFIED_TTL = 10 * 60
+"""无法对比最后更新时间（例如直接通过书籍链接下载）时的最长缓存时长（秒）"""
+
+RETENTION = 30 * 24 * 60 * 60
+"""超过该时长（秒）没有更新的书籍会从缓存文件中移除"""
+
+
+class BookMetaCache:
+    """
+    按书籍 ID 缓存解析后的书籍信息与卷列表，跳过书籍主页与卷列表的请求和解析。
+
+    缓存超过有效期，或者书籍列表（搜索、关注）中的最后更新时间与缓存时不同，都视为过期。
+    缺少最后更新时间时无法发现新发布的卷，有效期不超过 `UNVERIFIED_TTL`。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._books: dict[str, dict] = (read_json(path) if path else None) or {}
+        """书籍 ID -> {"book": 书籍信息, "volumes": 卷列表, "saved_at": 保存时间}"""
+
+    def __repr__(self) -> str:
+        return f"BookMetaCache(books={len(self._books)})"
+
+    def get(self, book_id: str, last_update: Optional[str] = None, ttl: float = BOOK_META_TTL) -> Optional[tuple[BookInfo, list[VolInfo]]]:
+        """
+        缓存的书籍信息与卷列表，过期时返回 None
+
+        :param book_id: 书籍 ID
+        :param last_update: 书籍列表中的最后更新时间，为空时只按缓存时长判断
+        :param ttl: 缓存时长（秒）
+        """
+        entry = self._books.get(book_id)
+        if entry is None or time.time() - entry.get("saved_at", 0) >= ttl:
+            return None
+
+        try:
+            book = BookInfo.from_dict(entry["book"])
+            volumes = [VolInfo.from_dict(vol) for vol in entry["volumes"]]
+        except (KeyError, TypeError, ValueError) as e:
+            debug("无法读取缓存的书籍信息:", e)
+            return None
+
+        if not (last_update and book.last_update):
+            if time.time() - entry.get("saved_at", 0) >= UNVERIFIED_TTL:
+                debug("无法确认书籍是否更新，缓存已过期:", book_id)
+                return None
+        elif last_update != book.last_update:
+            debug("书籍已更新，不使用缓存:", book_id, book.last_update, "->", last_update)
+            return None
+        return book, volumes
+
+    def save(self, book_id: str, book: BookInfo, volumes: list[VolInfo]) -> None:
+        entry = {"book": book, "volumes": volumes, "saved_at": time.time()}
+        self._books[book_id] = json.loads(json.dumps(entry, cls=KmdrJSONEncoder))
+        self._dump()
+
+    def _dump(self) -> None:
+        if not self._path:
+            return
+
+        now = time.time()
+        self._books = {book_id: entry for book_id, entry in self._books.items() if now - entry.get("saved_at", 0) < RETENTION}
+        try:
+            write_json(self._path, self._books)
+        except OSError as e:
+            debug("无法保存书籍信息缓存:", e)
+
+
+_CACHE: Optional[BookMetaCache] = None
+
+
+def get_book_meta_cache() -> BookMetaCache:
+    """惰性加载全局的书籍信息缓存。"""
+    global _CACHE
+
+    if _CACHE is None:
+        try:
+            _CACHE = BookMetaCache(cache_path(CACHE_FILENAME))
+        except OSError as e:
+            debug("无法访问缓存目录，不会缓存书籍信息:", e)
+            _CACHE = BookMetaCache()
+    return _CACHE
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Optional
+
+from aiohttp import ClientConnectorError, ClientSession, TraceConfig, TraceRequestExceptionParams, TraceRequestRedirectParams
+
+from .cache import cache_path, read_json, write_json
+from .console import debug
+from .constants import API_ROUTE
+from .encoder import KmdrJSONEncoder
+from .error import BootstrapExpiredError
+from .structure import Credential
+
+CACHE_FILENAME = "bootstrap.json"
+
+BOOTSTRAP_TTL = 10 * 60
+"""启动信息的缓存时长（秒），额度快照只用于下载前的提示，过期后重新获取"""
+
+
+class BootstrapCache:
+    """
+    缓存启动阶段的结果：可用的镜像地址，以及凭证（含额度快照与会话 Cookie）。
+
+    缓存有效期内的下载直接使用缓存，跳过镜像探测与登录状态检查。
+    使用缓存期间（直到 `confirm`）遇到重定向或无法连接镜像时，说明缓存已经失效，
+    此时清除缓存并抛出 BootstrapExpiredError，由调用方重新执行完整的启动流程。
+
+    书籍信息也可能来自本地缓存，启动过程不一定会请求服务器，因此使用了缓存的凭证时，
+    需要在 `confirm` 之前调用 `verify` 请求一次服务器。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        data = (read_json(path) if path else None) or {}
+        self._base_url: Optional[dict] = data.get("base_url")
+        """{"value": 镜像地址, "saved_at": 保存时间}"""
+        self._credential: Optional[dict] = data.get("credential")
+        """{"value": 凭证, "cookie_digests": 对应的 Cookie 摘要, "saved_at": 保存时间}"""
+
+        self.active = False
+        """本次运行是否使用了缓存且尚未确认有效"""
+        self._credential_used = False
+        """本次运行是否使用了缓存的凭证"""
+        self._lock = asyncio.Lock()
+
+    def __repr__(self) -> str:
+        return f"BootstrapCache(base_url={self._base_url and self._base_url['value']}, active={self.active})"
+
+    def base_url(self) -> Optional[str]:
+        """缓存的镜像地址，过期时返回 None"""
+        if not _fresh(self._base_url):
+            return None
+        self.active = True
+        return self._base_url["value"]
+
+    def credential(self, cookie: dict[str, str]) -> Optional[Credential]:
+        """
+        缓存的凭证，过期或者配置中的 Cookie 已经变化（例如重新登录）时返回 None
+
+        :param cookie: 配置文件中的 Cookie
+        """
+        if not _fresh(self._credential) or _digest(cookie) not in self._credential.get("cookie_digests", []):
+            return None
+        try:
+            cred = Credential.from_dict(self._credential["value"])
+        except (KeyError, TypeError, ValueError) as e:
+            debug("无法读取缓存的凭证:", e)
+            return None
+        self.active = True
+        self._credential_used = True
+        return cred
+
+    async def save_base_url(self, base_url: str) -> None:
+        self._base_url = {"value": base_url, "saved_at": time.time()}
+        await self._dump()
+
+    async def save_credential(self, cookie: dict[str, str], cred: Credential) -> None:
+        """
+        :param cookie: 配置文件中的 Cookie，用于判断之后的运行是否仍是同一个登录状态
+        :param cred: 检查登录状态得到的凭证
+        """
+        value = json.loads(json.dumps(cred, cls=KmdrJSONEncoder))
+        # 凭证中的 Cookie 可能被服务器更新，并在之后保存到配置文件中，两者都视为同一个登录状态
+        digests = sorted({_digest(cookie), _digest(cred.cookies)})
+        self._credential = {"value": value, "cookie_digests": digests, "saved_at": time.time()}
+        await self._dump()
+
+    async def verify(self, session: ClientSession, cookies: dict[str, str]) -> None:
+        """
+        使用了缓存的凭证时，请求一次个人信息页面，确认镜像可用且凭证仍然有效
+
+        列出书籍的请求不携带凭证，也可能全部来自本地缓存，不能用来确认缓存的凭证。
+        凭证失效时服务器会重定向到登录页面，由 trace 抛出 BootstrapExpiredError。
+
+        :param session: 带有 `trace_config` 的会话
+        :param cookies: 缓存的凭证中的 Cookie
+        """
+        if not (self.active and self._credential_used):
+            # 没有使用缓存的凭证时，检查登录状态的请求已经在使用缓存期间完成
+            return
+
+        async with session.get(API_ROUTE.PROFILE, cookies=cookies) as response:
+            response.raise_for_status()
+
+    def confirm(self) -> None:
+        """启动流程完成，之后的重定向不再视为缓存失效"""
+        self.active = False
+        self._credential_used = False
+
+    async def invalidate(self) -> None:
+        """清除缓存，之后的运行执行完整的启动流程"""
+        await self._clear()
+        self.active = False
+        self._credential_used = False
+
+    def trace_config(self) -> TraceConfig:
+        """创建用于 ClientSession(trace_configs=...) 的 TraceConfig"""
+        trace_config = TraceConfig()
+        trace_config.on_request_redirect.append(self._on_request_redirect)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        return trace_config
+
+    async def _on_request_redirect(self, session, ctx, params: TraceRequestRedirectParams):
+        if self.active:
+            await self._clear()
+            raise BootstrapExpiredError("使用缓存的启动信息时遇到重定向", url=str(params.url))
+
+    async def _on_request_exception(self, session, ctx, params: TraceRequestExceptionParams):
+        if self.active and isinstance(params.exception, ClientConnectorError):
+            await self._clear()
+            raise BootstrapExpiredError("无法连接到缓存的镜像", url=str(params.url)) from params.exception
+
+    async def _clear(self) -> None:
+        # 保持 active，使用缓存期间的其他请求同样会失败，直到调用方调用 `invalidate` 并重新启动
+        self._base_url = None
+        self._credential = None
+        await self._dump()
+
+    async def _dump(self) -> None:
+        if not self._path:
+            return
+
+        data = {"base_url": self._base_url, "credential": self._credential}
+        # 所有保存共用同一个临时文件
+        async with self._lock:
+            try:
+                # 缓存中包含会话 Cookie，只允许当前用户读写
+                await asyncio.to_thread(write_json, self._path, data, mode=0o600)
+            except OSError as e:
+                debug("无法保存启动信息缓存:", e)
+
+
+def _fresh(entry: Optional[dict]) -> bool:
+    return bool(entry) and time.time() - entry.get("saved_at", 0) < BOOTSTRAP_TTL
+
+
+def _digest(cookie: dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(cookie, sort_keys=True).encode()).hexdigest()
+
+
+_CACHE: Optional[BootstrapCache] = None
+
+
+def get_bootstrap_cache() -> BootstrapCache:
+    """惰性加载全局的启动信息缓存。"""
+    global _CACHE
+
+    if _CACHE is None:
+        try:
+            _CACHE = BootstrapCache(cache_path(CACHE_FILENAME))
+        except OSError as e:
+            debug("无法访问缓存目录，不会缓存启动信息:", e)
+            _CACHE = BootstrapCache()
+    return _CACHE
@@ -0,0 +1,53 @@
+"""
+KMDR 的本地缓存目录。
+
+用于保存运行过程中积累的统计数据，与 `~/.kmdr` 中的用户配置分开存放，清除后不影响正常使用。
+"""
+
+import json
+import os
+from typing import Any, Optional
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".kmdr_cache")
+"""缓存目录"""
+
+
+def cache_path(name: str) -> str:
+    """返回缓存目录下指定文件的路径，必要时创建缓存目录"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, name)
+
+
+def read_json(path: str) -> Optional[Any]:
+    """
+    读取 JSON 文件，文件不存在或已损坏时返回 None。
+
+    :note: 同步 IO，在协程中调用时应放入线程池。
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path: str, data: Any, mode: Optional[int] = None) -> None:
+    """
+    先写入临时文件再替换，避免中途退出留下不完整的 JSON。
+
+    :note: 同步 IO，在协程中调用时应放入线程池。
+    :param path: 文件路径
+    :param data: 要保存的数据
+    :param mode: 文件权限，为空时使用默认权限
+    """
+    tmp_path = f"{path}.tmp"
+    opener = None if mode is None else lambda file, flags: os.open(file, flags, mode)
+    with open(tmp_path, "w", encoding="utf-8", opener=opener) as f:
+        if mode is not None:
+            # 临时文件可能已经存在，写入内容之前重新设置权限
+            os.chmod(tmp_path, mode)
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,232 @@
+"""
+按主机划分的熔断器。
+
+某个镜像或 CDN 节点持续出错时，后续的请求暂停发送，等待冷却结束或者换到其他节点，
+不再逐个耗尽重试次数；冷却时间过后放行一个探测请求，成功则恢复，失败则继续熔断。
+"""
+
+import asyncio
+import time
+from enum import Enum
+from typing import Optional
+
+import aiohttp
+
+from .console import debug, info
+from .error import CircuitOpenError
+from .retry import _host_of
+
+FAILURE_THRESHOLD = 5
+"""连续失败达到该次数后熔断，同时进行的请求（例如同一个文件的多个分片）一起失败只计一次"""
+
+COOLDOWN = 30.0
+"""熔断后等待多久放行探测请求（秒）"""
+
+MAX_COOLDOWN = 300.0
+"""探测连续失败时冷却时间翻倍，最多延长到该值（秒）"""
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器。
+
+    - CLOSED：正常放行，记录连续失败次数。
+    - OPEN：直接拒绝请求，直到冷却时间结束。
+    - HALF_OPEN：只放行一个探测请求，其结果决定恢复还是重新熔断。
+
+    在上一次计入的失败之前就已经发出的请求，失败时不再计数：它们与上一次失败同时进行，
+    例如同一个文件的多个分片连接同时遇到一次短暂的 502，只能说明主机出错了一次。
+    """
+
+    def __init__(self, host: str, threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self._host = host
+        self._threshold = threshold
+        self._base_cooldown = cooldown
+        self._cooldown = cooldown
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._failed_at = float("-inf")
+        """上一次计入的失败的时间"""
+        self._opened_at = 0.0
+        self._probing_since: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"CircuitBreaker(host={self._host!r}, state={self._state.value}, failures={self._failures})"
+
+    @property
+    def host(self) -> str:
+        return self._host
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and self.retry_in <= 0:
+            return CircuitState.HALF_OPEN
+        return self._state
+
+    @property
+    def retry_in(self) -> float:
+        """距离放行探测请求还有多久（秒），半开状态下为正在进行的探测请求超时之前的时长"""
+        if self._state is CircuitState.OPEN:
+            return max(0.0, self._opened_at + self._cooldown - time.monotonic())
+        if self._state is CircuitState.HALF_OPEN and self._probing_since is not None:
+            return max(0.0, self._probing_since + self._cooldown - time.monotonic())
+        return 0.0
+
+    def allow(self) -> bool:
+        """
+        判断是否放行一个请求
+
+        半开状态下只有第一个调用方会得到 True，并作为探测请求；
+        探测请求长时间没有结果（如被取消）时，允许再放行一个。
+        """
+        now = time.monotonic()
+
+        if self._state is CircuitState.OPEN:
+            if now < self._opened_at + self._cooldown:
+                return False
+            self._state = CircuitState.HALF_OPEN
+            self._probing_since = None
+            debug("熔断冷却结束，放行探测请求:", self._host)
+
+        if self._state is CircuitState.HALF_OPEN:
+            if self._probing_since is not None and now - self._probing_since < self._cooldown:
+                return False
+            self._probing_since = now
+
+        return True
+
+    def record_success(self) -> None:
+        if self._state is not CircuitState.CLOSED:
+            info(f"[green]{self._host} 已恢复[/green]")
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._cooldown = self._base_cooldown
+        self._probing_since = None
+
+    def record_failure(self, started_at: Optional[float] = None) -> None:
+        """
+        :param started_at: 失败的请求发出的时间（time.monotonic），为空时总是计数
+        """
+        if started_at is not None and started_at < self._failed_at:
+            debug("请求与上一次失败同时进行，不重复计数:", self._host)
+            return
+        self._failed_at = time.monotonic()
+        self._failures += 1
+
+        if self._state is CircuitState.HALF_OPEN:
+            # 探测失败，延长冷却时间后继续熔断
+            self._cooldown = min(MAX_COOLDOWN, self._cooldown * 2)
+            self._open()
+        elif self._state is CircuitState.CLOSED and self._failures >= self._threshold:
+            self._open()
+
+    def _open(self):
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._probing_since = None
+        info(f"[yellow]{self._host} 连续 {self._failures} 次请求失败，暂停向其发送请求 {self._cooldown:.0f} 秒[/yellow]")
+
+
+class CircuitBreakerRegistry:
+    """按主机管理熔断器，无法得到主机的 URL 总是放行。"""
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def __repr__(self) -> str:
+        return f"CircuitBreakerRegistry({list(self._breakers.values())})"
+
+    def get(self, url: object) -> Optional[CircuitBreaker]:
+        """
+        获取 URL 所在主机的熔断器
+
+        :param url: 请求的 URL，尚未解析的 Supplier 返回 None
+        """
+        host = _host_of(url)
+        if host is None:
+            return None
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(host, self._threshold, self._cooldown)
+        return self._breakers[host]
+
+    def guard(self, url: object) -> None:
+        """
+        在发出请求前调用
+
+        :raises CircuitOpenError: 主机处于熔断状态
+        """
+        breaker = self.get(url)
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError("主机暂时不可用", host=breaker.host, retry_in=breaker.retry_in)
+
+    def is_open(self, url: object) -> bool:
+        """主机是否处于熔断状态（不会占用探测请求）"""
+        breaker = self.get(url)
+        return breaker is not None and breaker.state is not CircuitState.CLOSED
+
+    def retry_in(self, url: object) -> float:
+        """主机熔断时，距离可以再次发送请求还有多久（秒）"""
+        breaker = self.get(url)
+        return breaker.retry_in if breaker is not None else 0.0
+
+    def record_success(self, url: object) -> None:
+        breaker = self.get(url)
+        if breaker is not None:
+            breaker.record_success()
+
+    def record_status(self, url: object, status: int) -> None:
+        """根据响应状态码记录成功或失败"""
+        breaker = self.get(url)
+        if breaker is None:
+            return
+        if _is_host_failure_status(status):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def record_failure(self, url: object, exception: BaseException, started_at: Optional[float] = None) -> None:
+        """
+        记录一次失败，只有主机本身的故障才会计数
+
+        :param exception: 请求失败的异常
+        :param started_at: 请求发出的时间（time.monotonic），与已计入的失败同时进行的请求不重复计数
+        """
+        breaker = self.get(url)
+        if breaker is not None and is_host_failure(exception):
+            breaker.record_failure(started_at)
+
+
+def is_host_failure(exception: BaseException) -> bool:
+    """
+    判断异常是否说明主机出现故障
+
+    连接错误、超时、数据中断以及 5xx/429 响应计入；4xx 通常与请求本身有关（如凭证、配额），不计入。
+    """
+    if isinstance(exception, aiohttp.ClientResponseError):
+        return _is_host_failure_status(exception.status)
+    return isinstance(exception, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def _is_host_failure_status(status: int) -> bool:
+    return status >= 500 or status == 429
+
+
+_REGISTRY: Optional[CircuitBreakerRegistry] = None
+
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """惰性创建全局的熔断器注册表。"""
+    global _REGISTRY
+
+    if _REGISTRY is None:
+        _REGISTRY = CircuitBreakerRegistry()
+    return _REGISTRY
@@ -0,0 +1,164 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from yarl import URL
+
+from .console import debug
+
+PREWARM_TIMEOUT = ClientTimeout(total=5)
+
+
+@dataclass(frozen=True)
+class ConnectorProfile:
+    """
+    连接池的配置
+
+    - limit_per_host: 每个主机的连接数上限，0 表示不限制
+    - ttl_dns_cache: DNS 缓存时长（秒）
+    - keepalive_timeout: 空闲连接的保持时长（秒）
+    - prewarm: 是否提前与镜像和下载节点建立连接
+    """
+
+    limit_per_host: int
+    ttl_dns_cache: int
+    keepalive_timeout: float
+    prewarm: bool
+
+    def connector(self, limit: int) -> TCPConnector:
+        """
+        按配置创建连接器
+
+        :param limit: 连接数上限
+        """
+        return TCPConnector(
+            limit=limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.ttl_dns_cache,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+
+
+CONNECTOR_PROFILES: dict[str, ConnectorProfile] = {
+    # 适合使用代理或网络不稳定的情况，减少同时建立的连接
+    "conservative": ConnectorProfile(limit_per_host=8, ttl_dns_cache=60, keepalive_timeout=15, prewarm=False),
+    "balanced": ConnectorProfile(limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=30, prewarm=True),
+    "aggressive": ConnectorProfile(limit_per_host=64, ttl_dns_cache=600, keepalive_timeout=60, prewarm=True),
+}
+
+DEFAULT_CONNECTOR_PROFILE = "balanced"
+
+
+class ConnectionStats:
+    """统计连接复用与 DNS 缓存命中情况，通过 `trace_config` 接入 ClientSession。"""
+
+    def __init__(self):
+        self.created = 0
+        """新建的连接数，每次新建连接都需要重新握手"""
+        self.reused = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"ConnectionStats(新建连接={self.created}, 复用连接={self.reused}, 复用率={_ratio(self.reused, self.created)}, "
+            f"DNS 缓存命中率={_ratio(self.dns_hits, self.dns_misses)})"
+        )
+
+    def trace_config(self) -> TraceConfig:
+        """创建用于 ClientSession(trace_configs=...) 的 TraceConfig"""
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(self._on_dns_cache_miss)
+        return trace_config
+
+    async def _on_connection_create_end(self, session, ctx, params):
+        self.created += 1
+
+    async def _on_connection_reuseconn(self, session, ctx, params):
+        self.reused += 1
+
+    async def _on_dns_cache_hit(self, session, ctx, params):
+        self.dns_hits += 1
+
+    async def _on_dns_cache_miss(self, session, ctx, params):
+        self.dns_misses += 1
+
+
+class ConnectionWarmer:
+    """
+    在真正发起请求前，与即将访问的主机建立连接。
+
+    每个会话中的每个主机只预热一次，预热在后台进行，失败时忽略。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._warmed: set[tuple[int, str]] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def warm(self, session: ClientSession, url: str) -> None:
+        """
+        在后台与链接所在的主机建立连接，请求结束后连接留在连接池中供后续请求复用
+
+        :param session: 之后发起请求使用的会话
+        :param url: 即将访问的链接
+        """
+        if not self.enabled or session.closed:
+            return
+
+        origin = _origin_of(url)
+        if origin is None or (id(session), origin) in self._warmed:
+            return
+        self._warmed.add((id(session), origin))
+
+        task = asyncio.get_running_loop().create_task(self._warm(session, origin))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _warm(self, session: ClientSession, origin: str) -> None:
+        try:
+            async with session.head(origin, allow_redirects=False, timeout=PREWARM_TIMEOUT):
+                debug("已预热连接:", origin)
+        except Exception as e:
+            debug("预热连接失败:", origin, e)
+
+
+def _origin_of(url: str) -> Optional[str]:
+    try:
+        parsed = URL(url)
+        # 相对链接指向镜像，镜像的连接在创建会话时已经预热
+        return str(parsed.origin()) if parsed.absolute else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _ratio(hits: int, misses: int) -> str:
+    total = hits + misses
+    return f"{hits / total:.0%}" if total else "-"
+
+
+_STATS: Optional[ConnectionStats] = None
+_WARMER: Optional[ConnectionWarmer] = None
+
+
+def get_connection_stats() -> ConnectionStats:
+    """惰性创建全局的连接统计。"""
+    global _STATS
+
+    if _STATS is None:
+        _STATS = ConnectionStats()
+    return _STATS
+
+
+def get_connection_warmer() -> ConnectionWarmer:
+    """惰性创建全局的连接预热器。"""
+    global _WARMER
+
+    if _WARMER is None:
+        _WARMER = ConnectionWarmer()
+    return _WARMER
@@ -13,6 +13,7 @@ from .defaults import (
     base_url_var,
     progress_definition,
     session_var,
+    transfer_session_var,
 )
 
 _lazy_progress: Optional[Progress] = None
@@ -55,6 +56,18 @@ class SessionContext:
     def _session(self, value: ClientSession):
         session_var.set(value)
 
+    @property
+    def _transfer_session(self) -> ClientSession:
+        """用于传输文件的会话，未单独创建时与 `_session` 相同"""
+        try:
+            return transfer_session_var.get()
+        except LookupError:
+            return self._session
+
+    @_transfer_session.setter
+    def _transfer_session(self, value: ClientSession):
+        transfer_session_var.set(value)
+
     @property
     def _base_url(self) -> str:
         return base_url_var.get()
@@ -18,7 +18,7 @@ from .encoder import KmdrJSONEncoder
 from .error import InitializationError
 from .patch import apply_argparse_patch
 from .structure import Config, Credential
-from .utils import singleton
+from .utils import parse_byte_size, singleton
 
 TRUE_UA = "kmdr/1.0 (https://github.com/chrisis58/kmoe-manga-downloader)"
 
@@ -38,6 +38,7 @@ progress_definition = (
 )
 
 session_var = ContextVar("session")
+transfer_session_var = ContextVar("transfer_session")
 
 parser: Optional[argparse.ArgumentParser] = None
 args: Optional[argparse.Namespace] = None
@@ -63,6 +64,12 @@ def argument_parser():
     search_parser.add_argument("keyword", type=str, help="要搜索的关键字")
     search_parser.add_argument("-p", "--page", type=int, help="搜索结果的页码", required=False, default=1)
     search_parser.add_argument("-m", "--minimal", action="store_true", help="只返回书名和链接 (仅在 toolcall 模式下生效)")
+    search_parser.add_argument(
+        "--http-cache-ttl",
+        type=str,
+        help="页面缓存时长 (秒)，格式为 `name=seconds`，多个用逗号分隔，例如 `search=0`",
+        required=False,
+    )
 
     download_parser = subparsers.add_parser("download", help="下载指定的漫画")
     download_parser.add_argument("-d", "--dest", type=str, help="指定下载文件的保存路径，默认为当前目录", required=False)
@@ -73,6 +80,13 @@ def argument_parser():
     download_parser.add_argument("--max-size", type=float, help="限制下载卷的最大体积 (单位: MB)", required=False)
     download_parser.add_argument("--limit", type=int, help="限制下载卷的总数量", required=False)
     download_parser.add_argument("--num-workers", type=int, help="下载时使用的并发任务数", required=False)
+    download_parser.add_argument("--min-workers", type=int, help="自动调整并发数时的下限，默认为 1", required=False)
+    download_parser.add_argument(
+        "--max-workers",
+        type=int,
+        help="自动调整并发数时的上限，默认与 `num_workers` 相同，大于 `num_workers` 时允许自动提高并发数",
+        required=False,
+    )
     download_parser.add_argument("-p", "--proxy", type=str, help="设置下载使用的代理服务器", required=False)
     download_parser.add_argument("-r", "--retry", type=int, help="网络请求失败时的重试次数", required=False)
     download_parser.add_argument("-c", "--callback", type=str, help="每个卷下载完成后执行的回调脚本，例如: `echo {v.name} downloaded!`", required=False)
@@ -81,8 +95,34 @@ def argument_parser():
     download_parser.add_argument("--disable-multi-part", action="store_true", help="禁用分片下载，优先级高于尝试启用分片下载选项")
     download_parser.add_argument("--try-multi-part", action="store_true", help="尝试启用分片下载")
     download_parser.add_argument("--fake-ua", action="store_true", help="使用随机的 User-Agent 进行请求")
+    download_parser.add_argument(
+        "--connection-profile",
+        type=str,
+        help="连接池配置，`conservative` 适合代理或不稳定的网络，默认为 `balanced`",
+        required=False,
+        choices=["conservative", "balanced", "aggressive"],
+    )
+    download_parser.add_argument(
+        "--book-meta-ttl",
+        type=int,
+        help="书籍信息与卷列表的缓存时长 (秒)，默认为 21600，`0` 表示总是重新获取",
+        required=False,
+    )
+    download_parser.add_argument(
+        "--http-cache-ttl",
+        type=str,
+        help="页面缓存时长 (秒)，格式为 `name=seconds`，多个用逗号分隔，例如 `book=600,book_data=0`",
+        required=False,
+    )
     download_parser.add_argument("-P", "--use-pool", action="store_true", help="启用凭证池进行下载")
     download_parser.add_argument("--per-cred-ratio", type=float, help="启用凭证池时生效，设定每个凭证的最大并发比例，默认为 1.0。如 `num_workers` 设定为 8，`per_cred_ratio` 设定为 0.5，则每个凭证最多使用 4 个并发任务。", required=False, default=1.0)
+    download_parser.add_argument(
+        "--rate-limit",
+        type=parse_byte_size,
+        help="限制所有下载的总速度 (单位: 字节/秒，可带 K/M/G 后缀)，例如 `2M`，`0` 表示不限制",
+        required=False,
+    )
+    download_parser.add_argument("--rate-burst", type=parse_byte_size, help="限速时允许的突发流量大小，默认为一秒的限速流量", required=False)
     download_parser.add_argument("--explain", action="store_true", help="仅输出下载计划和预估信息，不执行实际下载")
 
     login_parser = subparsers.add_parser("login", help="登录到 Kmoe")
@@ -164,6 +204,11 @@ class Configurer:
     def config(self) -> "Config":
         return self._config
 
+    @property
+    def path(self) -> str:
+        """配置文件的路径"""
+        return os.path.join(os.path.expanduser("~"), self.__filename)
+
     @property
     def cookie(self) -> Optional[dict]:
         return self._config.cookie
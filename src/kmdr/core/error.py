@@ -8,9 +8,9 @@ KMDR 异常定义与状态码
 - [ 0] 成功：在 console 拦截器中自动组装，代表命令顺利完成。
 - [1x] 基础/本地/参数解析错误：发生于工具初始化阶段，或者用户传入的命令参数有逻辑冲突（如 InitializationError, ArgsResolveError）。
 - [2x] 身份/凭证/配额错误：发生于与账密相关的事务交互中（如 LoginError, QuotaExceededError, NoCandidateCredentialError）。
-- [3x] 重定向/路由错误：遭遇站点强制重定向（如 RedirectError）。
+- [3x] 重定向/路由错误：遭遇站点强制重定向（如 RedirectError, BootstrapExpiredError）。
 - [4x] 用户输入/外部操作受限：因终端条件不足、查询的目标不存在、或内容被和谐（如 ValidationError, EmptyResultError, NotInteractableError, ContentBlockedError）。
-- [5x] 服务端/网络传输异常：因源站点宕机网络不通畅，或者网站的资源本身不支持某下载范式（如 ResponseError, RangeNotSupportedError）。
+- [5x] 服务端/网络传输异常：因源站点宕机网络不通畅，或者网站的资源本身不支持某下载范式（如 ResponseError, RangeNotSupportedError, CircuitOpenError）。
 - [50] (保留给 console.py)：用于抛出非 KmdrError 的预期外的原生系统崩溃信息（如底层的 KeyError、IndexError）。
 """
 
@@ -77,6 +77,17 @@ class RedirectError(KmdrError):
         return f"{self.message} 新的地址: {self.new_base_url}"
 
 
+class BootstrapExpiredError(KmdrError):
+    code: int = 32
+
+    def __init__(self, message, url: str):
+        super().__init__(message)
+        self.url = url
+
+    def __str__(self):
+        return f"{self.message} (地址: {self.url})"
+
+
 class ValidationError(KmdrError):
     code: int = 41
 
@@ -121,6 +132,18 @@ class RangeNotSupportedError(KmdrError):
         )
 
 
+class CircuitOpenError(KmdrError):
+    code: int = 53
+
+    def __init__(self, message, host: str, retry_in: float = 0.0):
+        super().__init__(message)
+        self.host = host
+        self.retry_in = retry_in
+
+    def __str__(self):
+        return f"{self.message} (主机: {self.host}，{self.retry_in:.0f} 秒后重试)"
+
+
 class NotInteractableError(KmdrError):
     code: int = 43
 
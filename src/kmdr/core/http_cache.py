@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import ClientSession
+from yarl import URL
+
+from .cache import cache_path, read_json, write_json
+from .console import debug
+from .utils import extract_cookies
+
+CACHE_DIRNAME = "http"
+INDEX_FILENAME = "index.json"
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+"""缓存的总大小上限，超出时淘汰最久未使用的页面"""
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    """
+    页面的缓存规则
+
+    - name: 规则名称，用于在配置中调整缓存时长
+    - pattern: 匹配请求路径（含查询参数）的正则表达式
+    - ttl: 缓存时长（秒），期间直接使用缓存；过期后带上 ETag/Last-Modified 发起条件请求，
+      服务器返回 304 时继续使用缓存。为 0 时每次都发起条件请求
+    """
+
+    name: str
+    pattern: str
+    ttl: float
+
+    def matches(self, path: str) -> bool:
+        return re.match(self.pattern, path) is not None
+
+
+DEFAULT_RULES: tuple[CacheRule, ...] = (
+    CacheRule("book", r"^/c/\d+\.htm", ttl=10 * 60),
+    CacheRule("book_data", r"^/book_data\.php", ttl=10 * 60),
+    CacheRule("search", r"^/l/", ttl=30 * 60),
+    CacheRule("follow", r"^/myfollow\.php", ttl=5 * 60),
+)
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    """页面内容，可能来自缓存"""
+
+    url: str
+    text: str
+    cookies: dict[str, str]
+    """服务器在该页面设置的 Cookie"""
+    from_cache: bool = False
+
+
+class HttpCache:
+    """
+    HTML 页面的本地缓存。
+
+    按请求路径与 Cookie 区分页面，不同镜像的同一路径共用缓存，不同账号的页面分开保存。
+    只缓存匹配 `CacheRule` 且没有经过重定向（例如跳转到登录页面）的 200 响应。
+    """
+
+    def __init__(self, directory: Optional[str] = None, rules: tuple[CacheRule, ...] = DEFAULT_RULES, max_bytes: int = MAX_CACHE_BYTES):
+        self._directory = directory
+        self._rules = rules
+        self._max_bytes = max_bytes
+        self._lock = asyncio.Lock()
+
+        index = (read_json(os.path.join(directory, INDEX_FILENAME)) if directory else None) or {}
+        self._index: dict[str, dict] = index
+        """缓存键 -> {"etag", "last_modified", "stored_at", "used_at", "size", "url", "cookies"}"""
+
+    def __repr__(self) -> str:
+        return f"HttpCache(entries={len(self._index)}, size={sum(e['size'] for e in self._index.values())})"
+
+    def configure(self, ttl: Optional[dict[str, float]]) -> None:
+        """
+        调整各规则的缓存时长
+
+        :param ttl: 规则名称 -> 缓存时长（秒）
+        """
+        if ttl:
+            self._rules = tuple(CacheRule(r.name, r.pattern, ttl.get(r.name, r.ttl)) for r in self._rules)
+
+    def rule_for(self, url: str) -> Optional[CacheRule]:
+        path = _path_of(url)
+        return next((rule for rule in self._rules if rule.matches(path)), None)
+
+    async def get(self, session: ClientSession, url: str, cookies: Optional[dict[str, str]] = None) -> CachedPage:
+        """
+        获取页面，缓存未过期时直接返回缓存，否则发起请求（有缓存时为条件请求）
+
+        :param session: 发起请求的会话
+        :param url: 页面地址，可以是相对于镜像的路径
+        :param cookies: 请求携带的 Cookie
+        :raises aiohttp.ClientResponseError: 响应状态异常
+        """
+        rule = self.rule_for(url)
+        if rule is None or self._directory is None:
+            return await self._fetch(session, url, cookies)
+
+        key = _key_of(url, cookies)
+        entry = self._index.get(key)
+        if entry is not None and time.time() - entry["stored_at"] < rule.ttl:
+            page = await self._load(key, entry)
+            if page is not None:
+                # 只更新了使用时间，不单独保存索引，随下一次页面变化一起保存
+                debug("使用缓存的页面:", url)
+                return page
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        async with session.get(url, cookies=cookies, headers=headers) as response:
+            if response.status == 304 and entry is not None:
+                # 304 响应同样可能更新会话 Cookie，合并到缓存中，之后的请求不会使用过期的 Cookie
+                entry["cookies"] = {**(entry.get("cookies") or {}), **extract_cookies(response)}
+                page = await self._load(key, entry)
+                if page is not None:
+                    debug("页面未变化，使用缓存:", url)
+                    entry["stored_at"] = time.time()
+                    await self._save_index()
+                    return page
+                # 缓存文件丢失，重新完整请求
+                return await self._fetch(session, url, cookies)
+
+            response.raise_for_status()
+            page = CachedPage(url=str(response.url), text=await response.text(), cookies=extract_cookies(response))
+            if response.status == 200 and not response.history:
+                await self._store(key, page, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return page
+
+    async def _fetch(self, session: ClientSession, url: str, cookies: Optional[dict[str, str]]) -> CachedPage:
+        async with session.get(url, cookies=cookies) as response:
+            response.raise_for_status()
+            return CachedPage(url=str(response.url), text=await response.text(), cookies=extract_cookies(response))
+
+    async def _load(self, key: str, entry: dict) -> Optional[CachedPage]:
+        try:
+            text = await asyncio.to_thread(_read_text, self._body_path(key))
+        except OSError:
+            self._index.pop(key, None)
+            return None
+        entry["used_at"] = time.time()
+        return CachedPage(url=entry["url"], text=text, cookies=entry.get("cookies") or {}, from_cache=True)
+
+    async def _store(self, key: str, page: CachedPage, etag: Optional[str], last_modified: Optional[str]) -> None:
+        body = page.text.encode("utf-8")
+        if len(body) > self._max_bytes:
+            return
+
+        async with self._lock:
+            try:
+                await asyncio.to_thread(_write_bytes, self._body_path(key), body)
+            except OSError as e:
+                debug("无法缓存页面:", page.url, e)
+                return
+
+            now = time.time()
+            self._index[key] = {
+                "url": page.url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "stored_at": now,
+                "used_at": now,
+                "size": len(body),
+                "cookies": page.cookies,
+            }
+            await self._evict()
+            await self._dump_index()
+
+    async def _evict(self) -> None:
+        total = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["used_at"]):
+            if total <= self._max_bytes:
+                break
+            total -= entry["size"]
+            del self._index[key]
+            try:
+                await asyncio.to_thread(os.remove, self._body_path(key))
+            except OSError:
+                pass
+
+    async def _save_index(self) -> None:
+        async with self._lock:
+            await self._dump_index()
+
+    async def _dump_index(self) -> None:
+        """保存索引，调用方需要持有 `_lock`，所有保存共用同一个临时文件"""
+        # 写入线程中序列化期间，事件循环可能继续修改索引，这里先复制一份
+        snapshot = {key: dict(entry) for key, entry in self._index.items()}
+        try:
+            await asyncio.to_thread(write_json, os.path.join(self._directory, INDEX_FILENAME), snapshot)
+        except OSError as e:
+            debug("无法保存页面缓存索引:", e)
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.html")
+
+
+def parse_cache_ttl(value: str) -> dict[str, float]:
+    """
+    解析缓存时长配置，格式为 `name=seconds`，多个规则以逗号分隔，例如 `book=600,search=0`
+
+    :raises ValueError: 格式错误或规则名称不存在
+    """
+    names = {rule.name for rule in DEFAULT_RULES}
+    ttl: dict[str, float] = {}
+    for item in value.split(","):
+        name, sep, seconds = item.partition("=")
+        name = name.strip()
+        if not sep or name not in names:
+            raise ValueError(f"格式应为 name=seconds，可用名称：{', '.join(sorted(names))}")
+        ttl[name] = float(seconds)
+        if ttl[name] < 0:
+            raise ValueError("缓存时长不能为负数。")
+    return ttl
+
+
+def _path_of(url: str) -> str:
+    parsed = URL(url)
+    return parsed.raw_path_qs
+
+
+def _key_of(url: str, cookies: Optional[dict[str, str]]) -> str:
+    identity = json.dumps(cookies or {}, sort_keys=True)
+    return hashlib.sha256(f"{_path_of(url)}\n{identity}".encode()).hexdigest()
+
+
+def _read_text(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+_CACHE: Optional[HttpCache] = None
+
+
+def get_http_cache() -> HttpCache:
+    """惰性加载全局的页面缓存。"""
+    global _CACHE
+
+    if _CACHE is None:
+        directory = None
+        try:
+            directory = cache_path(CACHE_DIRNAME)
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            debug("无法访问缓存目录，不会缓存页面:", e)
+            directory = None
+        _CACHE = HttpCache(directory)
+    return _CACHE
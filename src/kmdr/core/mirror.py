@@ -0,0 +1,149 @@
+import threading
+import time
+from typing import Optional
+
+from aiohttp import ClientSession
+
+from .cache import cache_path, read_json, write_json
+from .console import debug
+from .utils import PrioritySorter
+
+STATS_FILENAME = "mirrors.json"
+
+MIRROR_LIST_URL = "https://raw.githubusercontent.com/chrisis58/kmoe-manga-downloader/main/mirror/mirrors.json"
+"""远程仓库中维护的镜像列表"""
+
+MIRROR_LIST_TTL = 24 * 60 * 60
+"""镜像列表的缓存时长（秒）"""
+
+EWMA_ALPHA = 0.3
+"""新样本在延迟和健康度中的权重"""
+
+HEALTHY_THRESHOLD = 0.5
+"""健康度（探测成功的滑动平均）低于该值的镜像视为不可靠"""
+
+SEED_BONUS = 3
+"""根据历史数据调整镜像优先级的幅度"""
+
+
+class MirrorStats:
+    """
+    记录各镜像的探测延迟与成功率，保存在本地缓存中，用于下次启动时调整镜像的优先级。
+
+    同时缓存远程仓库中的镜像列表，新增的镜像无需更新程序即可参与探测。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._dirty = False
+        # 探测结束与镜像列表更新后都会在线程中保存，两者共用同一个临时文件
+        self._dump_lock = threading.Lock()
+
+        data = (read_json(path) if path else None) or {}
+        self._mirrors: dict[str, dict] = data.get("mirrors") or {}
+        """镜像地址 -> {"latency": 探测延迟（秒）, "health": 探测成功的滑动平均}"""
+        self._listed: list[str] = data.get("listed") or []
+        """远程镜像列表中的地址"""
+        self._listed_at: float = data.get("listed_at") or 0.0
+
+    def __repr__(self) -> str:
+        return f"MirrorStats({self._mirrors})"
+
+    def record_success(self, base_url: str, latency: float) -> None:
+        stats = self._mirrors.setdefault(base_url, {"latency": None, "health": 1.0})
+        stats["latency"] = _ewma(stats["latency"], latency)
+        stats["health"] = _ewma(stats["health"], 1.0)
+        self._dirty = True
+
+    def record_failure(self, base_url: str) -> None:
+        stats = self._mirrors.setdefault(base_url, {"latency": None, "health": 0.0})
+        stats["health"] = _ewma(stats["health"], 0.0)
+        self._dirty = True
+
+    def listed(self) -> list[str]:
+        """缓存的远程镜像列表"""
+        return list(self._listed)
+
+    @property
+    def list_expired(self) -> bool:
+        return time.time() - self._listed_at > MIRROR_LIST_TTL
+
+    def seed(self, sorter: PrioritySorter[str]) -> None:
+        """
+        根据历史数据调整镜像的优先级：延迟最低的几个健康镜像依次提升，不可靠的镜像降低。
+
+        :param sorter: 已经设置好初始优先级的镜像排序器，只调整其中已有的镜像
+        """
+        candidates = {url: stats for url, stats in self._mirrors.items() if sorter.get(url) is not None}
+
+        healthy = [url for url, stats in candidates.items() if stats["health"] >= HEALTHY_THRESHOLD and stats["latency"] is not None]
+        healthy.sort(key=lambda url: candidates[url]["latency"])
+        for rank, url in enumerate(healthy[:SEED_BONUS]):
+            sorter.incr(url, SEED_BONUS - rank)
+
+        for url, stats in candidates.items():
+            if stats["health"] < HEALTHY_THRESHOLD:
+                sorter.decr(url, SEED_BONUS)
+
+    async def refresh_list(self, session: ClientSession) -> None:
+        """
+        从远程仓库获取最新的镜像列表，失败时保留原有的列表
+
+        只有成功解析列表后才更新获取时间，失败或者被取消时下次启动会再次尝试。
+        """
+        try:
+            async with session.get(MIRROR_LIST_URL) as response:
+                response.raise_for_status()
+                # raw.githubusercontent.com 返回的类型为 text/plain
+                data = await response.json(content_type=None)
+            mirrors = [data.get("default"), *(data.get("alternatives") or [])]
+            listed = [url.rstrip("/") for url in mirrors if isinstance(url, str) and url.startswith("https://")]
+        except Exception as e:
+            debug("无法获取镜像列表:", e)
+            return
+
+        if not listed:
+            debug("镜像列表为空，保留原有的列表")
+            return
+        self._listed = listed
+        self._listed_at = time.time()
+        self._dirty = True
+        debug("已更新镜像列表:", self._listed)
+
+    def dump(self) -> None:
+        """
+        保存探测记录与镜像列表
+
+        :note: 同步 IO，在协程中调用时应放入线程池。
+        """
+        with self._dump_lock:
+            if not self._dirty or not self._path:
+                return
+
+            try:
+                write_json(self._path, {"mirrors": self._mirrors, "listed": self._listed, "listed_at": self._listed_at})
+                self._dirty = False
+            except OSError as e:
+                debug("无法保存镜像的探测记录:", e)
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    if current is None:
+        return sample
+    return current * (1 - EWMA_ALPHA) + sample * EWMA_ALPHA
+
+
+_STATS: Optional[MirrorStats] = None
+
+
+def get_mirror_stats() -> MirrorStats:
+    """惰性加载全局的镜像探测记录。"""
+    global _STATS
+
+    if _STATS is None:
+        try:
+            _STATS = MirrorStats(cache_path(STATS_FILENAME))
+        except OSError as e:
+            debug("无法访问缓存目录，不会保存镜像的探测记录:", e)
+            _STATS = MirrorStats()
+    return _STATS
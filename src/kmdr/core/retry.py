@@ -0,0 +1,182 @@
+"""
+重试策略。
+
+`async_retry` 与下载循环共用同一套退避规则：带抖动的退避、遵循服务器的 Retry-After、
+限制单次任务的总重试次数，并按主机记录重试情况。
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import aiohttp
+from yarl import URL
+
+from .console import debug
+
+MAX_RETRY_AFTER = 120.0
+"""服务器要求等待的时间上限（秒），避免异常的 Retry-After 让任务长时间停滞"""
+
+
+@dataclass
+class HostRetryStats:
+    retries: int = 0
+    """该主机累计的重试次数"""
+
+    blocked_until: float = 0.0
+    """服务器通过 Retry-After 要求暂停请求的截止时间（time.monotonic）"""
+
+
+class RetryPolicy:
+    """
+    重试的退避策略。
+
+    - 开启抖动时使用 decorrelated jitter：下一次等待时间在 `[base_delay, 上次等待时间 * 3]` 中随机选取，
+      避免大量连接在同一时刻重试后再次被限流；关闭时按 `backoff` 倍数增长。
+    - 响应带有 Retry-After 时，同一主机的所有重试都会等到服务器要求的时间之后。
+    - 可以设置单次任务的重试预算，预算用尽后不再重试。
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        backoff: float = 2.0,
+        jitter: bool = True,
+    ):
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._backoff = backoff
+        self._jitter = jitter
+
+        self._budget: Optional[int] = None
+        self._used = 0
+        self._hosts: dict[str, HostRetryStats] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"RetryPolicy(base_delay={self._base_delay}, max_delay={self._max_delay}, jitter={self._jitter}, "
+            f"used={self._used}, budget={self._budget})"
+        )
+
+    def reset_budget(self, budget: Optional[int]):
+        """
+        开始新的任务，重新设置重试预算并清空统计
+
+        :param budget: 本次任务允许的总重试次数，None 表示不限制
+        """
+        self._budget = budget
+        self._used = 0
+        self._hosts.clear()
+
+    @property
+    def hosts(self) -> dict[str, HostRetryStats]:
+        return self._hosts
+
+    def start(self) -> "RetryState":
+        """为一次请求（及其后续的重试）创建退避状态"""
+        return RetryState(self)
+
+    def _compute_delay(self, previous: Optional[float]) -> float:
+        if previous is None:
+            delay = self._base_delay
+        elif self._jitter:
+            delay = random.uniform(self._base_delay, previous * 3)
+        else:
+            delay = previous * self._backoff
+        return min(self._max_delay, delay)
+
+    def _consume(self, host: Optional[str], retry_after: Optional[float]) -> Optional[float]:
+        """记录一次重试，返回该主机还需要暂停的时间；预算用尽时返回 None"""
+        if self._budget is not None and self._used >= self._budget:
+            debug("本次任务的重试预算已用尽:", self._budget)
+            return None
+        self._used += 1
+
+        if host is None:
+            return retry_after or 0.0
+
+        stats = self._hosts.setdefault(host, HostRetryStats())
+        stats.retries += 1
+
+        now = time.monotonic()
+        if retry_after is not None:
+            stats.blocked_until = max(stats.blocked_until, now + retry_after)
+        return max(0.0, stats.blocked_until - now)
+
+
+class RetryState:
+    """单个请求的退避状态，记录上一次的等待时间。"""
+
+    def __init__(self, policy: RetryPolicy):
+        self._policy = policy
+        self._previous: Optional[float] = None
+
+    def next_delay(self, exception: Optional[BaseException] = None, url: Optional[object] = None) -> Optional[float]:
+        """
+        计算下一次重试前的等待时间
+
+        :param exception: 导致重试的异常，用于读取 Retry-After
+        :param url: 请求的 URL，用于按主机统计
+        :return: 等待时间（秒），重试预算用尽时返回 None
+        """
+        retry_after = retry_after_of(exception)
+        blocked = self._policy._consume(_host_of(url), retry_after)
+        if blocked is None:
+            return None
+
+        self._previous = self._policy._compute_delay(self._previous)
+        return max(self._previous, blocked)
+
+
+def retry_after_of(exception: Optional[BaseException]) -> Optional[float]:
+    """从响应异常中读取 Retry-After（秒）"""
+    if not isinstance(exception, aiohttp.ClientResponseError) or not exception.headers:
+        return None
+    return parse_retry_after(exception.headers.get("Retry-After"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After，支持秒数和 HTTP 日期两种格式
+
+    :return: 需要等待的秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        seconds = (at - datetime.now(timezone.utc)).total_seconds()
+
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+def _host_of(url: Optional[object]) -> Optional[str]:
+    if not isinstance(url, (str, URL)):
+        # 下载链接可能仍是尚未解析的 Supplier
+        return None
+    try:
+        return URL(url).host
+    except (ValueError, TypeError):
+        return None
+
+
+_POLICY = RetryPolicy(base_delay=3.0, max_delay=60.0)
+"""下载相关的请求原本固定等待 3 秒后重试，这里以此作为退避的起点"""
+
+
+def get_retry_policy() -> RetryPolicy:
+    """下载过程共用的重试策略。"""
+    return _POLICY
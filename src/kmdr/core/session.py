@@ -1,17 +1,37 @@
 import asyncio
+import collections
+import time
 from types import TracebackType
 from typing import Optional
 from urllib.parse import urljoin, urlsplit
 
-from aiohttp import ClientSession, ClientTimeout, DummyCookieJar
+from aiohttp import ClientSession, ClientTimeout, DummyCookieJar, TCPConnector, TraceConfig
 
 from .bases import SESSION_MANAGER, SessionManager
+from .bootstrap import get_bootstrap_cache
+from .circuit import get_circuit_breakers
+from .connector import CONNECTOR_PROFILES, DEFAULT_CONNECTOR_PROFILE, ConnectorProfile, get_connection_stats, get_connection_warmer
 from .console import debug, info
 from .constants import API_ROUTE, BASE_URL
 from .defaults import TRUE_UA
-from .error import InitializationError, RedirectError
+from .error import CircuitOpenError, InitializationError, RedirectError
+from .http_cache import get_http_cache, parse_cache_ttl
+from .mirror import get_mirror_stats
 from .protocol import AsyncCtxManager, Supplier
-from .utils import PrioritySorter, async_retry, get_random_ua
+from .throttle import get_throttle_coordinator
+from .utils import PrioritySorter, get_random_ua
+
+API_CONNECTIONS = 8
+"""接口请求（获取下载链接、同步额度、书籍信息等）使用的连接数上限"""
+
+TRANSFER_CONNECTIONS = 100
+"""文件传输使用的连接数上限，实际并发数由下载器控制"""
+
+PROBE_STAGGER = 0.25
+"""探测镜像时，前一个镜像在该时长（秒）内没有结果就同时探测下一个镜像"""
+
+MIRROR_LIST_TIMEOUT = 10.0
+"""在后台获取远程镜像列表的超时时长（秒）"""
 
 
 # 通常只会有一个 SessionManager 的实现
@@ -27,17 +47,31 @@ class KmdrSessionManager(SessionManager):
         proxy: Optional[str] = None,
         book_url: Optional[str] = None,
         fake_ua: bool = False,
+        connection_profile: Optional[str] = None,
+        http_cache_ttl: Optional[str] = None,
         *args,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self._proxy = proxy
+        # 只有下载会使用缓存的启动信息，查看状态、登录等命令总是重新探测
+        self._use_bootstrap = kwargs.get("command") == "download"
+        self._profile: ConnectorProfile = CONNECTOR_PROFILES[connection_profile or DEFAULT_CONNECTOR_PROFILE]
         self._headers = {"User-Agent": get_random_ua() if fake_ua else TRUE_UA}
+        self._refresh_task: Optional[asyncio.Task] = None
+        """在后台更新镜像列表的任务，保留引用避免被回收"""
+
+        if http_cache_ttl:
+            get_http_cache().configure(parse_cache_ttl(http_cache_ttl))
+
+        mirror_stats = get_mirror_stats()
 
         self._sorter = PrioritySorter[str]()
         [self._sorter.set(alt) for alt in BASE_URL.alternatives()]
+        [self._sorter.set(listed) for listed in mirror_stats.listed() if self._sorter.get(listed) is None]
         self._sorter.incr(BASE_URL.DEFAULT.value, 2)
         self._sorter.incr(self._base_url, 5)
+        mirror_stats.seed(self._sorter)
 
         if book_url is not None and book_url.strip() != "":
             splited = urlsplit(book_url)
@@ -51,30 +85,66 @@ class KmdrSessionManager(SessionManager):
         try:
             if self._session is not None and not self._session.closed:
                 # 幂等性检查：如果 session 已经存在且未关闭，直接返回
-                return SessionCtxManager(self._session)
+                return SessionCtxManager(self._session, self._transfer_session)
         except LookupError:
             # session_var 尚未设置
             pass
 
         with self._console.status("连接中..."):
-            self._base_url = await self._probing_base_url()
+            # 探测镜像与接口请求共用连接池，探测时建立的连接可以直接用于之后的请求
+            api_connector = self._profile.connector(API_CONNECTIONS)
+            warmer = get_connection_warmer()
+            warmer.enabled = self._profile.prewarm
+
+            bootstrap = get_bootstrap_cache()
+            cached_base_url = bootstrap.base_url() if self._use_bootstrap else None
+            try:
+                if cached_base_url is not None:
+                    debug("使用缓存的镜像地址，跳过探测:", cached_base_url)
+                    self._base_url = cached_base_url
+                else:
+                    self._base_url = await self._probing_base_url(api_connector)
+                    await bootstrap.save_base_url(self._base_url)
+            except BaseException:
+                await api_connector.close()
+                raise
             # 持久化配置
             self._configurer.set_base_url(self._base_url)
             debug("使用的基础 URL:", self._base_url)
             debug("使用的代理:", self._proxy)
+            debug("连接池配置:", self._profile)
 
-            self._session = ClientSession(
-                base_url=self._base_url,
-                proxy=self._proxy,
-                trust_env=True,
-                headers=self._headers,
-                cookie_jar=DummyCookieJar(),
-            )
+            # 接口请求与文件传输使用各自的连接池，大量传输占满连接时不会阻塞获取下载链接、同步额度等请求
+            self._session = self._create_session(api_connector, bootstrap.trace_config())
+            self._transfer_session = self._create_session(self._profile.connector(TRANSFER_CONNECTIONS))
+
+            if cached_base_url is not None:
+                warmer.warm(self._session, self._base_url)
+            warmer.warm(self._transfer_session, self._base_url)
 
-            return SessionCtxManager(self._session)
+            return SessionCtxManager(self._session, self._transfer_session)
+
+    def _create_session(self, connector: TCPConnector, *trace_configs: TraceConfig) -> ClientSession:
+        return ClientSession(
+            base_url=self._base_url,
+            proxy=self._proxy,
+            trust_env=True,
+            headers=self._headers,
+            cookie_jar=DummyCookieJar(),
+            connector=connector,
+            trace_configs=[
+                # 两个会话访问相同的主机，限流时统一暂停
+                get_throttle_coordinator().trace_config(),
+                get_connection_stats().trace_config(),
+                *trace_configs,
+            ],
+        )
 
     async def validate_url(self, session: ClientSession, url_supplier: Supplier[str]) -> bool:
+        breakers = get_circuit_breakers()
         try:
+            # 已熔断的镜像直接跳过，尝试下一个
+            breakers.guard(url_supplier())
             async with session.head(
                 # 这里只请求登录页面的头信息保证快速响应
                 # 选择登录页面，一个是因为登录页面对所有用户都开放
@@ -90,54 +160,123 @@ class KmdrSessionManager(SessionManager):
                         new_base_url=f"{new_location.scheme}://{new_location.netloc}",
                     )
 
+                breakers.record_status(url_supplier(), response.status)
                 return response.status == 200
+        except CircuitOpenError as e:
+            debug("跳过已熔断的镜像:", url_supplier(), e)
+            return False
+        except RedirectError:
+            raise
         except Exception as e:
+            breakers.record_failure(url_supplier(), e)
             info(f"[yellow]无法连接到镜像: {url_supplier()}，错误信息: {e}[/yellow]")
             return False
 
-    async def _probing_base_url(self) -> str:
+    async def _probing_base_url(self, connector: Optional[TCPConnector] = None) -> str:
         """
         探测可用的镜像地址。
-        顺序为：首选地址 -> 备用地址
-        当前首选地址不可用时，尝试备用地址，直到找到可用的地址或耗尽所有选项。
+        按优先级依次开始探测，前一个镜像失败或在 `PROBE_STAGGER` 内没有结果时，同时探测下一个镜像，
+        选择最先通过探测的镜像。探测的延迟与结果会被记录，用于调整下次启动时的优先级。
         如果所有地址均不可用，则抛出 InitializationError 异常。
 
+        :param connector: 探测使用的连接池，探测结束后不会关闭，供之后的会话复用探测时建立的连接
         :raises InitializationError: 如果所有镜像地址均不可用。
         :return: 可用的镜像地址。
         """
 
-        ret_base_url: str
+        mirror_stats = get_mirror_stats()
+
+        async with ClientSession(
+            proxy=self._proxy,
+            trust_env=True,
+            headers=self._headers,
+            timeout=ClientTimeout(total=2.0),
+            connector=connector,
+            connector_owner=connector is None,
+            trace_configs=[get_connection_stats().trace_config()],
+        ) as probe_session:
+            # 镜像列表只用于之后的启动，在后台获取，不等待其完成
+            if mirror_stats.list_expired and self._refresh_task is None:
+                self._refresh_task = asyncio.create_task(self._refresh_mirror_list())
+            try:
+                base_url = await self._race(probe_session, self._sorter.sort())
+            finally:
+                await asyncio.to_thread(mirror_stats.dump)
 
-        def get_base_url() -> str:
-            nonlocal ret_base_url
-            return ret_base_url
+        if base_url is None:
+            raise InitializationError(
+                "所有镜像均不可用，请检查您的网络连接或使用其他镜像。\n详情参考：https://github.com/chrisis58/kmoe-manga-downloader/blob/main/mirror/mirrors.json"
+            )
+        return base_url
+
+    async def _refresh_mirror_list(self) -> None:
+        """使用独立的会话获取远程镜像列表，不受探测会话关闭的影响，成功后保存到本地缓存"""
+        mirror_stats = get_mirror_stats()
+        async with ClientSession(
+            proxy=self._proxy,
+            trust_env=True,
+            headers=self._headers,
+            timeout=ClientTimeout(total=MIRROR_LIST_TIMEOUT),
+        ) as session:
+            await mirror_stats.refresh_list(session)
+        await asyncio.to_thread(mirror_stats.dump)
+
+    async def _race(self, session: ClientSession, candidates: list[str]) -> Optional[str]:
+        """
+        错开启动各镜像的探测，返回最先通过探测的镜像，全部失败时返回 None
 
-        def set_base_url(value: str) -> None:
-            nonlocal ret_base_url
-            ret_base_url = value
+        :param session: 用于探测的会话
+        :param candidates: 按优先级排序的镜像地址
+        """
+        queue = collections.deque(candidates)
+        seen = set(candidates)
+        probes: dict[asyncio.Task, str] = {}
 
-        async with ClientSession(proxy=self._proxy, trust_env=True, headers=self._headers, timeout=ClientTimeout(total=2.0)) as probe_session:
-            # TODO: 请求远程仓库中的镜像列表，并添加到 sorter 中
+        try:
+            while queue or probes:
+                if queue:
+                    base_url = queue.popleft()
+                    probes[asyncio.create_task(self._probe(session, base_url))] = base_url
 
-            for bu in self._sorter.sort():
-                set_base_url(bu)
+                # 有镜像探测失败或者等待超过 PROBE_STAGGER 时，开始探测下一个镜像
+                done, _ = await asyncio.wait(probes, timeout=PROBE_STAGGER if queue else None, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    base_url = probes.pop(task)
+                    healthy, redirect = task.result()
+                    if healthy:
+                        return base_url
+                    if redirect is not None and redirect not in seen:
+                        debug("镜像", base_url, "重定向到", redirect)
+                        seen.add(redirect)
+                        queue.appendleft(redirect)
+            return None
+        finally:
+            for task in probes:
+                task.cancel()
+            await asyncio.gather(*probes, return_exceptions=True)
 
-                if await async_retry(
-                    attempts=1,
-                    backoff=1,
-                    base_url_setter=set_base_url,
-                    on_failure=lambda e: info(f"[yellow]无法连接到镜像: {get_base_url()}，错误信息: {e}[/yellow]"),
-                )(self.validate_url)(probe_session, get_base_url):
-                    return get_base_url()
+    async def _probe(self, session: ClientSession, base_url: str) -> tuple[bool, Optional[str]]:
+        """探测单个镜像，返回是否可用以及重定向的目标地址"""
+        mirror_stats = get_mirror_stats()
+        started_at = time.monotonic()
+        try:
+            healthy = await self.validate_url(session, lambda: base_url)
+        except RedirectError as e:
+            return False, e.new_base_url
 
-            raise InitializationError(
-                "所有镜像均不可用，请检查您的网络连接或使用其他镜像。\n详情参考：https://github.com/chrisis58/kmoe-manga-downloader/blob/main/mirror/mirrors.json"
-            )
+        if healthy:
+            latency = time.monotonic() - started_at
+            debug("镜像", base_url, "探测成功，延迟", f"{latency:.3f}s")
+            mirror_stats.record_success(base_url, latency)
+        else:
+            mirror_stats.record_failure(base_url)
+        return healthy, None
 
 
 class SessionCtxManager:
-    def __init__(self, session: ClientSession):
+    def __init__(self, session: ClientSession, transfer_session: Optional[ClientSession] = None):
         self._session = session
+        self._transfer_session = transfer_session
 
     async def __aenter__(self) -> ClientSession:
         await self._session.__aenter__()
@@ -149,7 +288,10 @@ class SessionCtxManager:
         exc_value: Optional[BaseException],
         traceback: Optional[TracebackType],
     ):
+        if self._transfer_session is not None and self._transfer_session is not self._session:
+            await self._transfer_session.close()
         await self._session.__aexit__(exc_type, exc_value, traceback)
+        debug("连接统计:", get_connection_stats())
 
         if exc_type in (KeyboardInterrupt, asyncio.CancelledError):
             debug("任务被取消，正在清理资源")
@@ -45,6 +45,15 @@ class VolInfo:
     卷大小，单位为MB
     """
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "VolInfo":
+        filtered_data = {k: data[k] for k in cls.__annotations__ if k in data}
+
+        if "vol_type" in filtered_data and isinstance(filtered_data["vol_type"], str):
+            filtered_data["vol_type"] = VolumeType(filtered_data["vol_type"])
+
+        return cls(**filtered_data)
+
 
 @dataclass(frozen=True)
 class BookInfo:
@@ -55,6 +64,11 @@ class BookInfo:
     status: str
     last_update: str
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "BookInfo":
+        filtered_data = {k: data[k] for k in cls.__annotations__ if k in data}
+        return cls(**filtered_data)
+
 
 @dataclass
 class Config:
@@ -66,6 +80,11 @@ class Config:
     - callback: 下载完成后的回调函数
     - proxy: 下载时使用的代理
     - num_workers: 下载时使用的线程数
+    - min_workers: 自动调整并发数时的下限
+    - max_workers: 自动调整并发数时的上限
+    - connection_profile: 连接池配置
+    - http_cache_ttl: 页面缓存时长
+    - book_meta_ttl: 书籍信息与卷列表的缓存时长
     """
 
     username: Optional[str] = None
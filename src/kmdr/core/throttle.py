@@ -0,0 +1,152 @@
+"""
+协调同一会话中所有请求的限流退避。
+
+任意一个请求收到 429/503 后，发往同一主机的新请求都会暂停，
+不必让每个协程各自撞上限流；暂停结束后逐步恢复请求速度。
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import ClientSession, TraceConfig, TraceRequestEndParams, TraceRequestStartParams
+
+from .console import debug, info
+from .retry import parse_retry_after
+
+THROTTLE_STATUS = {429, 503}
+
+BASE_PAUSE = 1.0
+"""服务器没有给出 Retry-After 时的初始暂停时间（秒）"""
+
+MAX_PAUSE = 60.0
+"""连续限流时暂停时间翻倍，最多延长到该值（秒）"""
+
+RAMP_SPACING = 0.5
+"""暂停结束后相邻两个请求的初始间隔（秒），每收到一个正常响应减半"""
+
+MIN_SPACING = 0.01
+"""间隔小于该值后不再限制请求速度"""
+
+
+@dataclass
+class HostThrottle:
+    paused_until: float = 0.0
+    """暂停发出新请求的截止时间（time.monotonic）"""
+
+    pause: float = BASE_PAUSE
+    """没有 Retry-After 时使用的暂停时间，根据限流情况调整"""
+
+    spacing: float = 0.0
+    """恢复阶段相邻两个请求之间的间隔"""
+
+    next_start: float = 0.0
+    """恢复阶段下一个请求最早的发出时间"""
+
+
+class ThrottleCoordinator:
+    """
+    通过 aiohttp 的 TraceConfig 挂载到 ClientSession 上，按主机协调请求。
+
+    - 收到 429/503 时，按 Retry-After（没有时按逐步学习的暂停时间）暂停该主机的新请求；
+      暂停期间再次限流不会叠加，暂停结束后仍被限流才会延长暂停时间。
+    - 暂停结束后以 `RAMP_SPACING` 的间隔逐个放行请求，每个正常的响应让间隔减半，直到恢复正常。
+
+    已经开始传输的请求不受影响。
+    """
+
+    def __init__(self):
+        self._hosts: dict[str, HostThrottle] = {}
+
+    def __repr__(self) -> str:
+        return f"ThrottleCoordinator(hosts={list(self._hosts)})"
+
+    def trace_config(self) -> TraceConfig:
+        """创建用于 ClientSession(trace_configs=...) 的 TraceConfig"""
+        trace_config = TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        return trace_config
+
+    async def wait(self, host: Optional[str]) -> None:
+        """
+        在发出请求前调用，主机处于暂停或恢复阶段时等待
+
+        :param host: 请求的主机
+        """
+        throttle = self._hosts.get(host) if host else None
+        if throttle is None:
+            return
+
+        now = time.monotonic()
+        start_at = max(now, throttle.paused_until)
+        if throttle.spacing > 0:
+            # 预留发出时间，多个等待中的请求依次错开
+            start_at = max(start_at, throttle.next_start)
+            throttle.next_start = start_at + throttle.spacing
+
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    def on_response(self, host: Optional[str], status: int, retry_after: Optional[str] = None) -> None:
+        """
+        根据响应状态更新主机的限流状态
+
+        :param host: 请求的主机
+        :param status: 响应状态码
+        :param retry_after: 响应头中的 Retry-After
+        """
+        if not host:
+            return
+
+        if status in THROTTLE_STATUS:
+            self._throttled(host, parse_retry_after(retry_after))
+            return
+
+        throttle = self._hosts.get(host)
+        if throttle is None or throttle.spacing <= 0:
+            return
+        throttle.spacing /= 2
+        if throttle.spacing < MIN_SPACING:
+            throttle.spacing = 0.0
+            # 成功恢复后缓慢减少学习到的暂停时间
+            throttle.pause = max(BASE_PAUSE, throttle.pause / 2)
+            debug("已恢复正常的请求速度:", host)
+
+    def _throttled(self, host: str, retry_after: Optional[float]):
+        throttle = self._hosts.setdefault(host, HostThrottle())
+        now = time.monotonic()
+        if now < throttle.paused_until:
+            # 同一次限流中其他请求收到的响应，只在服务器要求更久时延长
+            if retry_after is not None:
+                throttle.paused_until = max(throttle.paused_until, now + retry_after)
+            return
+
+        if throttle.spacing > 0:
+            # 恢复阶段再次被限流，说明暂停时间不够
+            throttle.pause = min(MAX_PAUSE, throttle.pause * 2)
+
+        pause = retry_after if retry_after is not None else throttle.pause
+        throttle.paused_until = now + pause
+        throttle.spacing = RAMP_SPACING
+        throttle.next_start = throttle.paused_until
+        info(f"[yellow]{host} 正在限流，暂停发送新请求 {pause:.1f} 秒[/yellow]")
+
+    async def _on_request_start(self, session: ClientSession, context, params: TraceRequestStartParams):
+        await self.wait(params.url.host)
+
+    async def _on_request_end(self, session: ClientSession, context, params: TraceRequestEndParams):
+        self.on_response(params.url.host, params.response.status, params.response.headers.get("Retry-After"))
+
+
+_COORDINATOR: Optional[ThrottleCoordinator] = None
+
+
+def get_throttle_coordinator() -> ThrottleCoordinator:
+    """惰性创建全局的限流协调器。"""
+    global _COORDINATOR
+
+    if _COORDINATOR is None:
+        _COORDINATOR = ThrottleCoordinator()
+    return _COORDINATOR
@@ -13,6 +13,7 @@ from .console import debug
 from .constants import TIMEZONE
 from .error import RedirectError
 from .protocol import Consumer
+from .retry import RetryPolicy
 
 T = TypeVar("T")
 
@@ -69,11 +70,20 @@ def async_retry(
     retry_on_status: set[int] = {500, 502, 503, 504, 429, 408},
     base_url_setter: Optional[Consumer[str]] = None,
     on_failure: Optional[Callable[[Exception], None]] = None,
+    policy: Optional[RetryPolicy] = None,
 ):
+    """
+    :param delay: 第一次重试前的等待时间（秒）
+    :param backoff: 每次重试后等待时间的倍数
+    :param policy: 使用指定的重试策略（抖动、重试预算等），此时忽略 `delay` 和 `backoff`
+    """
+    if policy is None:
+        policy = RetryPolicy(base_delay=delay, max_delay=float("inf"), backoff=backoff, jitter=False)
+
     def decorator(func):
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            current_delay = delay
+            retry_state = policy.start()
             last_exception: Optional[Exception] = None
 
             for attempt in range(attempts):
@@ -81,6 +91,7 @@ def async_retry(
                     return await func(*args, **kwargs)
                 except aiohttp.ClientResponseError as e:
                     debug("请求状态异常:", e.status)
+                    retry_error: Exception = e
                     if e.status in retry_on_status:
                         if attempt == attempts - 1:
                             last_exception = e
@@ -90,6 +101,7 @@ def async_retry(
                         break
                 except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                     # 对于所有其他 aiohttp 客户端异常和超时，进行重试
+                    retry_error = e
                     if attempt == attempts - 1:
                         last_exception = e
                         break
@@ -106,9 +118,12 @@ def async_retry(
                     last_exception = e
                     break
 
-                await asyncio.sleep(current_delay)
-
-                current_delay *= backoff
+                # Retry-After 只出现在响应异常中，请求地址用于按主机统计重试
+                wait = retry_state.next_delay(retry_error, getattr(getattr(retry_error, "request_info", None), "real_url", None))
+                if wait is None:
+                    last_exception = retry_error
+                    break
+                await asyncio.sleep(wait)
 
             if last_exception:
                 if on_failure:
@@ -246,3 +261,24 @@ def calc_reset_time(reset_day: int, update_at: float) -> float:
 
     reset_time = datetime(year, month, reset_day, 0, 0, 0, tzinfo=TIMEZONE)
     return reset_time.timestamp()
+
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024**2, "MB": 1024**2, "G": 1024**3, "GB": 1024**3}
+
+
+def parse_byte_size(value: str) -> int:
+    """
+    解析带单位的字节数，例如 `512K`、`2M`、`1.5MB`，不带单位时按字节处理
+
+    :raise ValueError: 格式无效或为负数时
+    """
+    text = str(value).strip().upper()
+    number = text.rstrip("KMGB")
+    unit = text[len(number) :]
+    if unit not in _SIZE_UNITS or not number:
+        raise ValueError(f"无法识别的大小: {value}")
+
+    size = float(number) * _SIZE_UNITS[unit]
+    if size < 0:
+        raise ValueError("不能为负数。")
+    return int(size)
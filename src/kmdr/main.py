@@ -16,9 +16,6 @@ async def main(args: Namespace, fallback: Callable[[], None] = lambda: print("NO
         from kmdr.core.bases import (
             AUTHENTICATOR,
             CONFIGURER,
-            DOWNLOADER,
-            LISTERS,
-            PICKERS,
             POOL_MANAGER,
             SESSION_MANAGER,
         )
@@ -59,23 +56,16 @@ async def main(args: Namespace, fallback: Callable[[], None] = lambda: print("NO
             debug("搜索成功，获取到", len(books), "本漫画。")
 
     elif args.command == "download":
-        async with await SESSION_MANAGER.get(args).session():
-            from kmdr.core.utils import SharedAwaitable
-
-            authenticator = AUTHENTICATOR.get(args)
-            lister = LISTERS.get(args)
-
-            t_auth = SharedAwaitable(authenticator.authenticate())
-            t_list = lister.list(awaitable_cred=t_auth)
-
-            cred, (book, volumes) = await asyncio.gather(t_auth, t_list)
-            debug("认证成功，凭证信息: ", cred)
-            debug("获取到书籍《", book.name, "》及其", len(volumes), "个章节信息。")
+        from kmdr.core.bootstrap import get_bootstrap_cache
+        from kmdr.core.error import BootstrapExpiredError
 
-            volumes = PICKERS.get(args).pick(volumes)
-            debug("选择了", len(volumes), "个章节进行下载:", ", ".join(volume.name for volume in volumes))
-
-            await DOWNLOADER.get(args).download(cred, book, volumes)
+        try:
+            await _download(args)
+        except BootstrapExpiredError as e:
+            # 只会在下载开始前发生，清除缓存后重新探测镜像并检查登录状态
+            debug("缓存的启动信息已失效:", e)
+            await get_bootstrap_cache().invalidate()
+            await _download(args)
 
     elif args.command == "pool":
         await POOL_MANAGER.get(args).operate()
@@ -84,6 +74,33 @@ async def main(args: Namespace, fallback: Callable[[], None] = lambda: print("NO
         fallback()
 
 
+async def _download(args: Namespace) -> None:
+    from kmdr.core.bases import AUTHENTICATOR, DOWNLOADER, LISTERS, PICKERS, SESSION_MANAGER
+    from kmdr.core.bootstrap import get_bootstrap_cache
+    from kmdr.core.console import debug
+    from kmdr.core.utils import SharedAwaitable
+
+    async with await SESSION_MANAGER.get(args).session() as session:
+        authenticator = AUTHENTICATOR.get(args)
+        lister = LISTERS.get(args)
+
+        t_auth = SharedAwaitable(authenticator.authenticate())
+        t_list = lister.list(awaitable_cred=t_auth)
+
+        cred, (book, volumes) = await asyncio.gather(t_auth, t_list)
+        # 开始下载前确认缓存的启动信息仍然有效，之后的重定向（例如跳转到下载节点）不再视为缓存失效
+        bootstrap = get_bootstrap_cache()
+        await bootstrap.verify(session, cred.cookies)
+        bootstrap.confirm()
+        debug("认证成功，凭证信息: ", cred)
+        debug("获取到书籍《", book.name, "》及其", len(volumes), "个章节信息。")
+
+        volumes = PICKERS.get(args).pick(volumes)
+        debug("选择了", len(volumes), "个章节进行下载:", ", ".join(volume.name for volume in volumes))
+
+        await DOWNLOADER.get(args).download(cred, book, volumes)
+
+
 def main_sync(args: Namespace, fallback: Callable[[], None] = lambda: print("NOT IMPLEMENTED!")) -> None:
     asyncio.run(main(args, fallback))
 
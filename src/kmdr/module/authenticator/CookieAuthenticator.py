@@ -1,5 +1,6 @@
 from kmdr.core import AUTHENTICATOR, Authenticator, LoginError
-from kmdr.core.console import emit, is_interactive
+from kmdr.core.bootstrap import get_bootstrap_cache
+from kmdr.core.console import debug, emit, is_interactive
 from kmdr.core.structure import Credential
 
 
@@ -13,6 +14,9 @@ class CookieAuthenticator(Authenticator):
         else:
             self._show_quota = False
 
+        # 只有下载会使用缓存的凭证，查看状态时总是重新获取额度
+        self._use_bootstrap = kwargs.get("command") == "download"
+
     async def _authenticate(self) -> Credential:
         from .utils import check_status
 
@@ -21,6 +25,13 @@ class CookieAuthenticator(Authenticator):
         if not cookie:
             raise LoginError("无法找到 Cookie，请先完成登录。", ["kmdr login -u <username>"])
 
+        bootstrap = get_bootstrap_cache()
+        cached = bootstrap.credential(cookie) if self._use_bootstrap else None
+        if cached is not None:
+            debug("使用缓存的凭证，跳过登录状态检查")
+            emit(cached)
+            return cached
+
         cred: Credential = await check_status(
             self._session,
             self._console,
@@ -28,6 +39,7 @@ class CookieAuthenticator(Authenticator):
             cookies=cookie,
             show_quota=self._show_quota,
         )
+        await bootstrap.save_credential(cookie, cred)
 
         emit(cred)
 
@@ -4,6 +4,7 @@ from typing import Callable
 from kmdr.core import BookInfo, Credential
 from kmdr.core.bases import CATALOGERS, Cataloger
 from kmdr.core.constants import API_ROUTE
+from kmdr.core.http_cache import get_http_cache
 from kmdr.core.utils import async_retry
 
 
@@ -21,25 +22,23 @@ class FollowedCataloger(Cataloger):
     async def _list_followed_books(self, cookies: dict[str, str]) -> list[BookInfo]:
         from bs4 import BeautifulSoup
 
-        async with self._session.get(API_ROUTE.MY_FOLLOW, cookies=cookies) as response:
-            response.raise_for_status()
-            html_text = await response.text()
-
-            followed_rows = BeautifulSoup(html_text, "html.parser").find_all("tr", style="height:36px;")
-            mapped = map(lambda x: x.find_all("td"), followed_rows)
-            filtered = filter(lambda x: "書名" not in x[1].text, mapped)
-            books = list(
-                map(
-                    lambda x: BookInfo(
-                        name=x[1].text.strip(),
-                        url=x[1].find("a")["href"],
-                        author=x[2].text.strip(),
-                        status=x[-1].text.strip(),
-                        last_update=x[-2].text.strip(),
-                        id="",
-                    ),
-                    filtered,
-                )
+        page = await get_http_cache().get(self._session, API_ROUTE.MY_FOLLOW, cookies=cookies)
+
+        followed_rows = BeautifulSoup(page.text, "html.parser").find_all("tr", style="height:36px;")
+        mapped = map(lambda x: x.find_all("td"), followed_rows)
+        filtered = filter(lambda x: "書名" not in x[1].text, mapped)
+        books = list(
+            map(
+                lambda x: BookInfo(
+                    name=x[1].text.strip(),
+                    url=x[1].find("a")["href"],
+                    author=x[2].text.strip(),
+                    status=x[-1].text.strip(),
+                    last_update=x[-2].text.strip(),
+                    id="",
+                ),
+                filtered,
             )
+        )
 
         return books
@@ -2,9 +2,12 @@ import os
 from functools import wraps
 from typing import Optional
 
+from kmdr.core.connector import CONNECTOR_PROFILES
 from kmdr.core.console import info
 from kmdr.core.constants import BookFormat
 from kmdr.core.error import ValidationError
+from kmdr.core.http_cache import parse_cache_ttl
+from kmdr.core.utils import parse_byte_size
 
 __OPTIONS_VALIDATOR = {}
 
@@ -77,6 +80,28 @@ def validate_num_workers(value: str) -> Optional[int]:
         raise ValidationError(f"无效的 num_workers 值: {value}。{str(e)}", field="num_workers") from e
 
 
+@register_validator("min_workers")
+def validate_min_workers(value: str) -> Optional[int]:
+    try:
+        min_workers = int(value)
+        if min_workers <= 0:
+            raise ValueError("必须是正值。")
+        return min_workers
+    except ValueError as e:
+        raise ValidationError(f"无效的 min_workers 值: {value}。{str(e)}", field="min_workers") from e
+
+
+@register_validator("max_workers")
+def validate_max_workers(value: str) -> Optional[int]:
+    try:
+        max_workers = int(value)
+        if max_workers <= 0:
+            raise ValueError("必须是正值。")
+        return max_workers
+    except ValueError as e:
+        raise ValidationError(f"无效的 max_workers 值: {value}。{str(e)}", field="max_workers") from e
+
+
 @register_validator("dest")
 def validate_dest(value: str) -> Optional[str]:
     if not value:
@@ -126,3 +151,46 @@ def validate_format(value: str) -> Optional[str]:
     except ValueError as e:
         available_formats = ", ".join(fmt.name.lower() for fmt in BookFormat)
         raise ValidationError(f"无效的格式: {value}。可用格式：{available_formats}", field="format") from e
+
+
+@register_validator("rate_limit")
+def validate_rate_limit(value: str) -> Optional[int]:
+    try:
+        return parse_byte_size(value)
+    except ValueError as e:
+        raise ValidationError(f"无效的 rate_limit 值: {value}。{str(e)}", field="rate_limit") from e
+
+
+@register_validator("rate_burst")
+def validate_rate_burst(value: str) -> Optional[int]:
+    try:
+        return parse_byte_size(value)
+    except ValueError as e:
+        raise ValidationError(f"无效的 rate_burst 值: {value}。{str(e)}", field="rate_burst") from e
+
+
+@register_validator("connection_profile")
+def validate_connection_profile(value: str) -> Optional[str]:
+    if value not in CONNECTOR_PROFILES:
+        raise ValidationError(f"无效的连接池配置: {value}。可用配置：{', '.join(CONNECTOR_PROFILES)}", field="connection_profile")
+    return value
+
+
+@register_validator("book_meta_ttl")
+def validate_book_meta_ttl(value: str) -> Optional[int]:
+    try:
+        ttl = int(value)
+        if ttl < 0:
+            raise ValueError("不能为负数。")
+        return ttl
+    except ValueError as e:
+        raise ValidationError(f"无效的 book_meta_ttl 值: {value}。{str(e)}", field="book_meta_ttl") from e
+
+
+@register_validator("http_cache_ttl")
+def validate_http_cache_ttl(value: str) -> Optional[str]:
+    try:
+        parse_cache_ttl(value)
+    except ValueError as e:
+        raise ValidationError(f"无效的页面缓存时长: {value}。{e}", field="http_cache_ttl") from e
+    return value
@@ -36,7 +36,7 @@ class DirectDownloader(BaseDownloader):
 
         if self._disable_multi_part:
             await download_file(
-                self._session,
+                self._transfer_session,
                 self._semaphore,
                 self._progress,
                 partial(self.construct_download_url, cred, book, volume),
@@ -51,7 +51,7 @@ class DirectDownloader(BaseDownloader):
             return
 
         await download_file_multipart(
-            self._session,
+            self._transfer_session,
             self._semaphore,
             self._progress,
             partial(self.construct_download_url, cred, book, volume),
@@ -62,6 +62,7 @@ class DirectDownloader(BaseDownloader):
             callback=lambda: self._callback(book, volume) if self._callback else None,
             quota_deduct_callback=quota_deduct_callback,
             progress_callback=progress_callback,
+            size_hint=int(volume.size * 1024 * 1024) if volume.size else None,
         )
 
     def construct_download_url(self, cred: Credential, book: BookInfo, volume: VolInfo) -> str:
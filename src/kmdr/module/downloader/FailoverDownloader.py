@@ -36,12 +36,16 @@ class FailoverDownloader(BaseDownloader, CredentialPoolContext):
         if method == 2:
             from .DirectDownloader import DirectDownloader
 
-            self._delegate: BaseDownloader = DirectDownloader(num_workers=num_workers, per_cred_ratio=per_cred_ratio, *args, **kwargs)
+            self._delegate: BaseDownloader = DirectDownloader(
+                num_workers=num_workers, per_cred_ratio=per_cred_ratio, shared_concurrency=self._semaphore, *args, **kwargs
+            )
         else:
             # 默认使用 ReferViaDownloader
             from .ReferViaDownloader import ReferViaDownloader
 
-            self._delegate: BaseDownloader = ReferViaDownloader(num_workers=num_workers, per_cred_ratio=per_cred_ratio, *args, **kwargs)
+            self._delegate: BaseDownloader = ReferViaDownloader(
+                num_workers=num_workers, per_cred_ratio=per_cred_ratio, shared_concurrency=self._semaphore, *args, **kwargs
+            )
 
     async def download(self, cred: Credential, book: BookInfo, volumes: list[VolInfo]):
         with self._console.status("同步凭证池状态..."):
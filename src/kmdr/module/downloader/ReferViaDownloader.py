@@ -1,13 +1,17 @@
 import json
+import time
+from collections.abc import Awaitable
 from functools import partial
 from typing import Callable, Optional
 
 import aiohttp
 
 from kmdr.core import DOWNLOADER, BookInfo, VolInfo
+from kmdr.core.circuit import get_circuit_breakers
 from kmdr.core.console import debug
 from kmdr.core.constants import API_ROUTE
 from kmdr.core.error import QuotaExceededError
+from kmdr.core.retry import get_retry_policy
 from kmdr.core.structure import Credential
 from kmdr.core.utils import async_retry
 
@@ -23,6 +27,9 @@ DOWNLOAD_HEAD = {
     "X-Km-From": "kb_http_down",
 }
 
+QUOTA_DEDUP_WINDOW = 11 * 60 * 60
+"""同一卷在 12 小时内重复下载不会重复扣减额度，这里留出一小时的余量（秒）"""
+
 
 @DOWNLOADER.register(order=10)
 class ReferViaDownloader(BaseDownloader):
@@ -54,23 +61,20 @@ class ReferViaDownloader(BaseDownloader):
     ):
         sub_dir = readable_safe_filename(book.name)
         download_path = f"{self._dest}/{sub_dir}"
+        url_supplier = _DownloadUrlSupplier(
+            partial(self.fetch_download_url, cookies=cred.cookies, is_vip=cred.is_vip, book_id=book.id, volume_id=volume.id),
+            quota_deduct_callback,
+        )
 
         if self._disable_multi_part or (not cred.is_vip and not self._try_multi_part):
             # 2025/11: 服务器对于普通用户似乎不支持分片下载
             # 所以这里对普通用户默认使用完整下载，如果想要尝试分片下载，可以使用 --try-multi-part 参数
             # 参考 issue: https://github.com/chrisis58/kmoe-manga-downloader/issues/28
             await download_file(
-                self._session,
+                self._transfer_session,
                 self._semaphore,
                 self._progress,
-                partial(
-                    self.fetch_download_url,
-                    quota_deduct_callback,
-                    cred.cookies,
-                    cred.is_vip,
-                    book.id,
-                    volume.id,
-                ),
+                url_supplier,
                 download_path,
                 format_filename(book.name, volume.name, self._format.name.lower()),
                 self._retry,
@@ -82,26 +86,20 @@ class ReferViaDownloader(BaseDownloader):
             return
 
         await download_file_multipart(
-            self._session,
+            self._transfer_session,
             self._semaphore,
             self._progress,
-            partial(
-                self.fetch_download_url,
-                quota_deduct_callback,
-                cred.cookies,
-                cred.is_vip,
-                book.id,
-                volume.id,
-            ),
+            url_supplier,
             download_path,
             format_filename(book.name, volume.name, self._format.name.lower()),
             self._retry,
             headers=DOWNLOAD_HEAD,
             callback=lambda: self._callback(book, volume) if self._callback else None,
             progress_callback=progress_callback,
+            size_hint=int(volume.size * 1024 * 1024) if volume.size else None,
         )
 
-    @async_retry(delay=3, backoff=1.5)
+    @async_retry(policy=get_retry_policy())
     async def fetch_download_url(
         self,
         quota_deduct_callback: Optional[Callable[[bool], None]],
@@ -110,32 +108,71 @@ class ReferViaDownloader(BaseDownloader):
         book_id: str,
         volume_id: str,
     ) -> str:
-        async with self._session.get(
-            API_ROUTE.GETDOWNURL.format(
-                book_id=book_id,
-                volume_id=volume_id,
-                book_format=self._format.value,
-                is_vip=1 if (self._use_vip and is_vip) else 0,
-            ),
-            cookies=cookies,
-        ) as response:
-            response.raise_for_status()
-            quota_deduct_callback(True) if quota_deduct_callback else None
-            data = await response.text()
-            data = json.loads(data)
-            debug("获取下载链接响应数据:", data)
-            if (code := data.get("code")) != 200:
-                msg = data.get("msg", "__未知错误__")
-                debug(f"获取下载链接失败，错误码 {code}，信息: {msg}")
-
-                if "達到下載額度限制" in msg:
-                    raise QuotaExceededError(msg)
-
-                raise aiohttp.ClientResponseError(
-                    response.request_info,
-                    history=response.history,
-                    status=code,
-                    message=msg,
-                )
-
-            return data["url"]
+        breakers = get_circuit_breakers()
+        # 镜像熔断时直接失败，CircuitOpenError 不会被 async_retry 重试，由下载循环等待冷却结束
+        breakers.guard(self._base_url)
+        requested_at = time.monotonic()
+        try:
+            async with self._session.get(
+                API_ROUTE.GETDOWNURL.format(
+                    book_id=book_id,
+                    volume_id=volume_id,
+                    book_format=self._format.value,
+                    is_vip=1 if (self._use_vip and is_vip) else 0,
+                ),
+                cookies=cookies,
+            ) as response:
+                response.raise_for_status()
+                breakers.record_success(self._base_url)
+                quota_deduct_callback(True) if quota_deduct_callback else None
+                data = await response.text()
+                data = json.loads(data)
+                debug("获取下载链接响应数据:", data)
+                if (code := data.get("code")) != 200:
+                    msg = data.get("msg", "__未知错误__")
+                    debug(f"获取下载链接失败，错误码 {code}，信息: {msg}")
+
+                    if "達到下載額度限制" in msg:
+                        raise QuotaExceededError(msg)
+
+                    raise aiohttp.ClientResponseError(
+                        response.request_info,
+                        history=response.history,
+                        status=code,
+                        message=msg,
+                    )
+
+                return data["url"]
+        except Exception as e:
+            breakers.record_failure(self._base_url, e, requested_at)
+            raise
+
+
+class _DownloadUrlSupplier:
+    """
+    获取下载链接的 Supplier。
+
+    第一次获取链接时扣减额度，之后一段时间内同一卷的重复下载不会重复扣减，
+    下载引擎重试或换用其他 CDN 节点时会重新获取链接；超出这段时间后只返回已经获取的链接，避免额外消耗额度。
+    """
+
+    def __init__(self, fetch: Callable[..., Awaitable[str]], quota_deduct_callback: Optional[Callable[[bool], None]]):
+        self._fetch = fetch
+        self._quota_deduct_callback = quota_deduct_callback
+        self._url: Optional[str] = None
+        self._first_fetched_at: Optional[float] = None
+
+    async def __call__(self) -> str:
+        if self._first_fetched_at is None:
+            self._url = await self._fetch(quota_deduct_callback=self._quota_deduct_callback)
+            self._first_fetched_at = time.monotonic()
+            return self._url
+
+        if time.monotonic() - self._first_fetched_at > QUOTA_DEDUP_WINDOW:
+            debug("距离第一次获取下载链接已超过额度去重的时间，继续使用原有链接")
+            assert self._url is not None
+            return self._url
+
+        # 额度已经在第一次获取时扣减
+        self._url = await self._fetch(quota_deduct_callback=None)
+        return self._url
@@ -6,25 +6,56 @@ from typing import Callable, Optional
 from rich.prompt import Confirm
 
 from kmdr.core.bases import Downloader
-from kmdr.core.console import emit, exception, in_toolcall_mode, info, is_interactive, log
+from kmdr.core.console import debug, emit, exception, in_toolcall_mode, info, is_interactive, log
 from kmdr.core.constants import BookFormat
+from kmdr.core.defaults import Configurer as InnerConfigurer
+from kmdr.core.retry import get_retry_policy
 from kmdr.core.structure import BookInfo, Credential, VolInfo
 
+from .concurrency import ConcurrencyController, PrefetchGate, configure_concurrency
 from .download_utils import format_filename, readable_safe_filename
 from .misc import DownloadTracker, construct_callback
+from .planner import get_chunk_planner
+from .ratelimit import configure_rate_limiter
+
+RETRY_BUDGET_FACTOR = 2
+"""单次任务的总重试次数上限为 卷数 * retry * 该系数，避免服务器持续异常时任务无休止地重试"""
 
 
 class BaseDownloader(Downloader):
-    def __init__(self, dest: str = ".", format: str = "epub", callback: Optional[str] = None, retry: int = 3, num_workers: int = 8, explain: bool = False, *args, **kwargs):
+    def __init__(
+        self,
+        dest: str = ".",
+        format: str = "epub",
+        callback: Optional[str] = None,
+        retry: int = 3,
+        num_workers: int = 8,
+        explain: bool = False,
+        rate_limit: Optional[int] = None,
+        rate_burst: Optional[int] = None,
+        min_workers: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        shared_concurrency: Optional[ConcurrencyController] = None,
+        *args,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
 
         self._dest: str = dest
         self._format: BookFormat = BookFormat.from_name(format)
         self._callback: Optional[Callable] = construct_callback(callback)
         self._retry: int = retry
-        self._semaphore = asyncio.Semaphore(num_workers)
         self._explain: bool = explain
 
+        if shared_concurrency is not None:
+            # 作为其他下载器的委托时复用其并发控制，全局的并发控制与限速已经由外层下载器配置
+            self._semaphore = shared_concurrency
+        else:
+            # 并发数从 num_workers 开始，按吞吐和限流情况在 [min_workers, max_workers] 内自动调整
+            self._semaphore = configure_concurrency(num_workers, min_workers, max_workers)
+            # 限速由所有下载共享，运行中修改配置文件中的限速会立即生效
+            configure_rate_limiter(rate_limit, rate_burst, config_path=InnerConfigurer().path)
+
     async def download(self, cred: Credential, book: BookInfo, volumes: list[VolInfo]):
         if not volumes:
             info("没有可下载的卷。", style="blue")
@@ -51,10 +82,13 @@ class BaseDownloader(Downloader):
                 log(f"[red]警告：当前下载所需额度约为 {total_size:.2f} MB，当前剩余额度 {avai:.2f} MB，可能无法正常完成下载。[/red]")
 
         tracker = DownloadTracker(len(volumes))
+        retry_policy = get_retry_policy()
+        retry_policy.reset_budget(len(volumes) * max(1, self._retry) * RETRY_BUDGET_FACTOR)
         try:
             with self._progress:
+                gate = PrefetchGate()
                 tasks = [
-                    self._download(cred, book, volume, progress_callback=partial(tracker, volume=volume.name, size_mb=volume.size))
+                    self._download_gated(gate, cred, book, volume, progress_callback=partial(tracker, volume=volume.name, size_mb=volume.size))
                     for volume in volumes
                 ]
                 results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -70,6 +104,12 @@ class BaseDownloader(Downloader):
             await asyncio.sleep(0.01)
             raise
         finally:
+            # 保存本次下载积累的传输数据，供之后规划分片使用
+            get_chunk_planner().dump()
+            if retry_policy.hosts:
+                debug("各主机的重试次数:", {host: stats.retries for host, stats in retry_policy.hosts.items()})
+            debug("结束时的下载并发数:", self._semaphore.limit)
+
             # 工具调用模式下的最终汇总输出
             emit(
                 book=book.name,
@@ -79,6 +119,11 @@ class BaseDownloader(Downloader):
                 skipped=tracker.skipped,
             )
 
+    async def _download_gated(self, gate: PrefetchGate, *args, **kwargs):
+        """按顺序放行卷进入下载流程，参考 `PrefetchGate`"""
+        async with gate:
+            await self._download(*args, **kwargs)
+
     def _avai_quota(self, cred: Credential) -> float:
         """计算并返回指定 Credential 的可用额度（单位：MB）"""
         return cred.quota_remaining
@@ -0,0 +1,119 @@
+import threading
+from typing import Optional, Union
+
+from .writer import WriteTarget
+
+BUFFER_SIZE = 512 * 1024
+"""缓冲池中每个缓冲区的大小"""
+
+MIN_FILL_SIZE = 64 * 1024
+"""新连接的缓冲区写满该大小即交给写入线程，之后逐步增大到 `BUFFER_SIZE`"""
+
+MAX_FREE_BUFFERS = 32
+"""缓冲池最多保留的空闲缓冲区数量"""
+
+
+class BufferPool:
+    """
+    可复用的接收缓冲区。
+
+    缓冲区在写入线程完成写入后归还，因此 `release` 可能在写入线程中调用。
+    """
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE, max_free: int = MAX_FREE_BUFFERS):
+        self._buffer_size = buffer_size
+        self._max_free = max_free
+        self._free: list[bytearray] = []
+        self._lock = threading.Lock()
+
+    @property
+    def buffer_size(self) -> int:
+        return self._buffer_size
+
+    def acquire(self) -> bytearray:
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return bytearray(self._buffer_size)
+
+    def release(self, buffer: bytearray):
+        with self._lock:
+            if len(self._free) < self._max_free:
+                self._free.append(buffer)
+
+
+class BufferedSink:
+    """
+    将收到的数据拼接到池化的缓冲区中，攒够一定大小后整块交给写入线程。
+
+    每个缓冲区交出后直到写入完成前都不会被修改，写入完成后归还缓冲池。
+    交出的阈值从 `MIN_FILL_SIZE` 开始，每写满一次翻倍，慢连接的数据不会在内存中停留太久，
+    持续的快连接则使用尽量大的写入。
+    """
+
+    def __init__(self, target: WriteTarget, offset: int, pool: Optional[BufferPool] = None):
+        self._target = target
+        self._offset = offset
+        self._pool = pool or get_buffer_pool()
+        self._buffer: Optional[bytearray] = None
+        self._filled = 0
+        self._fill_size = min(MIN_FILL_SIZE, self._pool.buffer_size)
+
+    @property
+    def offset(self) -> int:
+        """下一个字节在文件中的位置"""
+        return self._offset + self._filled
+
+    async def feed(self, data: Union[bytes, memoryview]) -> None:
+        """
+        追加数据
+
+        :param data: 收到的数据，调用返回后即可丢弃
+        """
+        view = memoryview(data)
+        while view:
+            if self._buffer is None:
+                self._buffer = self._pool.acquire()
+
+            n = min(len(view), self._fill_size - self._filled)
+            self._buffer[self._filled : self._filled + n] = view[:n]
+            self._filled += n
+            view = view[n:]
+
+            if self._filled >= self._fill_size:
+                await self._submit()
+                self._fill_size = min(self._fill_size * 2, self._pool.buffer_size)
+
+    async def flush(self) -> None:
+        """交出未满的缓冲区，并等待所有数据写入文件"""
+        await self._submit()
+        await self._target.flush()
+
+    async def _submit(self):
+        if self._buffer is None or self._filled == 0:
+            return
+
+        buffer, filled, offset = self._buffer, self._filled, self._offset
+        self._buffer = None
+        self._filled = 0
+        self._offset += filled
+
+        await self._target.write(offset, memoryview(buffer)[:filled], on_done=lambda: self._pool.release(buffer))
+
+    async def __aenter__(self) -> "BufferedSink":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.flush()
+
+
+_POOL: Optional[BufferPool] = None
+
+
+def get_buffer_pool() -> BufferPool:
+    """惰性创建全局的缓冲池。"""
+    global _POOL
+
+    if _POOL is None:
+        _POOL = BufferPool()
+    return _POOL
@@ -0,0 +1,255 @@
+import asyncio
+import collections
+import time
+from typing import Optional, Union
+
+import aiohttp
+from aiohttp.client_exceptions import ClientPayloadError
+
+from kmdr.core.console import debug
+
+SAMPLE_INTERVAL = 2.0
+"""统计总吞吐并决定是否调整并发数的间隔（秒）"""
+
+GROWTH_THRESHOLD = 0.05
+"""总吞吐至少提升该比例，才认为增加的并发带来了收益"""
+
+DECREASE_FACTOR = 0.5
+"""遇到限流或数据中断时，并发数乘以该系数"""
+
+CONGESTION_STATUS = {429, 503}
+"""表示服务器正在限流的状态码"""
+
+PREFETCH_AHEAD = 2
+"""在并发数之外，提前获取下载链接的卷数"""
+
+
+class ConcurrencyController:
+    """
+    按 AIMD（加性增、乘性减）自动调整的并发控制，用法与 `asyncio.Semaphore` 相同。
+
+    - 所有许可都被占用，且总吞吐比上一次调整前提升时，许可数加一；
+    - 遇到 429/503 或数据中断时，许可数减半。同一统计周期内的多次拥塞只减少一次，
+      避免并发的请求同时失败时把许可数一路减到最小值。
+
+    减少许可数时不会打断已经开始的请求，只是在它们结束前不再放行新的请求。
+    """
+
+    def __init__(self, initial: int, min_workers: int = 1, max_workers: Optional[int] = None):
+        self._min = max(1, min_workers)
+        self._max = max(self._min, max_workers if max_workers is not None else initial)
+        self._limit = min(self._max, max(self._min, initial))
+
+        self._active = 0
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._saturated = False
+        """当前统计周期内是否出现过许可全部被占用的情况"""
+        self._baseline: Optional[float] = None
+        """上一次调整并发数之前的总吞吐 (bytes/s)"""
+        self._last_decrease = 0.0
+
+    def __repr__(self) -> str:
+        return f"ConcurrencyController(limit={self._limit}, active={self._active}, min={self._min}, max={self._max})"
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def available(self) -> int:
+        """当前空闲的许可数"""
+        return max(0, self._limit - self._active)
+
+    def locked(self) -> bool:
+        return self._active >= self._limit
+
+    async def acquire(self) -> bool:
+        while self._active >= self._limit:
+            self._saturated = True
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    # 已被唤醒但随即取消，把机会让给下一个等待者
+                    self._wake()
+                raise
+        self._active += 1
+        if self._active >= self._limit:
+            self._saturated = True
+        return True
+
+    def release(self) -> None:
+        self._active -= 1
+        self._wake()
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    def record_bytes(self, size: int) -> None:
+        """
+        记录收到的数据量，每个统计周期结束时检查是否增加并发数
+
+        :param size: 本次收到的字节数
+        """
+        self._window_bytes += size
+
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < SAMPLE_INTERVAL:
+            return
+
+        throughput = self._window_bytes / elapsed
+        saturated = self._saturated
+        self._window_start = now
+        self._window_bytes = 0
+        self._saturated = self._active >= self._limit
+
+        if self._baseline is None:
+            self._baseline = throughput
+            return
+
+        if saturated and self._limit < self._max and throughput > self._baseline * (1 + GROWTH_THRESHOLD):
+            self._set_limit(self._limit + 1, f"总吞吐 {_format_speed(self._baseline)} -> {_format_speed(throughput)}")
+            self._baseline = throughput
+        elif not saturated:
+            # 并发没有用满时的吞吐不能说明并发数的影响，只跟踪当前水平
+            self._baseline = throughput
+
+    def record_error(self, exception: BaseException) -> None:
+        """
+        记录请求失败，限流或数据中断时减少并发数
+
+        :param exception: 请求失败的异常
+        """
+        if not is_congestion(exception):
+            return
+
+        now = time.monotonic()
+        if now - self._last_decrease < SAMPLE_INTERVAL:
+            return
+        self._last_decrease = now
+
+        self._set_limit(max(self._min, int(self._limit * DECREASE_FACTOR)), f"遇到 {type(exception).__name__}: {exception}")
+        # 降低并发后的吞吐重新作为比较的基准
+        self._baseline = None
+        self._window_start = now
+        self._window_bytes = 0
+        self._saturated = False
+
+    def _set_limit(self, limit: int, reason: str):
+        if limit == self._limit:
+            return
+        debug("调整下载并发数:", self._limit, "->", limit, "，原因:", reason)
+        self._limit = limit
+        self._wake()
+
+    def _wake(self):
+        free = self._limit - self._active
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+class PrefetchGate:
+    """
+    限制同时进入下载流程的卷数为 当前并发数 + `ahead`。
+
+    进入的卷会立即获取下载链接，再等待并发许可，因此空出的许可可以立刻开始传输，
+    而不用先等待获取链接的请求；同时只有少数几个卷会提前获取链接（获取链接时即扣减额度）。
+    """
+
+    def __init__(self, ahead: int = PREFETCH_AHEAD):
+        self._ahead = ahead
+        self._active = 0
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+
+    def __repr__(self) -> str:
+        return f"PrefetchGate(active={self._active}, capacity={self.capacity})"
+
+    @property
+    def capacity(self) -> int:
+        # 并发数会自动调整，每次检查时重新读取
+        return get_concurrency_controller().limit + self._ahead
+
+    async def __aenter__(self) -> None:
+        while self._active >= self.capacity:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    self._wake()
+                raise
+        self._active += 1
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._active -= 1
+        self._wake()
+
+    def _wake(self):
+        free = self.capacity - self._active
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+def is_congestion(exception: BaseException) -> bool:
+    """判断异常是否说明服务器过载或正在限流"""
+    if isinstance(exception, aiohttp.ClientResponseError):
+        return exception.status in CONGESTION_STATUS
+    return isinstance(exception, ClientPayloadError)
+
+
+def _format_speed(value: float) -> str:
+    return f"{value / 1024 / 1024:.2f} MB/s"
+
+
+Limiter = Union[asyncio.Semaphore, ConcurrencyController]
+"""下载函数接受的并发限制，固定的信号量或自动调整的并发控制"""
+
+_CONTROLLER: Optional[ConcurrencyController] = None
+
+
+def get_concurrency_controller() -> ConcurrencyController:
+    """全局的并发控制，未配置时使用默认的 8 个并发。"""
+    global _CONTROLLER
+
+    if _CONTROLLER is None:
+        _CONTROLLER = ConcurrencyController(8)
+    return _CONTROLLER
+
+
+def configure_concurrency(num_workers: int, min_workers: Optional[int] = None, max_workers: Optional[int] = None) -> ConcurrencyController:
+    """
+    设置全局的并发控制
+
+    :param num_workers: 初始的并发数
+    :param min_workers: 自动调整的下限，默认为 1
+    :param max_workers: 自动调整的上限，默认为初始并发数，即只会在限流时降低并发，需要显式指定才会超过 `num_workers`
+    """
+    global _CONTROLLER
+
+    _CONTROLLER = ConcurrencyController(
+        num_workers,
+        min_workers=min_workers or 1,
+        max_workers=max_workers or num_workers,
+    )
+    debug("下载并发控制:", _CONTROLLER)
+    return _CONTROLLER
@@ -1,50 +1,48 @@
 import asyncio
+import glob
 import math
 import os
 import re
-import shutil
+import time
 from collections.abc import Awaitable
 from typing import Callable, Optional, Union
 
-import aiofiles
 import aiofiles.os as aio_os
 import aiohttp
 from aiohttp.client_exceptions import ClientPayloadError
 from rich.progress import Progress
 from typing_extensions import deprecated
 
+from kmdr.core.circuit import get_circuit_breakers
+from kmdr.core.connector import get_connection_warmer
 from kmdr.core.console import debug, info, is_interactive, log
-from kmdr.core.error import QuotaExceededError, RangeNotSupportedError
-from kmdr.core.utils import async_retry, sanitize_headers
-
-from .misc import STATUS, StateManager
+from kmdr.core.error import CircuitOpenError, QuotaExceededError, RangeNotSupportedError
+from kmdr.core.retry import RetryState, get_retry_policy
+from kmdr.core.utils import sanitize_headers
+
+from .buffers import BufferedSink
+from .concurrency import ConcurrencyController, Limiter, get_concurrency_controller
+from .misc import STATUS, PartRange, ProgressCounter, RangeScheduler, ResumeSidecar, StateManager
+from .planner import get_chunk_planner
+from .ratelimit import get_rate_limiter
+from .resolver import UrlResolver, UrlSource, get_host_speeds
+from .stall import MAX_STALL_RESTARTS, StreamWatch, get_stall_monitor, read_timeout
+from .writer import get_disk_writer
 
 CONTENT_RANGE_PATTERN = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", re.IGNORECASE)
 """用于解析 Content-Range 头的正则表达式模式。"""
 
-BLOCK_SIZE_REDUCTION_FACTOR = 0.75
-MIN_BLOCK_SIZE = 2048
 EMIT_SIZE_INTERVAL = 10 * 1024 * 1024  # 10MB
-
-_HEAD_SEMAPHORE_VALUE = 3
-_HEAD_SEMAPHORE: Optional[asyncio.Semaphore] = None
-"""定义的用于 HEAD 请求的信号量，限制并发数量以避免触发服务器限流。"""
-
-
-def _get_head_request_semaphore() -> asyncio.Semaphore:
-    """惰性初始化 HEAD 请求信号量。"""
-    global _HEAD_SEMAPHORE
-
-    if _HEAD_SEMAPHORE is None:
-        _HEAD_SEMAPHORE = asyncio.Semaphore(_HEAD_SEMAPHORE_VALUE)
-    return _HEAD_SEMAPHORE
+SIDECAR_SAVE_INTERVAL = 4 * 1024 * 1024  # 4MB
+MIN_CIRCUIT_WAIT = 0.5
+"""主机熔断时两次检查之间的最短等待时间（秒）"""
 
 
 async def download_file(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
+    semaphore: Limiter,
     progress: Progress,
-    url: Union[str, Callable[[], str], Callable[[], Awaitable[str]]],
+    url: Union[UrlSource, UrlResolver],
     dest_path: str,
     filename: str,
     retry_times: int = 3,
@@ -62,7 +60,7 @@ async def download_file(
     :param session: aiohttp.ClientSession 对象
     :param semaphore: 控制并发的信号量
     :param progress: 进度条对象
-    :param url: 下载链接或者其 Supplier
+    :param url: 下载链接或者其 Supplier，重试或连接停滞时会重新调用 Supplier
     :param dest_path: 目标路径
     :param filename: 文件名
     :param retry_times: 重试次数
@@ -91,15 +89,18 @@ async def download_file(
 
     log("开始下载文件:", filename, "到路径:", dest_path)
 
-    block_size = 8192
     attempts_left = retry_times + 1
-    last_emit_size = 0
+    stall_restarts = 0
+    retry_state = get_retry_policy().start()
+    resolver = url if isinstance(url, UrlResolver) else UrlResolver(url)
 
     if progress_callback:
         progress_callback(status="downloading")
 
     while attempts_left > 0:
         attempts_left -= 1
+        watch: Optional[StreamWatch] = None
+        requested_at: Optional[float] = None
 
         resume_from = (await aio_os.stat(filename_downloading)).st_size if resumable and await aio_os.path.exists(filename_downloading) else 0
 
@@ -108,11 +109,20 @@ async def download_file(
             headers["Range"] = f"bytes={resume_from}-"
 
         try:
+            # 等待并发许可前先获取下载链接并预热连接，许可空出后可以立即开始传输
+            url = await resolver.get()
+            get_connection_warmer().warm(session, url)
             async with semaphore:
-                url = await fetch_url(url)  # 对 url 重新赋值，以对其结果进行缓存
-                async with session.get(url=url, headers=headers, cookies=cookies) as r:
+                # 等待期间链接可能已经过期
+                url = await resolver.get()
+                get_circuit_breakers().guard(url)
+                requested_at = time.monotonic()
+                async with session.get(url=url, headers=headers, cookies=cookies, timeout=read_timeout()) as r:
                     r.raise_for_status()
+                    get_circuit_breakers().record_success(url)
+                    resolver.mark_used()
                     quota_deduct_callback(True) if quota_deduct_callback else None
+                    headers_at = time.monotonic()
 
                     total_size_in_bytes = int(r.headers.get("content-length", 0)) + resume_from
 
@@ -132,28 +142,38 @@ async def download_file(
                             status=STATUS.DOWNLOADING.value,
                         )
 
-                    mode = "ab" if resumable and resume_from > 0 else "wb"
-                    debug("下载文件:", filename, "使用模式:", mode, "，起始位置:", resume_from)
-                    async with aiofiles.open(filename_downloading, mode) as f:
-                        async for chunk in r.content.iter_chunked(block_size):
-                            if chunk:
-                                await f.write(chunk)
-                                progress.update(task_id, advance=len(chunk))
-                                if not is_interactive() and total_size_in_bytes > 0:
-                                    # 获取当前进度条状态作为实际已下载字节数
-                                    # NOTE: rich.progress.Progress.tasks 返回 list[Task]，TaskID 作为索引使用。
-                                    # 若有 task 被 remove_task() 删除，list 长度减少可能导致 IndexError。
-                                    # 但当前下载函数的生命周期内不会 remove task，故安全。
-                                    task = progress.tasks[task_id] if task_id is not None else None
-                                    completed = task.completed if task else 0
-                                    if completed - last_emit_size > EMIT_SIZE_INTERVAL:
-                                        if progress_callback:
-                                            progress_callback(
-                                                status="downloading",
-                                                percentage=round(completed / total_size_in_bytes * 100, 1),
-                                            )
-                                        log(filename, "下载进度:", round(completed / total_size_in_bytes * 100, 1), "%")
-                                        last_emit_size = completed
+                    truncate = not (resumable and resume_from > 0)
+                    debug("下载文件:", filename, "清空已有内容:", truncate, "，起始位置:", resume_from)
+
+                    def emit_percentage(percentage: float):
+                        if progress_callback:
+                            progress_callback(status="downloading", percentage=percentage)
+                        log(filename, "下载进度:", percentage, "%")
+
+                    counter = ProgressCounter(
+                        progress,
+                        task_id,
+                        completed=resume_from,
+                        total=total_size_in_bytes,
+                        on_emit=None if is_interactive() else emit_percentage,
+                        emit_interval=EMIT_SIZE_INTERVAL,
+                    )
+                    async with counter:
+                        async with await get_disk_writer().open(filename_downloading, truncate=truncate) as f, BufferedSink(f, resume_from) as sink:
+                            with get_stall_monitor().watch(r.close) as watch:
+                                # iter_any 按到达的数据返回，不再切分为固定大小的小块
+                                async for chunk in r.content.iter_any():
+                                    if chunk:
+                                        await get_rate_limiter().acquire(len(chunk))
+                                        await sink.feed(chunk)
+                                        counter.add(len(chunk))
+                                        watch.add(len(chunk))
+                                        get_concurrency_controller().record_bytes(len(chunk))
+                            if watch.stalled:
+                                raise ClientPayloadError("连接停滞")
+
+                    get_chunk_planner().record_transfer(total_size_in_bytes - resume_from, headers_at - requested_at, time.monotonic() - headers_at)
+                    get_host_speeds().record(url, total_size_in_bytes - resume_from, time.monotonic() - headers_at)
 
             await aio_os.rename(filename_downloading, file_path)
             break
@@ -169,16 +189,30 @@ async def download_file(
             raise e
 
         except Exception as e:
-            if attempts_left > 0:
+            # 换一个节点可能更快，下一次尝试时重新获取下载链接
+            resolver.invalidate(url)
+
+            if watch is not None and watch.stalled:
+                # 停滞的连接不是服务器的故障，立即从当前位置重新请求
+                # 不能续传时会从头开始，每次都会停滞在同一位置的服务器仍需消耗重试次数
+                log("连接停滞，重新连接:", filename)
+                get_host_speeds().record(url, watch.received, watch.elapsed)
+                if resumable and watch.received > 0 and stall_restarts < MAX_STALL_RESTARTS:
+                    stall_restarts += 1
+                    attempts_left += 1
+                if attempts_left > 0:
+                    continue
+
+            if isinstance(e, CircuitOpenError):
+                # 请求没有发出，不消耗重试次数
+                attempts_left += 1
+            wait = _next_retry_delay(retry_state, e, url, requested_at) if attempts_left > 0 else None
+            if wait is not None:
                 log("正在重试... 剩余重试次数:", attempts_left)
-                debug("下载出错:", e, "，正在重试... 剩余重试次数:", attempts_left)
+                debug("下载出错:", e, "，", round(wait, 1), "秒后重试... 剩余重试次数:", attempts_left)
                 if task_id is not None:
                     progress.update(task_id, status=STATUS.RETRYING.value)
-                if isinstance(e, ClientPayloadError):
-                    new_block_size = max(int(block_size * BLOCK_SIZE_REDUCTION_FACTOR), MIN_BLOCK_SIZE)
-                    if new_block_size < block_size:
-                        block_size = new_block_size
-                await asyncio.sleep(3)
+                await asyncio.sleep(wait)
             else:
                 if task_id is not None:
                     progress.update(task_id, status=STATUS.FAILED.value)
@@ -200,9 +234,9 @@ async def download_file(
 
 async def download_file_multipart(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
+    semaphore: Limiter,
     progress: Progress,
-    url: Union[str, Callable[[], str], Callable[[], Awaitable[str]]],
+    url: Union[UrlSource, UrlResolver],
     dest_path: str,
     filename: str,
     retry_times: int = 3,
@@ -212,9 +246,15 @@ async def download_file_multipart(
     callback: Optional[Callable] = None,
     quota_deduct_callback: Optional[Callable[[bool], None]] = None,
     progress_callback: Optional[Callable[..., None]] = None,
+    size_hint: Optional[int] = None,
 ):
     """
-    下载文件
+    分片下载文件
+
+    各个分片直接写入预分配的 `*.mp.downloading` 文件中对应的偏移位置，下载完成后只需重命名，无需合并。
+    续传所需的分片进度记录在 `*.mp.state` 中。
+
+    不再单独探测文件大小：第一个分片直接以范围请求开始下载，从其 Content-Range 中得到文件大小后再规划其余分片。
 
     :param session: aiohttp.ClientSession 对象
     :param semaphore: 控制并发的信号量
@@ -223,17 +263,42 @@ async def download_file_multipart(
     :param dest_path: 目标路径
     :param filename: 文件名
     :param retry_times: 重试次数
+    :param chunk_size_mb: 第一个分片的大小，以及没有历史数据时的基础分片大小（MB）
     :param headers: 请求头
     :param cookies: 请求的 cookies
     :param callback: 下载完成后的回调函数
     :param quota_deduct_callback: 流量配额扣减回调函数,参数为是否实际扣减
     :param progress_callback: 进度回调函数
+    :param size_hint: 预先得知的大致文件大小（字节），用于规划第一个分片，规划结果为单个分片时直接使用普通下载
     """
     if headers is None:
         headers = {}
 
     file_path = os.path.join(dest_path, filename)
     filename_downloading = f"{file_path}.mp.downloading"
+    sidecar_path = f"{file_path}.mp.state"
+
+    first_range_size = chunk_size_mb * 1024 * 1024
+    if size_hint and size_hint > 0:
+        first_range_size = _plan_chunk_size(size_hint, semaphore, chunk_size_mb)
+        if first_range_size >= size_hint and not await aio_os.path.exists(sidecar_path):
+            # 小文件分片没有收益，省去续传日志和预分配，直接流式下载
+            debug("文件较小，使用普通下载:", filename, "，预计大小:", size_hint)
+            await download_file(
+                session=session,
+                semaphore=semaphore,
+                progress=progress,
+                url=url,
+                dest_path=dest_path,
+                filename=filename,
+                retry_times=retry_times,
+                cookies=cookies,
+                headers=headers,
+                callback=callback,
+                quota_deduct_callback=quota_deduct_callback,
+                progress_callback=progress_callback,
+            )
+            return
 
     if not await aio_os.path.exists(dest_path):
         await aio_os.makedirs(dest_path, exist_ok=True)
@@ -245,98 +310,63 @@ async def download_file_multipart(
             progress_callback(status="skipped")
         return
 
+    if not await aio_os.path.exists(sidecar_path):
+        # 旧版本按分片保存的临时文件无法续传，开始新的下载时一并清理
+        await _remove_legacy_parts(file_path)
+
     log("开始下载文件:", filename)
     if progress_callback:
         progress_callback(status="downloading")
 
-    part_paths = []
-    part_expected_sizes = []
-    task_id = None
-
-    state_manager: Optional[StateManager] = None
+    task_id = progress.add_task(
+        "download",
+        filename=filename,
+        status=STATUS.WAITING.value,
+        total=None,
+    )
+    state_manager: Optional[StateManager] = StateManager(progress=progress, task_id=task_id, progress_callback=progress_callback)
+    resolver = url if isinstance(url, UrlResolver) else UrlResolver(url)
     try:
-        async with _get_head_request_semaphore():
-            # 获取文件信息，请求以获取文件大小
-            # 控制并发，避免过多并发请求触发服务器限流
-            url = await fetch_url(url)  # 对 url 重新赋值，以对其结果进行缓存
-            total_size = await _fetch_content_length(
-                session,
-                url,
-                headers=headers,
-                cookies=cookies,
-                quota_deduct_callback=quota_deduct_callback,
-            )
-
-        chunk_size = determine_chunk_size(file_size=total_size, base_chunk_mb=chunk_size_mb)
-        num_chunks = math.ceil(total_size / chunk_size)
-
-        tasks = []
-
-        resumed_size = 0
-        for i in range(num_chunks):
-            part_path = os.path.join(dest_path, f"{filename}.mp.{i + 1:03d}.downloading")
-            part_paths.append(part_path)
-            if await aio_os.path.exists(part_path):
-                resumed_size += (await aio_os.stat(part_path)).st_size
-
-        task_id = progress.add_task(
-            "download",
-            filename=filename,
-            status=STATUS.WAITING.value,
-            total=total_size,
-            completed=resumed_size,
+        get_connection_warmer().warm(session, await resolver.get())
+        options = dict(
+            session=session,
+            semaphore=semaphore,
+            resolver=resolver,
+            file_path=filename_downloading,
+            sidecar_path=sidecar_path,
+            state_manager=state_manager,
+            first_range_size=first_range_size,
+            chunk_size_mb=chunk_size_mb,
+            cookies=cookies,
+            headers=headers,
+            retry_times=retry_times,
+            quota_deduct_callback=quota_deduct_callback,
         )
-        state_manager = StateManager(progress=progress, task_id=task_id, progress_callback=progress_callback)
-
-        for i, start in enumerate(range(0, total_size, chunk_size)):
-            end = min(start + chunk_size - 1, total_size - 1)
-            part_expected_sizes.append(end - start + 1)
-
-            task = _download_part(
-                session=session,
-                semaphore=semaphore,
-                url=url,
-                start=start,
-                end=end,
-                part_path=part_paths[i],
-                state_manager=state_manager,
-                cookies=cookies,
-                headers=headers,
-                retry_times=retry_times,
-            )
-            tasks.append(task)
-
-        await asyncio.gather(*tasks)
+        try:
+            sidecar = await _download_ranges(**options)
+        except _JournalMismatch:
+            debug("续传日志与服务器上的文件不一致，重新下载:", filename)
+            await _remove_files(filename_downloading, sidecar_path)
+            sidecar = await _download_ranges(**options)
 
-        assert len(part_paths) == len(part_expected_sizes)
-        results = await asyncio.gather(*[asyncio.to_thread(_sync_validate_part, part_paths[i], part_expected_sizes[i]) for i in range(num_chunks)])
-        if all(results):
-            await state_manager.request_status_update(part_id=StateManager.PARENT_ID, status=STATUS.MERGING)
-            await asyncio.to_thread(_sync_merge_parts, part_paths, filename_downloading)
+        if sidecar.done:
             await aio_os.rename(filename_downloading, file_path)
+            await sidecar.remove()
         else:
-            # 如果有任何一个分片校验失败，则视为下载失败
+            # 如果有任何一个分片未能完成，则视为下载失败，保留续传状态以便下次继续
             await state_manager.request_status_update(part_id=StateManager.PARENT_ID, status=STATUS.FAILED)
 
     except RangeNotSupportedError:
         # 尝试清理临时文件
         state_manager = None
-        cleanup_tasks = []
-        for part_path in part_paths:
-            if await aio_os.path.exists(part_path):
-                cleanup_tasks.append(aio_os.remove(part_path))
-        if await aio_os.path.exists(filename_downloading):
-            cleanup_tasks.append(aio_os.remove(filename_downloading))
-
-        if cleanup_tasks:
-            await asyncio.gather(*cleanup_tasks)
+        await _remove_files(filename_downloading, sidecar_path)
 
         debug("服务器不支持分片下载，使用普通下载方式")
         await download_file(
             session=session,
             semaphore=semaphore,
             progress=progress,
-            url=url,
+            url=resolver,
             dest_path=dest_path,
             filename=filename,
             retry_times=retry_times,
@@ -349,181 +379,495 @@ async def download_file_multipart(
 
     finally:
         if await aio_os.path.exists(file_path):
-            if task_id is not None and state_manager is not None:
+            if state_manager is not None:
                 await state_manager.request_status_update(part_id=StateManager.PARENT_ID, status=STATUS.COMPLETED)
                 if progress_callback:
                     # 故障转移时，state_manager 会被置为 None，避免了重复调用
                     progress_callback(status="completed")
 
-            cleanup_tasks = [aio_os.remove(p) for p in part_paths if await aio_os.path.exists(p)]
-            if cleanup_tasks:
-                await asyncio.gather(*cleanup_tasks)
             if callback:
                 callback()
         else:
-            if task_id is not None and state_manager is not None:
+            if state_manager is not None:
                 await state_manager.request_status_update(part_id=StateManager.PARENT_ID, status=STATUS.FAILED)
                 if progress_callback:
                     # 故障转移时，state_manager 会被置为 None，避免了重复调用
                     progress_callback(status="failed")
 
 
-@async_retry()
-async def _fetch_content_length(
+class _JournalMismatch(Exception):
+    """续传日志记录的文件大小或标识与服务器返回的不一致"""
+
+
+async def _download_ranges(
     session: aiohttp.ClientSession,
-    url: str,
-    cookies: Optional[dict] = None,
-    headers: Optional[dict] = None,
-    quota_deduct_callback: Optional[Callable[[bool], None]] = None,
-) -> int:
+    semaphore: Limiter,
+    resolver: UrlResolver,
+    file_path: str,
+    sidecar_path: str,
+    state_manager: StateManager,
+    first_range_size: int,
+    chunk_size_mb: int,
+    cookies: Optional[dict],
+    headers: dict,
+    retry_times: int,
+    quota_deduct_callback: Optional[Callable[[bool], None]],
+) -> ResumeSidecar:
     """
-    获取文件的内容长度（字节数）
+    下载所有分片，返回最终的续传日志
 
-    :note: 这个请求完成后，服务器就会记录这次下载，并消耗对应的流量配额，详细的规则请参考网站说明：
-    - 注 1 : 訂閱連載中的漫畫，有更新時自動推送的卷(冊)，暫不計算在使用額度中，不扣減使用額度。
-    - 注 2 : 對同一卷(冊)書在 12 小時內重複*下載*，不會重複扣減額度。但重復推送是會扣減的。
+    有续传日志时从第一个未完成的分片开始，否则先请求文件开头的 `first_range_size` 字节。
+    第一个分片收到响应头后才能确定文件大小，此时再规划并启动其余分片。
 
-    :param session: aiohttp.ClientSession 对象
-    :param url: 文件 URL
-    :param headers: 请求头
-    :param cookies: 请求的 cookies
-    :return: 文件大小（字节数）
+    :raise _JournalMismatch: 续传日志已经过期
     """
-    if headers is None:
-        headers = {}
+    sidecar: Optional[ResumeSidecar] = None
+    if await aio_os.path.exists(file_path):
+        sidecar = await asyncio.to_thread(ResumeSidecar.load, sidecar_path)
 
-    probe_headers = headers.copy()
-    probe_headers["Range"] = "bytes=0-0"
+    if sidecar is not None:
+        damaged = await asyncio.to_thread(sidecar.verify, file_path)
+        debug("从续传日志恢复分片下载:", file_path, "，已完成", sidecar.written, "字节，校验失败的分片:", damaged)
 
-    async with session.get(url, cookies=cookies, headers=probe_headers, allow_redirects=True) as response:
-        # 普通下载链接可能不支持 HEAD 请求，尝试使用 GET 请求获取文件大小
-        # see: https://github.com/chrisis58/kmoe-manga-downloader/issues/25
-        response.raise_for_status()
-        quota_deduct_callback(True) if quota_deduct_callback else None
+        first = next((p for p in sidecar.ranges if not p.done), None)
+        if first is None:
+            quota_deduct_callback(False) if quota_deduct_callback else None
+            state_manager.set_total(total=sidecar.written, completed=sidecar.written)
+            return sidecar
+    else:
+        first = PartRange(start=0, end=first_range_size - 1)
+        sidecar = ResumeSidecar(sidecar_path, None, [first])
 
-        debug("请求响应状态码:", response.status)
-        debug("请求头:", sanitize_headers(response.request_info.headers))
-        debug("响应头:", sanitize_headers(response.headers))
+    resumed_size = sidecar.written
+    started_at = time.monotonic()
+    headers_ready = asyncio.Event()
 
-        if "Content-Range" not in response.headers:
-            raise RangeNotSupportedError("响应头中缺少 Content-Range。")
+    async def on_first_response(response: aiohttp.ClientResponse):
+        """
+        从第一个分片的响应中得到文件大小，规划其余的分片
 
-        cr = response.headers["Content-Range"]
-        start, end, total_size = resolve_content_range(cr)
+        :note: 这个请求完成后，服务器就会记录这次下载，并消耗对应的流量配额，详细的规则请参考网站说明：
+        - 注 1 : 訂閱連載中的漫畫，有更新時自動推送的卷(冊)，暫不計算在使用額度中，不扣減使用額度。
+        - 注 2 : 對同一卷(冊)書在 12 小時內重複*下載*，不會重複扣減額度。但重復推送是會扣減的。
+        """
+        debug("响应头:", sanitize_headers(response.headers))
 
-        # fmt: off
-        debug("解析 Content-Range:", cr, "得到 start:", start, "end:", end, "total_size:", total_size)
-        # fmt: on
+        cr = response.headers.get("Content-Range")
+        if cr is None:
+            raise RangeNotSupportedError("响应头中缺少 Content-Range。")
 
+        start, _, total_size = resolve_content_range(cr)
+        debug("解析 Content-Range:", cr, "得到 start:", start, "total_size:", total_size)
         if total_size is None:
             raise RangeNotSupportedError("服务器未提供完整的文件大小信息。", content_range=cr)
-
-        if start != 0 or end != 0:
+        if start != first.start + first.written:
             raise RangeNotSupportedError("服务器不支持范围请求，无法进行分片下载。", content_range=cr)
 
-        return total_size
+        quota_deduct_callback(True) if quota_deduct_callback else None
+        identity = _resource_identity(response)
+
+        if sidecar.total_size is not None:
+            if sidecar.total_size != total_size or (identity and sidecar.identity and identity != sidecar.identity):
+                raise _JournalMismatch()
+        else:
+            # 第一个分片仍占用着一个并发
+            chunk_size = _plan_chunk_size(total_size, semaphore, chunk_size_mb, occupied=1)
+            # 超出第一个分片的数据不会被写入，读到分片末尾时直接关闭连接
+            first.end = min(first.end, chunk_size - 1, total_size - 1)
+            for start in range(first.end + 1, total_size, chunk_size):
+                sidecar.append(PartRange(start=start, end=min(start + chunk_size - 1, total_size - 1)))
+            sidecar.bind(total_size, identity)
+            await asyncio.to_thread(_sync_preallocate, file_path, total_size)
+            await sidecar.save()
+
+        state_manager.set_total(total=total_size, completed=sidecar.written)
+        headers_ready.set()
+
+    scheduler = RangeScheduler(sidecar)
+    options = dict(
+        session=session,
+        semaphore=semaphore,
+        resolver=resolver,
+        file_path=file_path,
+        sidecar=sidecar,
+        state_manager=state_manager,
+        cookies=cookies,
+        headers=headers,
+        retry_times=retry_times,
+    )
+
+    first_task = asyncio.ensure_future(_download_part_worker(scheduler=scheduler, part=first, on_response=on_first_response, **options))
+    tasks = [first_task]
+    try:
+        ready_waiter = asyncio.ensure_future(headers_ready.wait())
+        try:
+            await asyncio.wait({first_task, ready_waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            ready_waiter.cancel()
+
+        if headers_ready.is_set():
+            tasks += [
+                asyncio.create_task(_download_part_worker(scheduler=scheduler, part=part, **options))
+                for part in sidecar.ranges
+                if part is not first and not part.done
+            ]
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # 任何一个分片失败（例如需要回退到普通下载）时，其他分片必须停止写入文件和续传日志
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        await state_manager.close()
+
+    if sidecar.done:
+        get_chunk_planner().record_volume(sidecar.written - resumed_size, time.monotonic() - started_at)
+    return sidecar
+
+
+def _next_retry_delay(retry_state: RetryState, error: Exception, url: Optional[str], requested_at: Optional[float]) -> Optional[float]:
+    """
+    记录一次失败，并计算重试前的等待时间，重试预算用尽时返回 None
+
+    主机熔断时不按退避规则等待，而是等到可以再次发送请求时重试；
+    此时下载链接已经失效，重新获取的链接可能换到其他节点。
+
+    :param error: 请求失败的异常
+    :param url: 失败的下载链接
+    :param requested_at: 请求发出的时间，请求没有发出时为 None
+    """
+    if isinstance(error, CircuitOpenError):
+        # 熔断的可能是下载节点，也可能是获取下载链接的镜像
+        return max(error.retry_in, MIN_CIRCUIT_WAIT)
+
+    breakers = get_circuit_breakers()
+    breakers.record_failure(url, error, requested_at)
+    get_concurrency_controller().record_error(error)
+    if breakers.is_open(url):
+        return max(breakers.retry_in(url), MIN_CIRCUIT_WAIT)
+    return retry_state.next_delay(error, url)
+
+
+async def _remove_files(*paths: str):
+    for path in paths:
+        if await aio_os.path.exists(path):
+            await aio_os.remove(path)
+
+
+async def _remove_legacy_parts(file_path: str):
+    """删除旧版本分片下载遗留的 `*.mp.001.downloading` 等分片文件"""
+    prefix, suffix = f"{file_path}.mp.", ".downloading"
+    paths = await asyncio.to_thread(glob.glob, f"{glob.escape(prefix)}*{suffix}")
+    legacy = [path for path in paths if path[len(prefix) : -len(suffix)].isdigit()]
+    if legacy:
+        debug("删除旧版本的分片文件:", legacy)
+        await _remove_files(*legacy)
+
+
+def _resource_identity(response: aiohttp.ClientResponse) -> Optional[str]:
+    """返回响应中可以标识文件版本的 ETag 或 Last-Modified。"""
+    return response.headers.get("ETag") or response.headers.get("Last-Modified")
+
+
+async def _download_part_worker(
+    scheduler: RangeScheduler,
+    part: PartRange,
+    on_response: Optional[Callable[[aiohttp.ClientResponse], Awaitable[None]]] = None,
+    **kwargs,
+):
+    """
+    负责下载一个分片，完成后继续从调度器中窃取其他连接尚未下载的范围。
+
+    :param scheduler: 当前文件的分片调度器
+    :param part: 初始分配的分片
+    :param on_response: 仅用于初始分片，参考 `_download_part`
+    :param kwargs: 传递给 `_download_part` 的其他参数
+    """
+    current: Optional[PartRange] = part
+    while current is not None:
+        current.owned = True
+        try:
+            if current.hedge_of is not None:
+                await _hedge_part(part=current, scheduler=scheduler, **kwargs)
+            else:
+                await _download_part(part=current, scheduler=scheduler, on_response=on_response, **kwargs)
+        finally:
+            scheduler.release(current)
+        on_response = None
+
+        if not current.done:
+            # 分片失败时不再接手其他范围
+            return
+
+        current = await scheduler.steal()
 
 
 async def _download_part(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
-    url: str,
-    start: int,
-    end: int,
-    part_path: str,
+    semaphore: Limiter,
+    resolver: UrlResolver,
+    part: PartRange,
+    file_path: str,
+    sidecar: ResumeSidecar,
     state_manager: StateManager,
     cookies: Optional[dict] = None,
     headers: Optional[dict] = None,
     retry_times: int = 3,
+    scheduler: Optional[RangeScheduler] = None,
+    on_response: Optional[Callable[[aiohttp.ClientResponse], Awaitable[None]]] = None,
 ):
+    """
+    下载单个分片，并将数据直接写入预分配文件中对应的偏移位置。
+
+    :param resolver: 下载链接，重试或连接停滞时可能换用其他节点
+    :param part: 分片的字节范围及其已写入的进度
+    :param file_path: 预分配的目标文件路径
+    :param sidecar: 续传状态，写入一定数据后会刷新到磁盘
+    :param scheduler: 分片调度器，分片开始接收数据后通知其检查能否拆分
+    :param on_response: 第一次收到部分内容的响应后、写入文件前调用，用于从响应头中得到文件大小
+    """
     if headers is None:
         headers = {}
 
     local_headers = headers.copy()
-    block_size = 8192
     attempts_left = retry_times + 1
+    stall_restarts = 0
+    retry_state = get_retry_policy().start()
 
     while attempts_left > 0:
         attempts_left -= 1
+        watch: Optional[StreamWatch] = None
+        url: Optional[str] = None
+        requested_at: Optional[float] = None
 
         try:
-            resume_from = (await aio_os.path.getsize(part_path)) if await aio_os.path.exists(part_path) else 0
-
-            if resume_from >= (end - start + 1):
+            if part.done:
                 return
+            url = await resolver.get()
 
-            current_start = start + resume_from
-            local_headers["Range"] = f"bytes={current_start}-{end}"
+            current_start = part.start + part.written
+            local_headers["Range"] = f"bytes={current_start}-{part.end}"
 
             async with semaphore:
-                debug("开始下载分片:", os.path.basename(part_path), "范围:", current_start, "-", end)
-                async with session.get(url, cookies=cookies, headers=local_headers) as response:
+                url = await resolver.get()
+                get_circuit_breakers().guard(url)
+                debug("开始下载分片:", str(part), "范围:", current_start, "-", part.end)
+                requested_at = time.monotonic()
+                async with session.get(url, cookies=cookies, headers=local_headers, timeout=read_timeout()) as response:
                     response.raise_for_status()
-                    await state_manager.request_status_update(part_id=start, status=STATUS.DOWNLOADING)
-
-                    async with aiofiles.open(part_path, "ab") as f:
-                        async for chunk in response.content.iter_chunked(block_size):
-                            if chunk:
-                                await f.write(chunk)
-                                state_manager.advance(len(chunk))
-                await state_manager.pop_part(part_id=start)
-                log("分片", os.path.basename(part_path), "下载完成。")
+                    get_circuit_breakers().record_success(url)
+                    resolver.mark_used()
+                    headers_at = time.monotonic()
+                    if response.status != 206:
+                        # 按偏移写入的前提是服务器严格按照范围返回数据
+                        raise RangeNotSupportedError("分片请求未返回部分内容。", content_range=response.headers.get("Content-Range"))
+                    if on_response is not None:
+                        await on_response(response)
+                        on_response = None
+
+                    identity = _resource_identity(response)
+                    if sidecar.identity and identity and identity != sidecar.identity:
+                        # 文件已经变化，已下载的分片不能再使用，按照不支持分片的方式重新下载整个文件
+                        raise RangeNotSupportedError("文件在下载过程中发生变化。", content_range=response.headers.get("Content-Range"))
+                    await state_manager.request_status_update(part_id=part.start, status=STATUS.DOWNLOADING)
+
+                    async with await get_disk_writer().open(file_path) as f:
+                        sink = BufferedSink(f, current_start)
+                        unsaved = 0
+                        part.begin_stream(abort=response.close)
+                        if scheduler is not None:
+                            scheduler.notify()
+                        watch = get_stall_monitor().watch(response.close)
+                        try:
+                            async for chunk in response.content.iter_any():
+                                if chunk:
+                                    # 分片可能已被拆分，只写入仍属于当前分片的部分
+                                    # 限速等待前先占用这部分范围，避免等待期间被拆分或对冲请求接管
+                                    size = min(len(chunk), part.remaining)
+                                    part.pending = size
+                                    await get_rate_limiter().acquire(size)
+                                    size = min(size, part.remaining)
+                                    part.pending = size
+                                    data = memoryview(chunk)[:size]
+                                    await sink.feed(data)
+                                    part.update(data)
+                                    part.streamed += size
+                                    part.pending = 0
+                                    state_manager.advance(size)
+                                    watch.add(size)
+                                    get_concurrency_controller().record_bytes(size)
+
+                                    unsaved += size
+                                    if unsaved >= SIDECAR_SAVE_INTERVAL:
+                                        await sink.flush()
+                                        part.checkpoint()
+                                        await sidecar.save()
+                                        unsaved = 0
+
+                                    if part.done:
+                                        break
+                        finally:
+                            get_stall_monitor().unwatch(watch)
+                            part.end_stream()
+                            await sink.flush()
+                            part.checkpoint()
+                            await sidecar.save()
+
+                if not part.done:
+                    raise ClientPayloadError(f"分片数据不完整: 期望 {part.size} 字节，实际 {part.written} 字节")
+
+                get_chunk_planner().record_transfer(part.end - current_start + 1, headers_at - requested_at, time.monotonic() - headers_at)
+                get_host_speeds().record(url, part.end - current_start + 1, time.monotonic() - headers_at)
+                await state_manager.pop_part(part_id=part.start)
+                log("分片", str(part), "下载完成。")
             return
 
-        except (RangeNotSupportedError, QuotaExceededError):
+        except (RangeNotSupportedError, QuotaExceededError, _JournalMismatch):
             raise
 
         except asyncio.CancelledError:
             # 如果任务被取消，更新状态为已取消
-            await state_manager.request_status_update(part_id=start, status=STATUS.CANCELLED)
+            await state_manager.request_status_update(part_id=part.start, status=STATUS.CANCELLED)
             raise
 
         except Exception as e:
-            if attempts_left > 0:
-                debug("分片", os.path.basename(part_path), "下载出错:", e, "，正在重试... 剩余重试次数:", attempts_left)
-                await state_manager.request_status_update(part_id=start, status=STATUS.WAITING)
-                await asyncio.sleep(3)
+            if part.done:
+                # 剩余部分已由对冲请求接管，连接被主动中断
+                await state_manager.pop_part(part_id=part.start)
+                log("分片", str(part), "下载完成。")
+                return
+
+            resolver.invalidate(url)
+            if watch is not None and watch.stalled:
+                # 停滞的连接不是服务器的故障，立即从已写入的位置重新请求
+                debug("分片", str(part), "连接停滞，重新连接")
+                get_host_speeds().record(url, watch.received, watch.elapsed)
+                if watch.received > 0 and stall_restarts < MAX_STALL_RESTARTS:
+                    stall_restarts += 1
+                    attempts_left += 1
+                if attempts_left > 0:
+                    continue
+
+            if isinstance(e, CircuitOpenError):
+                # 请求没有发出，不消耗重试次数
+                attempts_left += 1
+            wait = _next_retry_delay(retry_state, e, url, requested_at) if attempts_left > 0 else None
+            if wait is not None:
+                debug("分片", str(part), "下载出错:", e, "，", round(wait, 1), "秒后重试... 剩余重试次数:", attempts_left)
+                await state_manager.request_status_update(part_id=part.start, status=STATUS.WAITING)
+                await asyncio.sleep(wait)
             else:
-                # console.print(f"[red]分片 {os.path.basename(part_path)} 下载失败: {e}[/red]")
-                debug("分片", os.path.basename(part_path), "下载失败:", e)
-                await state_manager.request_status_update(part_id=start, status=STATUS.PARTIALLY_FAILED)
+                # console.print(f"[red]分片 {part} 下载失败: {e}[/red]")
+                debug("分片", str(part), "下载失败:", e)
+                await state_manager.request_status_update(part_id=part.start, status=STATUS.PARTIALLY_FAILED)
 
 
-def _sync_validate_part(part_path: str, expected_size: int) -> bool:
+async def _hedge_part(
+    session: aiohttp.ClientSession,
+    semaphore: Limiter,
+    resolver: UrlResolver,
+    part: PartRange,
+    file_path: str,
+    sidecar: ResumeSidecar,
+    state_manager: StateManager,
+    scheduler: RangeScheduler,
+    cookies: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    retry_times: int = 3,
+):
     """
-    使用同步的 IO 来验证分片文件的完整性。
+    为慢分片的剩余部分发起对冲请求。
 
-    :param part_path: 分片文件路径
-    :param expected_size: 预期的文件大小
-    :return: 如果文件大小匹配则返回 True，否则返回 False
-    :note: 这个函数应该在线程池中运行。
-    :usage: await asyncio.to_thread(_sync_validate_part, part_path, expected_size)
+    数据先缓存在内存中，只有在原分片之前收齐时才接管剩余部分并写入文件；
+    原分片先完成时直接放弃，不会重复写入。对冲请求失败不影响原分片，因此不做重试。
+
+    :param part: 对冲请求的分片，`hedge_of` 为原分片
     """
-    if not os.path.exists(part_path):
-        return False
-    actual_size = os.path.getsize(part_path)
-    return actual_size == expected_size
+    victim = part.hedge_of
+    assert victim is not None
+
+    local_headers = (headers or {}).copy()
+    local_headers["Range"] = f"bytes={part.start}-{part.end}"
+    requested_from = part.start
+    buffer = bytearray()
+
+    try:
+        url = await resolver.get()
+        async with semaphore:
+            if victim.unclaimed <= 0 or get_circuit_breakers().is_open(url):
+                return
+
+            async with session.get(url, cookies=cookies, headers=local_headers, timeout=read_timeout()) as response:
+                response.raise_for_status()
+                if response.status != 206:
+                    return
+
+                part.begin_stream()
+                async for chunk in response.content.iter_any():
+                    if victim.unclaimed <= 0:
+                        debug("原分片", str(victim), "已先完成，放弃对冲请求")
+                        return
+                    await get_rate_limiter().acquire(len(chunk))
+                    buffer += chunk
+                    part.streamed += len(chunk)
+                    if len(buffer) >= part.size:
+                        break
+                part.end_stream()
+
+        if len(buffer) < part.size:
+            return
+
+        takeover_at = scheduler.commit_hedge(part)
+        if takeover_at is None:
+            return
+
+        data = memoryview(buffer)[takeover_at - requested_from : takeover_at - requested_from + part.size]
+        async with await get_disk_writer().open(file_path) as f:
+            await f.write(takeover_at, data)
+        part.update(data)
+        part.checkpoint()
+        state_manager.advance(part.size)
+        await sidecar.save()
+        log("分片", str(part), "由对冲请求下载完成。")
 
+    except asyncio.CancelledError:
+        raise
 
-def _sync_merge_parts(part_paths: list[str], final_path: str):
+    except Exception as e:
+        debug("分片", str(victim), "的对冲请求失败:", e)
+
+    finally:
+        part.end_stream()
+
+
+def _plan_chunk_size(file_size: int, semaphore: Limiter, chunk_size_mb: int, occupied: int = 0) -> int:
+    """优先使用分片规划器，缺少历史数据时回退到固定的分片策略。"""
+    return get_chunk_planner().plan(file_size, free_slots=_free_slots(semaphore) + occupied) or determine_chunk_size(
+        file_size=file_size, base_chunk_mb=chunk_size_mb
+    )
+
+
+def _free_slots(semaphore: Limiter) -> int:
+    """返回信号量当前空闲的许可数。"""
+    if isinstance(semaphore, ConcurrencyController):
+        return max(1, semaphore.available)
+    # asyncio.Semaphore 没有公开剩余的许可数，这里读取其内部计数
+    return max(1, getattr(semaphore, "_value", 1))
+
+
+def _sync_preallocate(file_path: str, size: int):
     """
-    使用同步的 IO 来合并文件。
+    使用同步的 IO 预分配目标文件。
 
-    :param part_paths: 分片文件路径列表
-    :param final_path: 最终合并后的文件路径
-    :note: 这个函数应该在线程池中运行。
-    :usage: await asyncio.to_thread(_sync_merge_parts, part_paths, final_path)
+    :param file_path: 目标文件路径
+    :param size: 文件大小（字节）
+    :note: 仅通过 truncate 设置文件长度，不写入填充数据，避免在网络存储上产生额外写入。
+    :usage: await asyncio.to_thread(_sync_preallocate, file_path, size)
     """
-    debug("合并分片到最终文件:", final_path)
-    try:
-        with open(final_path, "wb") as final_file:
-            for part_path in part_paths:
-                with open(part_path, "rb") as part_file:
-                    shutil.copyfileobj(part_file, final_file)
-    except Exception as e:
-        if os.path.exists(final_path):
-            os.remove(final_path)
-        raise e
+    debug("预分配文件:", file_path, "大小:", size)
+    with open(file_path, "wb") as f:
+        f.truncate(size)
 
 
 def determine_chunk_size(
@@ -535,11 +879,7 @@ def determine_chunk_size(
     """
     计算合适的分片大小以优化下载性能。
 
-    TODO: 这个算法可以进一步优化，例如考虑网络状况、服务器限制等因素。10 这个魔法数字也许可以调整。
-    需要收集更多的信息：
-    - 文件大小的分布
-    - 用户的下载速度分布
-    - 连接开销的大致值
+    仅在分片规划器缺少历史传输数据时使用，参考 `planner.ChunkPlanner`。
 
     :param file_size: 文件总大小（字节）
     :param base_chunk_mb: 基础分片大小 (MB)
@@ -616,29 +956,6 @@ def format_filename(book_name: str, volume_name: str, file_format: str) -> str:
     return readable_safe_filename(f"[Kmoe][{book_name}][{volume_name}].{file_format}")
 
 
-async def fetch_url(
-    url: Union[str, Callable[[], str], Callable[[], Awaitable[str]]],
-) -> str:
-    """
-    获取下载链接的包装函数，支持直接传入字符串或异步/同步的 Supplier 函数。
-
-    :note: 不包含重试机制，调用方需自行处理。
-    :param url: 下载链接或其 Supplier
-    :return: 下载链接
-    """
-
-    if callable(url):
-        result = url()
-        if asyncio.iscoroutine(result) or isinstance(result, Awaitable):
-            # 如果 url() 是一个异步函数，等待它
-            return await result
-        # 如果 url() 是一个同步函数，直接返回
-        return result
-    elif isinstance(url, str):
-        # 如果 url 只是个字符串，直接返回
-        return url
-
-
 def resolve_content_range(
     content_range_header: Optional[str],
 ) -> tuple[int, int, Optional[int]]:
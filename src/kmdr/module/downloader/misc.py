@@ -1,10 +1,16 @@
 import asyncio
+import os
+import statistics
 import subprocess
+import time
+import zlib
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Callable, Optional
 
 from rich.progress import Progress, TaskID
 
+from kmdr.core.cache import read_json, write_json
 from kmdr.core.console import debug, emit_progress, in_toolcall_mode
 from kmdr.core.structure import BookInfo, VolInfo
 
@@ -65,7 +71,6 @@ class STATUS(Enum):
     WAITING = "[blue]等待中[/blue]"
     RETRYING = "[yellow]重试中[/yellow]"
     DOWNLOADING = "[cyan]下载中[/cyan]"
-    MERGING = "[magenta]合并中[/magenta]"
     COMPLETED = "[green]完成[/green]"
     PARTIALLY_FAILED = "[red]分片失败[/red]"
     FAILED = "[red]失败[/red]"
@@ -77,11 +82,10 @@ class STATUS(Enum):
             STATUS.WAITING: 1,
             STATUS.RETRYING: 2,
             STATUS.DOWNLOADING: 3,
-            STATUS.MERGING: 4,
-            STATUS.COMPLETED: 5,
-            STATUS.PARTIALLY_FAILED: 6,
-            STATUS.FAILED: 7,
-            STATUS.CANCELLED: 8,
+            STATUS.COMPLETED: 4,
+            STATUS.PARTIALLY_FAILED: 5,
+            STATUS.FAILED: 6,
+            STATUS.CANCELLED: 7,
         }
         return order_mapping[self]
 
@@ -91,6 +95,89 @@ class STATUS(Enum):
         return self.order < other.order
 
 
+PROGRESS_FLUSH_INTERVAL = 0.25
+"""进度刷新到进度条的间隔（秒）"""
+
+
+class ProgressCounter:
+    """
+    累计收到的字节数，定时刷新到进度条和进度回调。
+
+    接收数据时只增加计数，不直接操作 `rich.progress.Progress`，也不需要查询任务列表，
+    刷新所需的已完成字节数由计数器自己维护。
+    """
+
+    def __init__(
+        self,
+        progress: Progress,
+        task_id: TaskID,
+        completed: int = 0,
+        total: Optional[int] = None,
+        on_emit: Optional[Callable[[float], None]] = None,
+        emit_interval: int = 10 * 1024 * 1024,
+        flush_interval: float = PROGRESS_FLUSH_INTERVAL,
+    ):
+        """
+        :param completed: 进度条中已完成的字节数
+        :param total: 总字节数
+        :param on_emit: 每完成 `emit_interval` 字节调用一次，参数为完成的百分比
+        """
+        self._progress = progress
+        self._task_id = task_id
+        self._completed = completed
+        self._total = total
+        self._unflushed = 0
+        self._on_emit = on_emit
+        self._emit_interval = emit_interval
+        self._last_emit_size = completed
+        self._flush_interval = flush_interval
+        self._flusher: Optional[asyncio.Task] = None
+
+    def add(self, size: int):
+        self._unflushed += size
+        if self._flusher is None:
+            self._flusher = asyncio.get_running_loop().create_task(self._run())
+
+    def flush(self):
+        if self._unflushed:
+            self._progress.update(self._task_id, advance=self._unflushed)
+            self._completed += self._unflushed
+            self._unflushed = 0
+
+        if self._on_emit and self._total and self._completed - self._last_emit_size > self._emit_interval:
+            self._on_emit(round(self._completed / self._total * 100, 1))
+            self._last_emit_size = self._completed
+
+    def reset(self, completed: int, total: Optional[int]):
+        """重新设置已完成和总字节数，尚未刷新的计数会被丢弃"""
+        self._progress.update(self._task_id, completed=completed, total=total)
+        self._completed = self._last_emit_size = completed
+        self._total = total
+        self._unflushed = 0
+
+    async def close(self):
+        """停止定时刷新，并写入剩余的进度"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            self.flush()
+
+    async def __aenter__(self) -> "ProgressCounter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
 class StateManager:
     def __init__(
         self,
@@ -98,31 +185,37 @@ class StateManager:
         task_id: TaskID,
         progress_callback: Optional[Callable[..., None]] = None,
         emit_interval: int = 10 * 1024 * 1024,
+        completed: int = 0,
+        total: Optional[int] = None,
     ):
         self._part_states: dict[int, STATUS] = {}
         self._progress = progress
         self._task_id = task_id
         self._current_status = STATUS.WAITING
         self._progress_callback = progress_callback
-        self._emit_interval = emit_interval
-        self._last_emit_size = 0
+        self._counter = ProgressCounter(
+            progress,
+            task_id,
+            completed=completed,
+            total=total,
+            on_emit=(lambda percentage: progress_callback(status="downloading", percentage=percentage)) if progress_callback else None,
+            emit_interval=emit_interval,
+        )
 
         self._lock = asyncio.Lock()
 
     PARENT_ID: int = -1
 
     def advance(self, advance: int):
-        self._progress.update(self._task_id, advance=advance)
-        if self._progress_callback:
-            # NOTE: rich.progress.Progress.tasks 返回 list[Task]，TaskID 作为索引使用。
-            # 若有 task 被 remove_task() 删除，list 长度减少可能导致 IndexError。
-            # 但当前场景中 StateManager 的生命周期内不会 remove task，故安全。
-            task = self._progress.tasks[self._task_id]
-            total = task.total
-            if total is not None and total > 0:
-                if task.completed - self._last_emit_size > self._emit_interval:
-                    self._progress_callback(status="downloading", percentage=round(task.completed / total * 100, 1))
-                    self._last_emit_size = task.completed
+        self._counter.add(advance)
+
+    def set_total(self, total: int, completed: int):
+        """得知文件大小后更新进度条"""
+        self._counter.reset(completed=completed, total=total)
+
+    async def close(self):
+        """写入剩余的进度，应在所有分片结束后调用"""
+        await self._counter.close()
 
     def _update_status(self):
         if not self._part_states:
@@ -149,3 +242,395 @@ class StateManager:
             self._part_states[part_id] = status
             self._update_status()
 
+
+@dataclass
+class PartRange:
+    """
+    分片的字节范围（闭区间）及其写入进度
+    """
+
+    start: int
+    end: int
+
+    written: int = 0
+    """已写入目标文件的字节数"""
+
+    persisted: int = 0
+    """已刷新到磁盘、可以记录到续传状态中的字节数"""
+
+    pending: int = 0
+    """正在写入、尚未计入 written 的字节数"""
+
+    owned: bool = False
+    """是否已有任务负责下载该分片"""
+
+    streaming: bool = False
+    """是否正在通过连接接收数据"""
+
+    streamed: int = 0
+    """本次连接接收的字节数"""
+
+    streamed_at: float = 0.0
+    """本次连接开始接收数据的时间"""
+
+    hedged: bool = False
+    """是否已有对冲请求在下载剩余部分"""
+
+    hedge_of: Optional["PartRange"] = field(default=None, repr=False)
+    """对冲请求所对应的原分片，仅对冲请求的分片会设置"""
+
+    abort: Optional[Callable[[], None]] = field(default=None, repr=False)
+    """中断当前连接"""
+
+    crc: int = 0
+    """已写入数据的 CRC32，随写入滚动更新"""
+
+    persisted_crc: int = 0
+    """与 `persisted` 对应的 CRC32"""
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.size - self.written)
+
+    @property
+    def unclaimed(self) -> int:
+        """尚未被写入操作占用的字节数，只有这部分可以被拆分出去"""
+        return max(0, self.size - self.written - self.pending)
+
+    @property
+    def queued(self) -> bool:
+        """已分配给任务，但还在等待建立连接"""
+        return self.owned and not self.streaming and not self.done
+
+    @property
+    def claimed_end(self) -> int:
+        """已写入或正在写入的数据之后的第一个字节"""
+        return self.start + self.written + self.pending
+
+    def update(self, data) -> None:
+        """记录新写入的数据"""
+        self.crc = zlib.crc32(data, self.crc)
+        self.written += len(data)
+
+    def checkpoint(self) -> None:
+        """数据已刷新到文件后调用，更新可以记录到续传状态中的进度"""
+        self.persisted = self.written
+        self.persisted_crc = self.crc
+
+    def reset(self) -> None:
+        self.written = self.persisted = 0
+        self.crc = self.persisted_crc = 0
+
+    def begin_stream(self, abort: Optional[Callable[[], None]] = None):
+        self.streaming = True
+        self.streamed = 0
+        self.streamed_at = time.monotonic()
+        self.abort = abort
+
+    def end_stream(self):
+        self.streaming = False
+        self.pending = 0
+        self.abort = None
+
+    @property
+    def speed(self) -> Optional[float]:
+        """本次连接的平均速度 (bytes/s)"""
+        elapsed = time.monotonic() - self.streamed_at
+        if self.streamed_at <= 0 or elapsed <= 0:
+            return None
+        return self.streamed / elapsed
+
+    @property
+    def done(self) -> bool:
+        return self.written >= self.size
+
+    def __str__(self) -> str:
+        return f"[{self.start}-{self.end}]"
+
+
+class ResumeSidecar:
+    """
+    分片下载的续传日志。
+
+    分片数据直接写入预分配的目标文件，续传所需的分片范围和进度则记录在旁路的小文件中。
+    仅记录已经刷新到磁盘的进度，进程中途退出时不会把缓冲区中丢失的数据当作已下载。
+
+    每个分片同时记录已持久化数据的 CRC32，以及服务器返回的文件标识（ETag 或 Last-Modified）。
+    恢复时逐个分片校验，只有损坏的分片需要重新下载；文件标识变化时整个续传日志作废。
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: str, total_size: Optional[int], ranges: list[PartRange], identity: Optional[str] = None):
+        self._path = path
+        self._total_size = total_size
+        self._ranges = ranges
+        self._identity = identity
+        self._lock = asyncio.Lock()
+
+    @property
+    def ranges(self) -> list[PartRange]:
+        return self._ranges
+
+    @property
+    def total_size(self) -> Optional[int]:
+        """文件大小，收到第一个响应前为 None"""
+        return self._total_size
+
+    @property
+    def identity(self) -> Optional[str]:
+        """服务器上文件的标识，未提供时为 None"""
+        return self._identity
+
+    def bind(self, total_size: int, identity: Optional[str] = None):
+        """记录从第一个响应中得到的文件大小和标识"""
+        self._total_size = total_size
+        self._identity = identity
+
+    @property
+    def written(self) -> int:
+        return sum(p.written for p in self._ranges)
+
+    def append(self, part: PartRange):
+        self._ranges.append(part)
+
+    @property
+    def done(self) -> bool:
+        return all(p.done for p in self._ranges)
+
+    @classmethod
+    def load(cls, path: str, total_size: Optional[int] = None, identity: Optional[str] = None) -> Optional["ResumeSidecar"]:
+        """
+        从磁盘读取续传日志，文件缺失、损坏或与当前文件的大小、标识不一致时返回 None。
+
+        :param total_size: 当前文件的大小，为 None 时使用日志中记录的大小
+        :param identity: 当前文件的标识，双方都有标识时才会比较
+        :note: 这个函数应该在线程池中运行。
+        """
+        data = read_json(path)
+        if data is None:
+            return None
+
+        try:
+            recorded_size = data["total_size"]
+            if not isinstance(recorded_size, int) or (total_size is not None and recorded_size != total_size):
+                debug("续传日志与文件大小不一致，忽略:", path)
+                return None
+
+            recorded_identity = data.get("identity")
+            if identity and recorded_identity and identity != recorded_identity:
+                debug("服务器上的文件已经变化，忽略续传日志:", path)
+                return None
+
+            ranges = []
+            for entry in data["ranges"]:
+                if len(entry) == 4:
+                    start, end, persisted, crc = entry
+                else:
+                    # 旧格式没有校验和，无法确认数据是否完整，只保留分片范围
+                    (start, end, _), persisted, crc = entry, 0, 0
+                ranges.append(PartRange(start=start, end=end, written=persisted, persisted=persisted, crc=crc, persisted_crc=crc))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            debug("无法读取续传日志:", path, e)
+            return None
+
+        return cls(path, recorded_size, ranges, identity=identity or recorded_identity)
+
+    def verify(self, data_path: str) -> int:
+        """
+        校验目标文件中各分片已持久化的数据，校验失败的分片会被重置
+
+        :param data_path: 预分配的目标文件路径
+        :return: 校验失败的分片数量
+        :note: 这个函数应该在线程池中运行。
+        """
+        damaged = 0
+        with open(data_path, "rb") as f:
+            for part in self._ranges:
+                if part.persisted <= 0:
+                    continue
+
+                f.seek(part.start)
+                crc, left = 0, part.persisted
+                while left > 0:
+                    block = f.read(min(left, 1024 * 1024))
+                    if not block:
+                        break
+                    crc = zlib.crc32(block, crc)
+                    left -= len(block)
+
+                if left > 0 or crc != part.persisted_crc:
+                    debug("分片", str(part), "校验失败，将重新下载")
+                    part.reset()
+                    damaged += 1
+        return damaged
+
+    async def save(self):
+        async with self._lock:
+            data = {
+                "version": self.VERSION,
+                "total_size": self._total_size,
+                "identity": self._identity,
+                "ranges": [[p.start, p.end, p.persisted, p.persisted_crc] for p in self._ranges],
+            }
+            await asyncio.to_thread(write_json, self._path, data)
+
+    async def remove(self):
+        async with self._lock:
+            if os.path.exists(self._path):
+                await asyncio.to_thread(os.remove, self._path)
+
+
+MIN_SPLIT_SIZE = 1024 * 1024
+"""拆分后每一半的最小字节数，过小的范围重新建立连接并不划算"""
+
+STEAL_POLL_INTERVAL = 1.0
+"""空闲连接等待分片状态变化的最长时间（秒）"""
+
+HEDGE_TAIL_PARTS = 2
+"""剩余未完成的分片不超过该数量时才考虑对冲请求"""
+
+HEDGE_SPEED_RATIO = 0.3
+"""分片速度低于其他分片速度中位数的该比例时视为慢连接"""
+
+HEDGE_MIN_ELAPSED = 2.0
+"""连接接收数据超过该时长（秒）后，其速度才足以作为判断依据"""
+
+HEDGE_MAX_BYTES = 2 * MIN_SPLIT_SIZE
+"""对冲请求的数据先缓存在内存中，剩余数据超过该大小时应拆分而不是对冲"""
+
+
+class RangeScheduler:
+    """
+    分片的工作窃取调度。
+
+    连接完成自己的分片后，如果没有仍在排队的分片，就把正在下载、剩余最多的分片从未占用的部分一分为二：
+    原连接只继续下载前半部分，后半部分作为新的分片交给空闲的连接重新请求。
+
+    剩余数据太少不值得拆分时，如果只剩最后一两个分片且其中有明显慢于其他分片的连接，
+    则为其剩余部分发起对冲请求，由先完成的一方写入。
+    """
+
+    def __init__(self, sidecar: ResumeSidecar, min_split_size: int = MIN_SPLIT_SIZE):
+        self._sidecar = sidecar
+        self._min_split_size = min_split_size
+        self._changed = asyncio.Event()
+        self._speeds: list[float] = []
+
+    async def steal(self) -> Optional[PartRange]:
+        """
+        为空闲的连接拆分出新的分片，或者为慢分片创建对冲请求
+
+        在其他连接仍在下载时持续等待可拆分的机会。
+
+        :return: 新的分片，对冲请求会设置 `hedge_of`；所有分片都已结束时返回 None
+        """
+        while True:
+            changed = self._changed
+            stolen = await self._try_split()
+            if stolen is not None:
+                return stolen
+
+            hedge = self._try_hedge()
+            if hedge is not None:
+                return hedge
+
+            if not any(p.owned and not p.done for p in self._sidecar.ranges):
+                return None
+
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=STEAL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def notify(self):
+        """分片开始接收数据或被释放时调用，唤醒等待拆分的空闲连接"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def release(self, part: PartRange):
+        """任务结束对分片的下载，记录完成分片的速度"""
+        part.owned = False
+        if part.done and (speed := part.speed) is not None and part.streamed > 0:
+            self._speeds.append(speed)
+        self.notify()
+
+    def _try_hedge(self) -> Optional[PartRange]:
+        unfinished = [p for p in self._sidecar.ranges if p.owned and not p.done]
+        if not unfinished or len(unfinished) > HEDGE_TAIL_PARTS or not self._speeds:
+            return None
+
+        median_speed = statistics.median(self._speeds)
+        now = time.monotonic()
+        candidates = [
+            p
+            for p in unfinished
+            if p.streaming
+            and not p.hedged
+            and p.hedge_of is None
+            and 0 < p.unclaimed <= HEDGE_MAX_BYTES
+            and now - p.streamed_at >= HEDGE_MIN_ELAPSED
+            and (p.speed or 0.0) < median_speed * HEDGE_SPEED_RATIO
+        ]
+        if not candidates:
+            return None
+
+        victim = min(candidates, key=lambda p: p.speed or 0.0)
+        victim.hedged = True
+
+        debug("分片", str(victim), "速度", int(victim.speed or 0), "B/s 远低于中位数", int(median_speed), "B/s，发起对冲请求")
+        return PartRange(start=victim.claimed_end, end=victim.end, owned=True, hedge_of=victim)
+
+    def commit_hedge(self, hedge: PartRange) -> Optional[int]:
+        """
+        对冲请求先完成时，从原分片中接管尚未占用的剩余部分
+
+        :param hedge: 对冲请求的分片
+        :return: 接管部分的起始位置，原分片已先完成时返回 None
+        :note: 检查与修改分片边界之间不能有 await，否则原分片可能在此期间继续写入
+        """
+        victim = hedge.hedge_of
+        assert victim is not None
+
+        takeover_at = victim.claimed_end
+        if takeover_at > victim.end:
+            return None
+
+        # 与拆分相同，原分片只保留已经占用的数据
+        hedge.start = takeover_at
+        hedge.end = victim.end
+        hedge.hedge_of = None
+        victim.end = takeover_at - 1
+        self._sidecar.append(hedge)
+
+        if victim.abort is not None:
+            victim.abort()
+
+        debug("对冲请求先完成，接管分片", str(hedge), "，原分片", str(victim))
+        return takeover_at
+
+    async def _try_split(self) -> Optional[PartRange]:
+        ranges = self._sidecar.ranges
+        if any(p.queued for p in ranges):
+            # 还有分片在等待连接，空闲的并发会先交给它们
+            return None
+
+        candidates = [p for p in ranges if p.streaming and not p.hedged and p.unclaimed >= 2 * self._min_split_size]
+        if not candidates:
+            return None
+
+        victim = max(candidates, key=lambda p: p.unclaimed)
+
+        # 拆分点必须位于已占用的数据之后，避免同一字节被两个连接写入
+        split_at = victim.end - victim.unclaimed // 2 + 1
+        stolen = PartRange(start=split_at, end=victim.end, owned=True)
+        victim.end = split_at - 1
+        self._sidecar.append(stolen)
+
+        debug("拆分分片", str(victim), "，新分片", str(stolen))
+        await self._sidecar.save()
+        return stolen
@@ -0,0 +1,158 @@
+import math
+from typing import Optional
+
+from kmdr.core.cache import cache_path, read_json, write_json
+from kmdr.core.console import debug
+
+HISTORY_FILENAME = "chunk_planner.json"
+
+EWMA_ALPHA = 0.2
+"""新样本在滑动平均中的权重"""
+
+AGGREGATE_DECAY = 0.95
+"""总吞吐上限的衰减系数，使过时的峰值逐渐失效"""
+
+MIN_SAMPLES = 3
+"""历史样本数达到该值后才使用吞吐模型，否则回退到固定的分片策略"""
+
+MIN_SAMPLE_BYTES = 256 * 1024
+"""过小的传输受握手影响太大，不计入吞吐样本"""
+
+MIN_CHUNK_SIZE = 512 * 1024
+
+
+class ChunkPlanner:
+    """
+    根据历史传输数据规划分片数量和大小。
+
+    记录每个连接的吞吐、首字节时间（包含建立连接的开销）以及单卷的总吞吐，
+    并以此估算不同分片数下的完成时间，选择耗时最短的方案。历史数据保存在本地缓存中，跨运行持续修正。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._dirty = False
+
+        data = (read_json(path) if path else None) or {}
+        self._throughput: Optional[float] = data.get("throughput")
+        """单连接吞吐 (bytes/s)"""
+        self._ttfb: Optional[float] = data.get("ttfb")
+        """单次请求从发出到收到响应头的耗时 (s)"""
+        self._aggregate: Optional[float] = data.get("aggregate")
+        """单卷能达到的总吞吐上限 (bytes/s)"""
+        self._samples: int = data.get("samples", 0)
+
+    def __repr__(self) -> str:
+        return f"ChunkPlanner(throughput={self._throughput}, ttfb={self._ttfb}, aggregate={self._aggregate}, samples={self._samples})"
+
+    @property
+    def ready(self) -> bool:
+        return self._samples >= MIN_SAMPLES and bool(self._throughput) and self._ttfb is not None
+
+    @property
+    def ttfb(self) -> Optional[float]:
+        """单次请求的首字节时间（秒），历史数据不足时为 None"""
+        return self._ttfb if self.ready else None
+
+    def record_transfer(self, size: int, ttfb: float, duration: float) -> None:
+        """
+        记录一次连接的传输情况
+
+        :param size: 传输的字节数
+        :param ttfb: 发出请求到收到响应头的耗时（秒）
+        :param duration: 收到响应头到传输结束的耗时（秒）
+        """
+        if size < MIN_SAMPLE_BYTES or duration <= 0:
+            return
+
+        self._throughput = _ewma(self._throughput, size / duration)
+        self._ttfb = _ewma(self._ttfb, max(0.0, ttfb))
+        self._samples += 1
+        self._dirty = True
+
+    def record_volume(self, size: int, elapsed: float) -> None:
+        """
+        记录一个分片下载的卷整体的吞吐
+
+        :param size: 本次下载的字节数
+        :param elapsed: 总耗时（秒）
+        """
+        if size < MIN_SAMPLE_BYTES or elapsed <= 0:
+            return
+
+        observed = size / elapsed
+        self._aggregate = observed if self._aggregate is None else max(self._aggregate * AGGREGATE_DECAY, observed)
+        self._dirty = True
+
+    def estimate(self, file_size: int, num_chunks: int, free_slots: int) -> float:
+        """估算按指定分片数下载的完成时间（秒）"""
+        assert self._throughput and self._ttfb is not None
+
+        parallel = max(1, min(num_chunks, free_slots))
+        waves = math.ceil(num_chunks / parallel)
+        bandwidth = parallel * self._throughput
+        if self._aggregate:
+            bandwidth = min(bandwidth, self._aggregate)
+
+        return waves * self._ttfb + file_size / bandwidth
+
+    def plan(self, file_size: int, free_slots: int, max_chunks_limit: int = 100) -> Optional[int]:
+        """
+        选择预计完成时间最短的分片大小
+
+        :param file_size: 文件总大小（字节）
+        :param free_slots: 当前空闲的并发数
+        :param max_chunks_limit: 限制的最大分片数
+        :return: 分片大小（字节），历史数据不足时返回 None
+        """
+        if not self.ready or file_size <= 0:
+            return None
+
+        max_chunks = max(1, min(max_chunks_limit, file_size // MIN_CHUNK_SIZE))
+
+        # 分片数相同时的耗时相同，优先选择分片更少的方案
+        best = min(range(1, max_chunks + 1), key=lambda n: (self.estimate(file_size, n, free_slots), n))
+        chunk_size = math.ceil(file_size / best)
+
+        debug("分片规划:", file_size, "字节，空闲并发", free_slots, "，选择", best, "个分片，每片", chunk_size, "字节")
+        return chunk_size
+
+    def dump(self) -> None:
+        if not self._dirty or not self._path:
+            return
+
+        try:
+            write_json(
+                self._path,
+                {
+                    "throughput": self._throughput,
+                    "ttfb": self._ttfb,
+                    "aggregate": self._aggregate,
+                    "samples": self._samples,
+                },
+            )
+            self._dirty = False
+        except OSError as e:
+            debug("无法保存分片规划的历史数据:", e)
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    if current is None:
+        return sample
+    return current * (1 - EWMA_ALPHA) + sample * EWMA_ALPHA
+
+
+_PLANNER: Optional[ChunkPlanner] = None
+
+
+def get_chunk_planner() -> ChunkPlanner:
+    """惰性加载全局的分片规划器。"""
+    global _PLANNER
+
+    if _PLANNER is None:
+        try:
+            _PLANNER = ChunkPlanner(cache_path(HISTORY_FILENAME))
+        except OSError as e:
+            debug("无法访问缓存目录，分片规划器不会保存历史数据:", e)
+            _PLANNER = ChunkPlanner()
+    return _PLANNER
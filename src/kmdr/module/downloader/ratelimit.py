@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from kmdr.core.cache import read_json
+from kmdr.core.console import debug, info
+
+RELOAD_INTERVAL = 2.0
+"""检查配置文件中限速设置是否变化的间隔（秒）"""
+
+MIN_BURST = 64 * 1024
+"""突发流量的下限，避免单次读取的数据块超过桶容量"""
+
+
+class TokenBucket:
+    """
+    令牌桶限速器，由进程内所有下载共享。
+
+    令牌按 `rate` 持续补充，最多积累 `burst` 个。取用时允许透支，透支的调用方按欠下的令牌数等待，
+    因此并发的取用会自然排队，总速度不会超过 `rate`。
+
+    运行中会由后台任务定期检查配置文件，通过 `kmdr config -s rate_limit=...` 修改的限速会在几秒内生效。
+    """
+
+    def __init__(self, rate: int = 0, burst: Optional[int] = None, config_path: Optional[str] = None):
+        self._rate = 0
+        self._burst = MIN_BURST
+        self._tokens = 0.0
+        self._updated_at = time.monotonic()
+
+        self._config_path = config_path
+        self._config_mtime: Optional[float] = None
+        self._file_values: Optional[tuple] = None
+        self._acquired_at = 0.0
+        self._reloader: Optional[asyncio.Task] = None
+
+        self.update(rate, burst)
+        self._tokens = float(self._burst)
+        self._apply(self._read_config())
+
+    def __repr__(self) -> str:
+        return f"TokenBucket(rate={self._rate}, burst={self._burst})"
+
+    @property
+    def rate(self) -> int:
+        return self._rate
+
+    @property
+    def burst(self) -> int:
+        return self._burst
+
+    def update(self, rate: Optional[int], burst: Optional[int] = None) -> None:
+        """
+        修改限速
+
+        :param rate: 每秒允许的字节数，0 或 None 表示不限速
+        :param burst: 允许的突发流量（字节），默认为一秒的流量
+        """
+        self._refill()
+        self._rate = max(0, int(rate or 0))
+        self._burst = max(MIN_BURST, int(burst or self._rate))
+        self._tokens = min(self._tokens, self._burst)
+
+    async def acquire(self, size: int) -> None:
+        """
+        取用指定数量的令牌，令牌不足时等待
+
+        :param size: 本次读取的字节数
+        """
+        self._ensure_reloader()
+        if self._rate <= 0:
+            return
+
+        self._refill()
+        self._tokens -= size
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self._rate)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._rate > 0:
+            self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def _ensure_reloader(self):
+        if self._config_path is None:
+            return
+
+        self._acquired_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        if self._reloader is None or self._reloader.done() or self._reloader.get_loop() is not loop:
+            self._reloader = loop.create_task(self._run_reloader())
+
+    async def _run_reloader(self):
+        # 没有下载在取用令牌时退出，下次取用时重新启动
+        while time.monotonic() - self._acquired_at <= RELOAD_INTERVAL:
+            # 只有读取文件放入线程池，令牌桶的状态仍在事件循环中修改
+            self._apply(await asyncio.to_thread(self._read_config))
+            await asyncio.sleep(RELOAD_INTERVAL)
+
+    def _read_config(self) -> Optional[tuple]:
+        """
+        配置文件变化时读取其中的限速设置，未变化时返回 None
+
+        :note: 同步 IO，运行中由后台任务放入线程池调用。
+        """
+        if self._config_path is None:
+            return None
+
+        try:
+            mtime = os.stat(self._config_path).st_mtime
+        except OSError:
+            return None
+        if mtime == self._config_mtime:
+            return None
+        self._config_mtime = mtime
+
+        option = (read_json(self._config_path) or {}).get("option") or {}
+        return option.get("rate_limit"), option.get("rate_burst")
+
+    def _apply(self, values: Optional[tuple]):
+        if values is None:
+            return
+        if self._file_values is not None and values != self._file_values:
+            # 只响应配置文件中的变化，启动时由命令行指定的限速不会被覆盖
+            self.update(*values)
+            info(f"[blue]限速已更新为 {self._rate} 字节/秒[/blue]" if self._rate else "[blue]已取消限速[/blue]")
+        self._file_values = values
+
+
+_LIMITER: Optional[TokenBucket] = None
+
+
+def get_rate_limiter() -> TokenBucket:
+    """惰性创建全局的限速器，未配置时不限速。"""
+    global _LIMITER
+
+    if _LIMITER is None:
+        _LIMITER = TokenBucket()
+    return _LIMITER
+
+
+def configure_rate_limiter(rate: Optional[int], burst: Optional[int] = None, config_path: Optional[str] = None) -> TokenBucket:
+    """
+    设置全局限速器
+
+    :param rate: 每秒允许的字节数，0 或 None 表示不限速
+    :param burst: 允许的突发流量（字节）
+    :param config_path: 运行中需要跟踪限速变化的配置文件
+    """
+    global _LIMITER
+
+    _LIMITER = TokenBucket(rate or 0, burst, config_path=config_path)
+    debug("下载限速:", _LIMITER)
+    return _LIMITER
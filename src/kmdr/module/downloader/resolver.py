@@ -0,0 +1,182 @@
+import asyncio
+import time
+from collections.abc import Awaitable
+from typing import Callable, Optional, Union
+
+from yarl import URL
+
+from kmdr.core.console import debug
+
+UrlSource = Union[str, Callable[[], str], Callable[[], Awaitable[str]]]
+
+EWMA_ALPHA = 0.3
+"""新样本在主机速度中的权重"""
+
+SLOW_HOST_RATIO = 0.5
+"""主机速度低于本次运行中最快主机的该比例时，重新获取链接时尝试换一个节点"""
+
+REROUTE_CANDIDATES = 3
+"""重新获取链接时最多保留的备用链接数量"""
+
+URL_TTL = 10 * 60
+"""提前获取的下载链接超过该时长（秒）仍未使用时重新获取，避免链接过期"""
+
+
+class HostSpeeds:
+    """记录本次运行中各个下载节点的传输速度。"""
+
+    def __init__(self):
+        self._speeds: dict[str, float] = {}
+
+    def __repr__(self) -> str:
+        return f"HostSpeeds({ {host: round(speed) for host, speed in self._speeds.items()} })"
+
+    def record(self, url: str, size: int, duration: float) -> None:
+        """
+        记录一次传输
+
+        :param url: 下载链接
+        :param size: 传输的字节数
+        :param duration: 传输耗时（秒）
+        """
+        host = _host_of(url)
+        if host is None or duration <= 0:
+            return
+        sample = size / duration
+        current = self._speeds.get(host)
+        self._speeds[host] = sample if current is None else current * (1 - EWMA_ALPHA) + sample * EWMA_ALPHA
+
+    def speed(self, url: str) -> Optional[float]:
+        host = _host_of(url)
+        return self._speeds.get(host) if host else None
+
+    def best(self) -> Optional[float]:
+        return max(self._speeds.values(), default=None)
+
+    def is_slow(self, url: str) -> bool:
+        """节点是否明显慢于本次运行中最快的节点，没有记录的节点不算慢"""
+        speed, best = self.speed(url), self.best()
+        return speed is not None and best is not None and speed < best * SLOW_HOST_RATIO
+
+    def score(self, url: str) -> float:
+        """用于在多个链接中选择节点，没有记录的节点按最快的节点估计"""
+        speed = self.speed(url)
+        if speed is None:
+            return self.best() or 0.0
+        return speed
+
+
+class UrlResolver:
+    """
+    缓存下载链接，并在需要时重新获取。
+
+    下载失败或连接停滞时调用 `invalidate`，下一次 `get` 会重新调用一次 Supplier，
+    得到的节点明显慢于其他节点时，改用之前获取过、尚未过期的更快的链接。
+    是否真的向服务器重新请求由 Supplier 决定（例如只在不会额外扣除额度时请求）。
+    """
+
+    def __init__(self, source: UrlSource):
+        self._source = source
+        self._url: Optional[str] = source if isinstance(source, str) else None
+        self._resolved_at = time.monotonic()
+        self._stale = False
+        self._lock = asyncio.Lock()
+        self._fetched: dict[str, float] = {}
+        """获取过的链接 -> 获取时间，重新获取时作为备用链接"""
+
+    def __repr__(self) -> str:
+        return f"UrlResolver(url={self._url!r}, stale={self._stale})"
+
+    async def get(self) -> str:
+        """返回当前的下载链接，必要时重新获取"""
+        if self._url is not None and not self._stale and not self._expired():
+            return self._url
+
+        async with self._lock:
+            if self._url is None:
+                self._url = await fetch_url(self._source)
+                self._resolved_at = time.monotonic()
+                self._fetched[self._url] = self._resolved_at
+            elif self._stale or self._expired():
+                if not self._stale:
+                    debug("下载链接获取后长时间未使用，重新获取")
+                self._url = await self._reroute(self._url)
+                self._resolved_at = time.monotonic()
+            self._stale = False
+            return self._url
+
+    def mark_used(self) -> None:
+        """链接开始传输数据后调用，此后不再因为过期而重新获取"""
+        self._resolved_at = float("inf")
+
+    def _expired(self) -> bool:
+        return callable(self._source) and time.monotonic() - self._resolved_at > URL_TTL
+
+    def invalidate(self, url: Optional[str]) -> None:
+        """
+        标记链接需要重新获取
+
+        :param url: 出问题的链接，其他调用方已经换过链接时忽略
+        """
+        if url is not None and url == self._url and callable(self._source):
+            self._stale = True
+
+    async def _reroute(self, previous: str) -> str:
+        speeds = get_host_speeds()
+        # 每次只调用一次 Supplier，避免重新获取链接消耗过多的请求或额度
+        url = await fetch_url(self._source)
+        now = time.monotonic()
+        self._fetched[url] = now
+
+        recent = sorted((u for u, fetched_at in self._fetched.items() if now - fetched_at <= URL_TTL), key=self._fetched.get)
+        self._fetched = {u: self._fetched[u] for u in recent[-REROUTE_CANDIDATES:]}
+
+        if speeds.is_slow(url):
+            # 出问题的链接不作为备用链接
+            candidates = [u for u in self._fetched if u != previous] or [url]
+            chosen = max(candidates, key=speeds.score)
+        else:
+            chosen = url
+        if chosen != previous:
+            debug("重新获取下载链接:", _host_of(previous), "->", _host_of(chosen), "，各节点速度:", speeds)
+        return chosen
+
+
+async def fetch_url(url: UrlSource) -> str:
+    """
+    获取下载链接的包装函数，支持直接传入字符串或异步/同步的 Supplier 函数。
+
+    :note: 不包含重试机制，调用方需自行处理。
+    :param url: 下载链接或其 Supplier
+    :return: 下载链接
+    """
+
+    if callable(url):
+        result = url()
+        if asyncio.iscoroutine(result) or isinstance(result, Awaitable):
+            # 如果 url() 是一个异步函数，等待它
+            return await result
+        # 如果 url() 是一个同步函数，直接返回
+        return result
+    elif isinstance(url, str):
+        # 如果 url 只是个字符串，直接返回
+        return url
+
+
+def _host_of(url: str) -> Optional[str]:
+    try:
+        return URL(url).host
+    except (ValueError, TypeError):
+        return None
+
+
+_SPEEDS: Optional[HostSpeeds] = None
+
+
+def get_host_speeds() -> HostSpeeds:
+    """惰性创建全局的节点速度记录。"""
+    global _SPEEDS
+
+    if _SPEEDS is None:
+        _SPEEDS = HostSpeeds()
+    return _SPEEDS
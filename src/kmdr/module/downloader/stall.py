@@ -0,0 +1,159 @@
+import asyncio
+import collections
+import statistics
+import time
+from typing import Callable, Optional
+
+from aiohttp import ClientTimeout
+
+from kmdr.core.console import debug
+
+from .planner import get_chunk_planner
+
+CHECK_INTERVAL = 1.0
+"""检查各连接速度的间隔（秒）"""
+
+STALL_WINDOW = 10.0
+"""连接的速度在该时长内持续过低时视为停滞（秒）"""
+
+PEER_RATIO = 0.1
+"""速度低于其他连接速度中位数的该比例时视为过慢"""
+
+MAX_STALL_RESTARTS = 8
+"""停滞后重新连接不消耗重试次数，但每个下载最多这样重新连接的次数"""
+
+READ_TIMEOUT_FACTOR = 8
+"""读取超时为历史首字节时间的倍数"""
+
+MIN_READ_TIMEOUT = 15.0
+MAX_READ_TIMEOUT = 60.0
+DEFAULT_READ_TIMEOUT = 30.0
+"""没有历史数据时的读取超时（秒）"""
+
+CONNECT_TIMEOUT = 30.0
+
+
+class StreamWatch:
+    """单个连接的传输记录，由 `StallMonitor.watch` 创建。"""
+
+    def __init__(self, abort: Callable[[], None]):
+        self._abort = abort
+        self.started_at = time.monotonic()
+        self.received = 0
+        """该连接收到的总字节数"""
+        self.stalled = False
+        """是否因为停滞被中断"""
+        self.history: collections.deque[tuple[float, int]] = collections.deque()
+        """(时间, 收到的总字节数) 的采样，只保留 `STALL_WINDOW` 内的部分"""
+
+    def add(self, size: int) -> None:
+        self.received += size
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def speed(self) -> Optional[float]:
+        """最近 `STALL_WINDOW` 内的速度 (bytes/s)，采样时长不足时返回 None"""
+        if len(self.history) < 2:
+            return None
+        (first_at, first), (last_at, last) = self.history[0], self.history[-1]
+        if last_at - first_at < STALL_WINDOW:
+            return None
+        return (last - first) / (last_at - first_at)
+
+    def sample(self, now: float) -> None:
+        self.history.append((now, self.received))
+        while len(self.history) > 1 and now - self.history[1][0] >= STALL_WINDOW:
+            self.history.popleft()
+
+    def abort(self) -> None:
+        self.stalled = True
+        self.history.clear()
+        self._abort()
+
+    def __enter__(self) -> "StreamWatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        get_stall_monitor().unwatch(self)
+
+
+class StallMonitor:
+    """
+    检测停滞的连接。
+
+    定期采样所有正在传输的连接，某个连接在 `STALL_WINDOW` 内的速度低于其他连接速度中位数的 `PEER_RATIO`
+    （没有其他连接时为完全没有收到数据）时，中断该连接，由下载循环从当前位置重新请求。
+    """
+
+    def __init__(self):
+        self._watches: set[StreamWatch] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, abort: Callable[[], None]) -> StreamWatch:
+        """
+        开始监控一个连接
+
+        :param abort: 中断连接的回调，通常为 `response.close`
+        """
+        watch = StreamWatch(abort)
+        watch.sample(time.monotonic())
+        self._watches.add(watch)
+
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+        return watch
+
+    def unwatch(self, watch: StreamWatch) -> None:
+        self._watches.discard(watch)
+
+    def check(self, now: float) -> list[StreamWatch]:
+        """采样所有连接，中断并返回停滞的连接"""
+        for watch in self._watches:
+            watch.sample(now)
+
+        speeds = {watch: watch.speed() for watch in self._watches}
+        stalled = []
+        for watch, speed in speeds.items():
+            if speed is None:
+                continue
+            peers = [s for w, s in speeds.items() if w is not watch and s is not None]
+            threshold = statistics.median(peers) * PEER_RATIO if peers else 0.0
+            if speed <= threshold:
+                debug("连接停滞，重新建立连接。速度:", round(speed), "字节/秒，阈值:", round(threshold), "字节/秒")
+                stalled.append(watch)
+
+        for watch in stalled:
+            self._watches.discard(watch)
+            watch.abort()
+        return stalled
+
+    async def _run(self):
+        while self._watches:
+            await asyncio.sleep(CHECK_INTERVAL)
+            self.check(time.monotonic())
+
+
+def read_timeout() -> ClientTimeout:
+    """
+    下载请求使用的超时设置
+
+    读取超时根据历史首字节时间调整，不限制总时长，大文件的下载不会因为总超时中断。
+    """
+    ttfb = get_chunk_planner().ttfb
+    sock_read = DEFAULT_READ_TIMEOUT if ttfb is None else min(MAX_READ_TIMEOUT, max(MIN_READ_TIMEOUT, ttfb * READ_TIMEOUT_FACTOR))
+    return ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=sock_read)
+
+
+_MONITOR: Optional[StallMonitor] = None
+
+
+def get_stall_monitor() -> StallMonitor:
+    """惰性创建全局的停滞检测。"""
+    global _MONITOR
+
+    if _MONITOR is None:
+        _MONITOR = StallMonitor()
+    return _MONITOR
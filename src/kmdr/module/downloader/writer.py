@@ -0,0 +1,260 @@
+import asyncio
+import os
+import queue
+import threading
+from typing import Callable, Optional, Union
+
+from kmdr.core.console import debug
+
+WRITE_BATCH_BYTES = 4 * 1024 * 1024
+"""写入线程单次合并处理的最大数据量"""
+
+MAX_QUEUED_BYTES = 8 * 1024 * 1024
+"""每个文件排队等待写入的最大数据量，超出时阻塞网络读取"""
+
+IOV_MAX = 1024
+"""单次 pwritev 调用允许的最大缓冲区数量"""
+
+Buffer = Union[bytes, memoryview]
+WriteItem = tuple["WriteTarget", int, Buffer, Optional[Callable[[], None]]]
+
+
+class WriteTarget:
+    """
+    交给写入线程的单个文件。
+
+    `write` 只负责把数据放入队列，排队的数据超过上限时才会等待；需要确认数据已写入文件时调用 `flush`。
+    写入失败的异常会在之后的 `write` 或 `flush` 中抛出。
+
+    文件由写入线程在排在前面的数据全部写入后关闭，`close` 被中断时也不会写入已经关闭的文件描述符。
+    """
+
+    def __init__(self, writer: "DiskWriter", fd: int, path: str):
+        self._writer = writer
+        self._fd = fd
+        self._path = path
+        self._loop = asyncio.get_running_loop()
+        self._queued = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._error: Optional[BaseException] = None
+        self._closed: Optional[asyncio.Future] = None
+
+    def __repr__(self) -> str:
+        return f"WriteTarget(path={self._path!r}, queued={self._queued})"
+
+    @property
+    def fd(self) -> int:
+        return self._fd
+
+    async def write(self, offset: int, data: Buffer, on_done: Optional[Callable[[], None]] = None) -> None:
+        """
+        将数据写入文件的指定位置
+
+        :param offset: 写入位置
+        :param data: 写入的数据，入队后不能再修改
+        :param on_done: 数据写入后在写入线程中调用，用于归还缓冲区
+        """
+        if self._closed is not None:
+            raise ValueError(f"文件已关闭: {self._path}")
+        self._raise_if_failed()
+        while self._queued > 0 and self._queued + len(data) > MAX_QUEUED_BYTES:
+            # 磁盘跟不上网络时，让读取方等待，避免数据在内存中无限堆积
+            await self._drained.wait()
+            self._raise_if_failed()
+
+        self._queued += len(data)
+        self._drained.clear()
+        self._writer.submit((self, offset, data, on_done))
+
+    async def flush(self) -> None:
+        """等待已提交的数据全部写入文件"""
+        while self._queued > 0:
+            await self._drained.wait()
+        self._raise_if_failed()
+
+    async def close(self) -> None:
+        """等待数据写入后关闭文件"""
+        if self._closed is None:
+            # 先提交关闭请求，之后的等待被取消或者写入失败时，文件同样会在排队的数据写入后关闭
+            self._closed = self._loop.create_future()
+            self._writer.submit(_CloseRequest(self))
+
+        await self.flush()
+        error = await asyncio.shield(self._closed)
+        if error is not None:
+            raise error
+
+    async def __aenter__(self) -> "WriteTarget":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
+
+    def _complete(self, size: int, error: Optional[BaseException]):
+        """由写入线程通过 call_soon_threadsafe 回调"""
+        if error is not None and self._error is None:
+            self._error = error
+        self._queued -= size
+        if self._queued <= MAX_QUEUED_BYTES // 2 or error is not None:
+            self._drained.set()
+            if self._queued > 0:
+                self._drained = asyncio.Event()
+
+    def _closed_from_thread(self, error: Optional[BaseException]):
+        try:
+            self._loop.call_soon_threadsafe(self._set_closed, error)
+        except RuntimeError:
+            pass
+
+    def _set_closed(self, error: Optional[BaseException]):
+        if self._closed is not None and not self._closed.done():
+            # 关闭失败的异常作为结果返回，没有等待方时不会产生未处理异常的警告
+            self._closed.set_result(error)
+
+    def _notify_from_thread(self, size: int, error: Optional[BaseException]):
+        try:
+            self._loop.call_soon_threadsafe(self._complete, size, error)
+        except RuntimeError:
+            # 事件循环已经关闭，说明下载已被中断，没有需要通知的等待方
+            pass
+
+
+class _CloseRequest:
+    """排在写入队列中的关闭请求，写入线程处理到这里时，该文件之前提交的数据都已写入"""
+
+    def __init__(self, target: WriteTarget):
+        self.target = target
+
+    def run(self):
+        error: Optional[BaseException] = None
+        try:
+            os.close(self.target.fd)
+        except OSError as e:
+            error = e
+        self.target._closed_from_thread(error)
+
+
+class DiskWriter:
+    """
+    专用的磁盘写入线程。
+
+    网络读取只需把数据块放入队列，写入线程批量取出后，按文件将相邻的数据块合并为一次 pwritev/pwrite 调用，
+    避免每个数据块都经过一次线程池调度。
+    """
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue[Union[WriteItem, _CloseRequest]] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="kmdr-writer", daemon=True)
+        self._thread.start()
+
+    async def open(self, path: str, truncate: bool = False) -> WriteTarget:
+        """
+        打开文件用于按偏移写入，文件不存在时创建
+
+        :param path: 文件路径
+        :param truncate: 是否清空已有内容
+        """
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        fd = await asyncio.to_thread(os.open, path, flags, 0o666)
+        return WriteTarget(self, fd, path)
+
+    def submit(self, item: Union[WriteItem, _CloseRequest]):
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            batch: list[WriteItem] = []
+            size = 0
+            item: Optional[Union[WriteItem, _CloseRequest]] = self._queue.get()
+            # 关闭请求之前的数据必须先写入，遇到关闭请求时结束本批次
+            while not isinstance(item, _CloseRequest):
+                batch.append(item)
+                size += len(item[2])
+                item = None
+                if size >= WRITE_BATCH_BYTES:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+            if item is not None:
+                item.run()
+
+    def _write_batch(self, batch: list[WriteItem]):
+        by_target: dict[WriteTarget, list[tuple[int, Buffer]]] = {}
+        for target, offset, data, _ in batch:
+            by_target.setdefault(target, []).append((offset, data))
+
+        for target, items in by_target.items():
+            # 同一文件中各分片的范围互不重叠，可以按偏移排序后合并连续的数据块
+            items.sort(key=lambda item: item[0])
+            total = sum(len(data) for _, data in items)
+            error: Optional[BaseException] = None
+            try:
+                run_offset, run = items[0][0], [items[0][1]]
+                run_end = run_offset + len(items[0][1])
+                for offset, data in items[1:]:
+                    if offset == run_end and len(run) < IOV_MAX:
+                        run.append(data)
+                    else:
+                        _pwrite_all(target.fd, run, run_offset)
+                        run_offset, run = offset, [data]
+                    run_end = offset + len(data)
+                _pwrite_all(target.fd, run, run_offset)
+            except Exception as e:
+                # 异常交给等待写入的协程处理，写入线程本身不能退出
+                debug("写入文件失败:", e)
+                error = e
+            target._notify_from_thread(total, error)
+
+        for *_, on_done in batch:
+            if on_done is not None:
+                on_done()
+
+
+def _pwrite_all(fd: int, buffers: list[Buffer], offset: int):
+    if hasattr(os, "pwritev"):
+        written = os.pwritev(fd, buffers, offset)
+        total = sum(len(b) for b in buffers)
+        if written >= total:
+            return
+        # 普通文件极少出现部分写入，出现时把剩余部分合并后补写
+        data = b"".join(buffers)[written:]
+        offset += written
+    else:
+        data = b"".join(buffers) if len(buffers) > 1 else buffers[0]
+
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            n = os.pwrite(fd, view, offset)
+        else:
+            # Windows 没有 pwrite，写入线程只有一个，定位后写入不会被其他写入打断
+            os.lseek(fd, offset, os.SEEK_SET)
+            n = os.write(fd, view)
+        view = view[n:]
+        offset += n
+
+
+_WRITER: Optional[DiskWriter] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_disk_writer() -> DiskWriter:
+    """惰性启动全局的写入线程。"""
+    global _WRITER
+
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = DiskWriter()
+    return _WRITER
@@ -1,18 +1,21 @@
 from collections.abc import Awaitable
-from typing import Callable
+from typing import Callable, Optional
 
 from kmdr.core import LISTERS, BookInfo, Credential, Lister, VolInfo
 
 
 @LISTERS.register()
 class BookUrlLister(Lister):
-    def __init__(self, book_url: str, *args, **kwargs):
+    def __init__(self, book_url: str, book_meta_ttl: Optional[int] = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._book_url = book_url
+        self._book_meta_ttl = book_meta_ttl
 
     async def list(self, awaitable_cred: Callable[[], Awaitable[Credential]]) -> tuple[BookInfo, list[VolInfo]]:
         from .utils import extract_book_info_and_volumes
 
         with self._console.status("获取书籍信息..."):
-            book_info, volumes = await extract_book_info_and_volumes(self._session, self._book_url, awaitable_cred=awaitable_cred)
+            book_info, volumes = await extract_book_info_and_volumes(
+                self._session, self._book_url, awaitable_cred=awaitable_cred, meta_ttl=self._book_meta_ttl
+            )
             return book_info, volumes
@@ -1,7 +1,7 @@
 import asyncio
 from argparse import Namespace
 from collections.abc import Awaitable
-from typing import Callable
+from typing import Callable, Optional
 
 from rich.prompt import IntPrompt
 from rich.table import Table
@@ -14,8 +14,9 @@ from kmdr.core.error import EmptyResultError, NotInteractableError
 
 @LISTERS.register(order=99)
 class CatalogGuidedLister(Lister):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, book_meta_ttl: Optional[int] = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._book_meta_ttl = book_meta_ttl
         # 保存传入的参数字典，用于重构成 Namespace 供 CATALOGERS 调度
         self._kwargs = kwargs
 
@@ -58,5 +59,7 @@ class CatalogGuidedLister(Lister):
         selected_book = books[chosen_idx - 1]
 
         with self._console.status(f"正在获取 '{selected_book.name}' 的详细信息..."):
-            book_info, volumes = await extract_book_info_and_volumes(self._session, selected_book.url, selected_book, awaitable_cred=awaitable_cred)
+            book_info, volumes = await extract_book_info_and_volumes(
+                self._session, selected_book.url, selected_book, awaitable_cred=awaitable_cred, meta_ttl=self._book_meta_ttl
+            )
             return book_info, volumes
@@ -1,3 +1,4 @@
+import asyncio
 import re
 from collections.abc import Awaitable
 from typing import Callable, Optional
@@ -7,9 +8,13 @@ from bs4 import BeautifulSoup
 from yarl import URL
 
 from kmdr.core import BookInfo, Credential, VolInfo, VolumeType
+from kmdr.core.book_meta import BOOK_META_TTL, get_book_meta_cache
 from kmdr.core.console import debug
 from kmdr.core.error import ContentBlockedError
-from kmdr.core.utils import async_retry, extract_cookies
+from kmdr.core.http_cache import get_http_cache
+from kmdr.core.utils import async_retry
+
+BOOK_ID_PATTERN = re.compile(r"^/c/(\d+)\.htm")
 
 
 @async_retry()
@@ -19,6 +24,7 @@ async def extract_book_info_and_volumes(
     book_info: Optional[BookInfo] = None,
     awaitable_cred: Optional[Callable[[], Awaitable[Optional[Credential]]]] = None,
     cookies: Optional[dict[str, str]] = None,
+    meta_ttl: Optional[float] = None,
 ) -> tuple[BookInfo, list[VolInfo]]:
     """
     从指定的书籍页面 URL 中提取书籍信息和卷信息。
@@ -27,6 +33,7 @@ async def extract_book_info_and_volumes(
     :param url: 书籍页面的 URL。
     :param book_info: 可选的书籍信息，用于补充作者、状态等字段。
     :param awaitable_cred: 当遇到需要登录才能访问的内容时，可以调用此回调获取凭证并重试。
+    :param meta_ttl: 书籍信息缓存的有效期（秒），默认为 `BOOK_META_TTL`，为 0 时总是重新获取。
     :return: 包含书籍信息和卷信息的元组。
     """
     structured_url = URL(url)
@@ -38,7 +45,21 @@ async def extract_book_info_and_volumes(
         debug("检测到移动端链接，转换为桌面端链接进行处理。")
         route = structured_url.path[2:]
 
-    return await __do_extract(session, route, url, book_info, awaitable_cred, cookies)
+    match = BOOK_ID_PATTERN.match(route)
+    book_id = match.group(1) if match else None
+    if book_id is None:
+        return await __do_extract(session, route, url, book_info, awaitable_cred, cookies)
+
+    meta_cache = get_book_meta_cache()
+    cached = meta_cache.get(book_id, book_info.last_update if book_info else None, BOOK_META_TTL if meta_ttl is None else meta_ttl)
+    if cached is not None:
+        debug("使用缓存的书籍信息:", book_id)
+        cached_info, volumes = cached
+        return __merge_book_info(url, cached_info.id, cached_info.name, book_info), volumes
+
+    extracted_book_info, volumes = await __do_extract(session, route, url, book_info, awaitable_cred, cookies)
+    await asyncio.to_thread(meta_cache.save, book_id, extracted_book_info, volumes)
+    return extracted_book_info, volumes
 
 
 async def __do_extract(
@@ -50,32 +71,31 @@ async def __do_extract(
     cookies: Optional[dict[str, str]] = None,
 ) -> tuple[BookInfo, list[VolInfo]]:
     """实际执行提取操作的内部函数，支持在遇到需要登录的内容时重试。"""
-    async with session.get(route, cookies=cookies) as response:
-        response.raise_for_status()
+    page = await get_http_cache().get(session, route, cookies=cookies)
 
-        # 如果后续有性能问题，可以先考虑使用 lxml 进行解析
-        book_page = BeautifulSoup(await response.text(), "html.parser")
+    # 如果后续有性能问题，可以先考虑使用 lxml 进行解析
+    book_page = BeautifulSoup(page.text, "html.parser")
 
-        # 如果携带凭证访问主页，服务器不会设置新的 cookies，所以需要复用旧的
-        resp_cookies = extract_cookies(response) if cookies is None else cookies
+    # 如果携带凭证访问主页，服务器不会设置新的 cookies，所以需要复用旧的
+    resp_cookies = page.cookies if cookies is None else cookies
 
-        try:
-            extracted_book_info = __extract_book_info(url, book_page, book_info)
-        except ContentBlockedError:
-            if awaitable_cred is not None:
-                debug("检测到内容被屏蔽，尝试等待凭证获取后重试")
-                cred = await awaitable_cred()
-                if cred is not None:
-                    debug("已获取凭证，正在重试获取书籍信息")
-                    # 使用新凭证的 cookies 重试请求
-                    return await __do_extract(session, route, url, book_info, None, cred.cookies)
-            elif cookies is not None:
-                debug("使用凭证也无法访问内容")
-            raise
+    try:
+        extracted_book_info = __extract_book_info(url, book_page, book_info)
+    except ContentBlockedError:
+        if awaitable_cred is not None:
+            debug("检测到内容被屏蔽，尝试等待凭证获取后重试")
+            cred = await awaitable_cred()
+            if cred is not None:
+                debug("已获取凭证，正在重试获取书籍信息")
+                # 使用新凭证的 cookies 重试请求
+                return await __do_extract(session, route, url, book_info, None, cred.cookies)
+        elif cookies is not None:
+            debug("使用凭证也无法访问内容")
+        raise
 
-        volumes = await __extract_volumes(session, book_page, resp_cookies)
+    volumes = await __extract_volumes(session, book_page, resp_cookies)
 
-        return extracted_book_info, volumes
+    return extracted_book_info, volumes
 
 
 def __extract_book_info(url: str, book_page: BeautifulSoup, book_info: Optional[BookInfo]) -> BookInfo:
@@ -89,9 +109,13 @@ def __extract_book_info(url: str, book_page: BeautifulSoup, book_info: Optional[
 
     id = book_page.find("input", attrs={"name": "bookid"})["value"]
 
+    return __merge_book_info(url, id, book_name, book_info)
+
+
+def __merge_book_info(url: str, id: str, name: str, book_info: Optional[BookInfo]) -> BookInfo:
     return BookInfo(
         id=id,
-        name=book_name,
+        name=name,
         url=url,
         author=book_info.author if book_info else "",
         status=book_info.status if book_info else "",
@@ -105,32 +129,31 @@ async def __extract_volumes(session: Session, book_page: BeautifulSoup, cookies:
     pattern = re.compile(r"/book_data.php\?h=\w+")
     book_data_url = pattern.search(script).group(0)
 
-    async with session.get(url=book_data_url, cookies=cookies) as response:
-        response.raise_for_status()
-
-        book_data = (await response.text()).split("\n")
-        book_data = filter(lambda x: "volinfo" in x, book_data)
-        book_data = map(lambda x: x.split('"')[1], book_data)
-        book_data = map(lambda x: x[8:].split(","), book_data)
-
-        volume_data = list(
-            map(
-                lambda x: VolInfo(
-                    id=x[0],
-                    extra_info=__extract_extra_info(x[1]),
-                    is_last=x[2] == "1",
-                    vol_type=__extract_volume_type(x[3]),
-                    index=int(x[4]),
-                    pages=int(x[6]),
-                    name=x[5],
-                    size=float(x[11]),
-                ),
-                book_data,
-            )
+    page = await get_http_cache().get(session, book_data_url, cookies=cookies)
+
+    book_data = page.text.split("\n")
+    book_data = filter(lambda x: "volinfo" in x, book_data)
+    book_data = map(lambda x: x.split('"')[1], book_data)
+    book_data = map(lambda x: x[8:].split(","), book_data)
+
+    volume_data = list(
+        map(
+            lambda x: VolInfo(
+                id=x[0],
+                extra_info=__extract_extra_info(x[1]),
+                is_last=x[2] == "1",
+                vol_type=__extract_volume_type(x[3]),
+                index=int(x[4]),
+                pages=int(x[6]),
+                name=x[5],
+                size=float(x[11]),
+            ),
+            book_data,
         )
-        volume_data: list[VolInfo] = volume_data
+    )
+    volume_data: list[VolInfo] = volume_data
 
-        return volume_data
+    return volume_data
 
 
 def __extract_extra_info(value: str) -> str:
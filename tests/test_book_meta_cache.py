@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from kmdr.core.book_meta import BOOK_META_TTL, UNVERIFIED_TTL, BookMetaCache
+from kmdr.core.structure import BookInfo, VolInfo, VolumeType
+from kmdr.module.lister.utils import extract_book_info_and_volumes
+
+BOOK = BookInfo(id="1001", name="测试", url="https://kxx.moe/c/1001.htm", author="作者", status="連載", last_update="2026-10-01")
+VOLUMES = [
+    VolInfo(id="1", extra_info="无", is_last=False, vol_type=VolumeType.VOLUME, index=1, name="卷 01", pages=180, size=52.3),
+    VolInfo(id="2", extra_info="最近一週更新", is_last=True, vol_type=VolumeType.SERIALIZED, index=2, name="話 002", pages=20, size=8.1),
+]
+
+
+class TestBookMetaCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "books.json")
+
+    def test_restores_across_runs(self):
+        BookMetaCache(self.path).save("1001", BOOK, VOLUMES)
+
+        book, volumes = BookMetaCache(self.path).get("1001")
+        self.assertEqual(book, BOOK)
+        self.assertEqual(volumes, VOLUMES)
+
+    def test_expires_after_ttl(self):
+        cache = BookMetaCache(self.path)
+        cache.save("1001", BOOK, VOLUMES)
+
+        self.assertIsNone(cache.get("1001", ttl=0))
+        with patch("kmdr.core.book_meta.time.time", return_value=cache._books["1001"]["saved_at"] + BOOK_META_TTL):
+            self.assertIsNone(cache.get("1001"))
+
+    def test_newer_last_update_expires_entry(self):
+        cache = BookMetaCache(self.path)
+        cache.save("1001", BOOK, VOLUMES)
+
+        self.assertIsNotNone(cache.get("1001", last_update="2026-10-01"))
+        self.assertIsNone(cache.get("1001", last_update="2026-10-15"))
+
+    def test_unknown_last_update_uses_short_ttl(self):
+        cache = BookMetaCache(self.path)
+        cache.save("1001", BOOK, VOLUMES)
+        cache.save("1002", BookInfo(id="1002", name="测试", url="https://kxx.moe/c/1002.htm", author="作者", status="連載", last_update=""), VOLUMES)
+
+        saved_at = cache._books["1002"]["saved_at"]
+        with patch("kmdr.core.book_meta.time.time", return_value=saved_at + UNVERIFIED_TTL + 1):
+            # 通过书籍链接下载时没有书籍列表中的最后更新时间
+            self.assertIsNone(cache.get("1001"))
+            # 保存时没有最后更新时间的缓存，同样无法确认是否有新的卷
+            self.assertIsNone(cache.get("1002", last_update="2026-10-01"))
+            self.assertIsNotNone(cache.get("1001", last_update="2026-10-01"))
+
+
+class TestExtractWithMetaCache(unittest.IsolatedAsyncioTestCase):
+    async def test_uses_cache_without_request(self):
+        cache = BookMetaCache()
+        cache.save("1001", BOOK, VOLUMES)
+
+        listed = BookInfo(id="", name="测试", url="https://kxx.moe/m/c/1001.htm", author="新作者", status="完結", last_update="2026-10-01")
+        with patch("kmdr.module.lister.utils.get_book_meta_cache", return_value=cache):
+            # 命中缓存时不会使用会话
+            book, volumes = await extract_book_info_and_volumes(None, listed.url, listed)
+
+        self.assertEqual(book.id, "1001")
+        self.assertEqual(book.url, listed.url)
+        self.assertEqual(book.author, "新作者")
+        self.assertEqual(volumes, VOLUMES)
+
+
+if __name__ == "__main__":
+    unittest.main()
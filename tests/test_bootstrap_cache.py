@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from kmdr.core.bootstrap import BOOTSTRAP_TTL, BootstrapCache
+from kmdr.core.error import BootstrapExpiredError
+from kmdr.core.structure import Credential, QuotaInfo
+
+COOKIE = {"VOLSKEY": "abc"}
+
+
+def credential() -> Credential:
+    return Credential(
+        username="user",
+        cookies={**COOKIE, "VLIBSID": "refreshed"},
+        user_quota=QuotaInfo(reset_day=1, total=1000.0, used=100.0),
+        level=2,
+    )
+
+
+class TestBootstrapCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "bootstrap.json")
+
+    async def test_restores_within_ttl(self):
+        cache = BootstrapCache(self.path)
+        await cache.save_base_url("https://kxx.moe")
+        await cache.save_credential(COOKIE, credential())
+
+        restored = BootstrapCache(self.path)
+        self.assertEqual(restored.base_url(), "https://kxx.moe")
+        cred = restored.credential(COOKIE)
+        self.assertEqual(cred.username, "user")
+        self.assertEqual(cred.quota_remaining, 900.0)
+        self.assertTrue(restored.active)
+
+        # 服务器更新后的 Cookie 保存到配置文件后同样有效
+        self.assertIsNotNone(restored.credential(credential().cookies))
+
+    @unittest.skipIf(os.name == "nt", "Windows 不支持 POSIX 文件权限")
+    async def test_saved_file_is_private(self):
+        modes = []
+        replace = os.replace
+
+        def record_replace(src, dst):
+            modes.append(os.stat(src).st_mode & 0o777)
+            replace(src, dst)
+
+        # 替换之前的临时文件就已经只允许当前用户读写
+        with patch("kmdr.core.cache.os.replace", side_effect=record_replace):
+            await BootstrapCache(self.path).save_credential(COOKIE, credential())
+
+        self.assertEqual(modes, [0o600])
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    async def test_ignores_other_login(self):
+        cache = BootstrapCache(self.path)
+        await cache.save_credential(COOKIE, credential())
+        self.assertIsNone(BootstrapCache(self.path).credential({"VOLSKEY": "other"}))
+
+    async def test_expires_after_ttl(self):
+        cache = BootstrapCache(self.path)
+        await cache.save_base_url("https://kxx.moe")
+
+        with patch("kmdr.core.bootstrap.time.time", return_value=cache._base_url["saved_at"] + BOOTSTRAP_TTL + 1):
+            self.assertIsNone(BootstrapCache(self.path).base_url())
+
+
+class TestBootstrapFallback(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        async def moved(request: web.Request) -> web.Response:
+            raise web.HTTPFound("/login.php")
+
+        async def login(request: web.Request) -> web.Response:
+            return web.Response(text="login")
+
+        app = web.Application()
+        app.router.add_get("/my.php", moved)
+        app.router.add_get("/login.php", login)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.addAsyncCleanup(self.server.close)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = BootstrapCache(os.path.join(tmp.name, "bootstrap.json"))
+        await self.cache.save_base_url(str(self.server.make_url("/")))
+
+        self.session = ClientSession(trace_configs=[self.cache.trace_config()])
+        self.addAsyncCleanup(self.session.close)
+
+    async def test_redirect_while_using_cache_expires_it(self):
+        self.assertIsNotNone(self.cache.base_url())
+
+        with self.assertRaises(BootstrapExpiredError):
+            async with self.session.get(self.server.make_url("/my.php")):
+                pass
+        self.assertIsNone(self.cache.base_url())
+
+    async def test_verify_detects_expired_cached_credential(self):
+        await self.cache.save_credential(COOKIE, credential())
+        self.assertIsNotNone(self.cache.credential(COOKIE))
+
+        async with ClientSession(base_url=str(self.server.make_url("/")), trace_configs=[self.cache.trace_config()]) as session:
+            # 书籍信息全部来自缓存时，verify 是确认前唯一的请求
+            with self.assertRaises(BootstrapExpiredError):
+                await self.cache.verify(session, COOKIE)
+        self.assertIsNone(self.cache.credential(COOKIE))
+
+    async def test_verify_skipped_without_cached_credential(self):
+        self.cache.base_url()
+
+        # 没有使用缓存的凭证时不发起请求，会话关闭后请求会失败
+        await self.session.close()
+        await self.cache.verify(self.session, COOKIE)
+        self.assertTrue(self.cache.active)
+
+    async def test_redirect_after_confirm_is_allowed(self):
+        self.cache.base_url()
+        self.cache.confirm()
+
+        async with self.session.get(self.server.make_url("/my.php")) as response:
+            self.assertEqual(await response.text(), "login")
+        self.assertIsNotNone(self.cache.base_url())
+
+
+if __name__ == "__main__":
+    unittest.main()
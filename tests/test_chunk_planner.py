@@ -0,0 +1,51 @@
+import unittest
+
+from kmdr.module.downloader.planner import MIN_SAMPLES, ChunkPlanner
+
+MB = 1024 * 1024
+
+
+def create_planner(throughput=2 * MB, ttfb=0.3, aggregate=None):
+    planner = ChunkPlanner()
+    for _ in range(MIN_SAMPLES):
+        planner.record_transfer(size=int(throughput * 2), ttfb=ttfb, duration=2.0)
+    if aggregate is not None:
+        planner.record_volume(size=int(aggregate * 10), elapsed=10.0)
+    return planner
+
+
+class TestChunkPlanner(unittest.TestCase):
+    def test_no_plan_without_history(self):
+        planner = ChunkPlanner()
+        planner.record_transfer(size=10 * MB, ttfb=0.2, duration=1.0)
+
+        self.assertIsNone(planner.plan(100 * MB, free_slots=8))
+
+    def test_ignore_tiny_samples(self):
+        planner = ChunkPlanner()
+        for _ in range(MIN_SAMPLES):
+            planner.record_transfer(size=1024, ttfb=0.2, duration=0.01)
+
+        self.assertFalse(planner.ready)
+
+    def test_use_free_slots_when_bandwidth_unbounded(self):
+        planner = create_planner()
+
+        chunk_size = planner.plan(80 * MB, free_slots=8)
+
+        self.assertEqual(chunk_size, 10 * MB)
+
+    def test_fewer_chunks_when_aggregate_is_saturated(self):
+        # 总吞吐只有单连接的两倍，继续增加分片只会增加请求开销
+        planner = create_planner(aggregate=4 * MB)
+
+        chunk_size = planner.plan(80 * MB, free_slots=8)
+
+        self.assertEqual(chunk_size, 40 * MB)
+
+    def test_single_chunk_when_overhead_dominates(self):
+        planner = create_planner(ttfb=5.0, aggregate=2 * MB)
+
+        chunk_size = planner.plan(1 * MB, free_slots=8)
+
+        self.assertEqual(chunk_size, 1 * MB)
@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import aiohttp
+
+from kmdr.core.circuit import CircuitBreakerRegistry, CircuitState
+from kmdr.core.error import CircuitOpenError
+
+URL = "https://cdn.example.com/file"
+
+
+def server_error(status: int = 503) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(request_info=MagicMock(), history=(), status=status)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = patch("kmdr.core.circuit.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.registry = CircuitBreakerRegistry(threshold=3, cooldown=10.0)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.registry.record_failure(URL, aiohttp.ClientConnectionError())
+        self.registry.guard(URL)
+
+        self.registry.record_failure(URL, server_error())
+        self.assertTrue(self.registry.is_open(URL))
+        with self.assertRaises(CircuitOpenError):
+            self.registry.guard(URL)
+
+        # 其他主机不受影响
+        self.registry.guard("https://mirror.example.com/")
+
+    def test_client_errors_do_not_count(self):
+        for _ in range(5):
+            self.registry.record_failure(URL, server_error(403))
+        self.assertFalse(self.registry.is_open(URL))
+
+    def test_success_resets_failures(self):
+        for _ in range(2):
+            self.registry.record_failure(URL, server_error())
+        self.registry.record_success(URL)
+        for _ in range(2):
+            self.registry.record_failure(URL, server_error())
+        self.assertFalse(self.registry.is_open(URL))
+
+    def test_concurrent_failures_count_once(self):
+        # 同时发出的请求（例如同一文件的多个分片）一起失败时只计一次
+        started_at = self.now
+        self.now += 1.0
+        for _ in range(5):
+            self.registry.record_failure(URL, server_error(502), started_at=started_at)
+        self.assertFalse(self.registry.is_open(URL))
+
+        # 上一次失败之后发出的请求继续失败时才会累计
+        for _ in range(2):
+            started_at = self.now
+            self.now += 1.0
+            self.registry.record_failure(URL, server_error(502), started_at=started_at)
+        self.assertTrue(self.registry.is_open(URL))
+        self.assertEqual(self.registry.retry_in(URL), 10.0)
+
+    def test_half_open_allows_single_probe(self):
+        for _ in range(3):
+            self.registry.record_failure(URL, server_error())
+
+        self.now += 10.0
+        self.registry.guard(URL)
+        with self.assertRaises(CircuitOpenError):
+            self.registry.guard(URL)
+        # 其他请求等待探测请求的结果
+        self.now += 4.0
+        self.assertEqual(self.registry.retry_in(URL), 6.0)
+
+        self.registry.record_success(URL)
+        self.assertEqual(self.registry.get(URL).state, CircuitState.CLOSED)
+        self.registry.guard(URL)
+
+    def test_failed_probe_extends_cooldown(self):
+        for _ in range(3):
+            self.registry.record_failure(URL, server_error())
+
+        self.now += 10.0
+        self.registry.guard(URL)
+        self.registry.record_failure(URL, server_error())
+
+        self.now += 10.0
+        with self.assertRaises(CircuitOpenError):
+            self.registry.guard(URL)
+        self.now += 10.0
+        self.registry.guard(URL)
+
+    def test_unresolved_url_always_allowed(self):
+        supplier = lambda: URL  # noqa: E731
+        for _ in range(5):
+            self.registry.record_failure(supplier, server_error())
+        self.registry.guard(supplier)
+
+
+if __name__ == "__main__":
+    unittest.main()
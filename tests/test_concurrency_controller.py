@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import aiohttp
+
+from kmdr.module.downloader import base, concurrency, ratelimit
+from kmdr.module.downloader.concurrency import ConcurrencyController, PrefetchGate, configure_concurrency
+from kmdr.module.downloader.FailoverDownloader import FailoverDownloader
+
+
+def throttled() -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(request_info=MagicMock(), history=(), status=429)
+
+
+class TestConcurrencyController(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = patch("kmdr.module.downloader.concurrency.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def transfer(self, controller: ConcurrencyController, size: int):
+        self.now += 2.0
+        controller.record_bytes(size)
+
+    async def test_grows_while_throughput_rises(self):
+        controller = ConcurrencyController(2, min_workers=1, max_workers=4)
+        await controller.acquire()
+        await controller.acquire()
+
+        self.transfer(controller, 1000)
+        self.transfer(controller, 2000)
+        self.assertEqual(controller.limit, 3)
+
+        # 吞吐没有继续提升时保持不变
+        await controller.acquire()
+        self.transfer(controller, 2000)
+        self.assertEqual(controller.limit, 3)
+
+    async def test_default_ceiling_is_num_workers(self):
+        controller = configure_concurrency(2)
+        await controller.acquire()
+        await controller.acquire()
+
+        self.transfer(controller, 1000)
+        self.transfer(controller, 2000)
+        # 没有指定 max_workers 时不会超过用户设定的并发数
+        self.assertEqual(controller.limit, 2)
+
+    def test_failover_delegate_shares_controller(self):
+        configure_rate_limiter = patch.object(base, "configure_rate_limiter", wraps=ratelimit.configure_rate_limiter)
+        with patch.object(concurrency, "_CONTROLLER", None), patch.object(ratelimit, "_LIMITER", None), configure_rate_limiter as configured:
+            downloader = FailoverDownloader(method=1, num_workers=4)
+
+            # 委托的下载器不会再次替换全局的并发控制与限速
+            self.assertIs(downloader._delegate._semaphore, downloader._semaphore)
+            self.assertIs(concurrency.get_concurrency_controller(), downloader._semaphore)
+            self.assertEqual(configured.call_count, 1)
+
+    async def test_does_not_grow_when_not_saturated(self):
+        controller = ConcurrencyController(2, max_workers=4)
+        await controller.acquire()
+
+        self.transfer(controller, 1000)
+        self.transfer(controller, 5000)
+        self.assertEqual(controller.limit, 2)
+
+    async def test_halves_once_per_window_on_throttling(self):
+        controller = ConcurrencyController(8, min_workers=3, max_workers=16)
+
+        controller.record_error(throttled())
+        controller.record_error(throttled())
+        self.assertEqual(controller.limit, 4)
+
+        self.now += 2.0
+        controller.record_error(throttled())
+        self.assertEqual(controller.limit, 3)
+
+        controller.record_error(aiohttp.ClientResponseError(request_info=MagicMock(), history=(), status=404))
+        self.assertEqual(controller.limit, 3)
+
+    async def test_waiters_respect_lowered_limit(self):
+        controller = ConcurrencyController(2, max_workers=4)
+        await controller.acquire()
+        await controller.acquire()
+        controller.record_error(throttled())
+
+        waiter = asyncio.ensure_future(controller.acquire())
+        controller.release()
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+
+        controller.release()
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(controller.available, 0)
+
+
+class TestPrefetchGate(unittest.IsolatedAsyncioTestCase):
+    async def test_admits_limit_plus_ahead(self):
+        controller = ConcurrencyController(2)
+        with patch("kmdr.module.downloader.concurrency.get_concurrency_controller", return_value=controller):
+            gate = PrefetchGate(ahead=1)
+            release = asyncio.Event()
+            entered = []
+
+            async def volume(i: int):
+                async with gate:
+                    entered.append(i)
+                    await release.wait()
+
+            tasks = [asyncio.create_task(volume(i)) for i in range(5)]
+            await asyncio.sleep(0)
+            self.assertEqual(entered, [0, 1, 2])
+
+            release.set()
+            await asyncio.gather(*tasks)
+            self.assertEqual(entered, [0, 1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from kmdr.core.connector import CONNECTOR_PROFILES, ConnectionStats, ConnectionWarmer
+
+
+class TestConnectionStats(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+
+        async def handler(request: web.Request) -> web.Response:
+            self.requests.append(request.method)
+            return web.Response(text="ok")
+
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.addAsyncCleanup(self.server.close)
+
+        self.stats = ConnectionStats()
+        self.session = ClientSession(
+            connector=CONNECTOR_PROFILES["balanced"].connector(limit=10),
+            trace_configs=[self.stats.trace_config()],
+        )
+        self.addAsyncCleanup(self.session.close)
+
+    async def test_counts_new_and_reused_connections(self):
+        for _ in range(3):
+            async with self.session.get(self.server.make_url("/file")) as response:
+                await response.read()
+
+        self.assertEqual(self.stats.created, 1)
+        self.assertEqual(self.stats.reused, 2)
+
+    async def test_warmed_connection_is_reused(self):
+        warmer = ConnectionWarmer()
+        warmer.enabled = True
+
+        url = str(self.server.make_url("/file"))
+        warmer.warm(self.session, url)
+        warmer.warm(self.session, url)
+        await asyncio.gather(*warmer._tasks)
+
+        async with self.session.get(url) as response:
+            await response.read()
+
+        # 同一主机只预热一次
+        self.assertEqual(self.requests, ["HEAD", "GET"])
+        self.assertEqual(self.stats.created, 1)
+        self.assertEqual(self.stats.reused, 1)
+
+    async def test_disabled_warmer_does_nothing(self):
+        warmer = ConnectionWarmer()
+        warmer.warm(self.session, str(self.server.make_url("/file")))
+        self.assertEqual(warmer._tasks, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from kmdr.module.downloader.buffers import BufferedSink, BufferPool
+from kmdr.module.downloader.writer import get_disk_writer
+
+
+class TestDiskWriter(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp_dir.name, "volume.epub.downloading")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_interleaved_ranges(self):
+        data = os.urandom(3 * 64 * 1024 + 123)
+        bounds = [(0, 64 * 1024), (64 * 1024, 2 * 64 * 1024), (2 * 64 * 1024, len(data))]
+
+        async def write_range(f, start, end):
+            for offset in range(start, end, 4096):
+                await f.write(offset, data[offset : min(offset + 4096, end)])
+                await asyncio.sleep(0)
+
+        async def run():
+            async with await get_disk_writer().open(self.path, truncate=True) as f:
+                await asyncio.gather(*(write_range(f, start, end) for start, end in bounds))
+
+        asyncio.run(run())
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_append_after_existing_content(self):
+        with open(self.path, "wb") as f:
+            f.write(b"head-")
+
+        async def run():
+            async with await get_disk_writer().open(self.path) as f:
+                await f.write(5, b"tail")
+                await f.flush()
+                self.assertEqual(os.path.getsize(self.path), 9)
+
+        asyncio.run(run())
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"head-tail")
+
+    def test_cancelled_close_keeps_queued_writes(self):
+        data = os.urandom(6 * 1024 * 1024)
+
+        async def run():
+            f = await get_disk_writer().open(self.path, truncate=True)
+            for offset in range(0, len(data), 256 * 1024):
+                await f.write(offset, data[offset : offset + 256 * 1024])
+
+            close = asyncio.ensure_future(f.close())
+            await asyncio.sleep(0)
+            close.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await close
+
+            # 文件在排队的数据写入后才由写入线程关闭
+            self.assertIsNone(await f._closed)
+
+        asyncio.run(run())
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_buffered_sink_reuses_buffers(self):
+        data = os.urandom(1024 * 1024 + 77)
+        pool = BufferPool(buffer_size=128 * 1024, max_free=4)
+
+        async def run():
+            async with await get_disk_writer().open(self.path, truncate=True) as f, BufferedSink(f, 0, pool) as sink:
+                for offset in range(0, len(data), 10000):
+                    await sink.feed(data[offset : offset + 10000])
+                    self.assertEqual(sink.offset, min(offset + 10000, len(data)))
+
+        asyncio.run(run())
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), data)
+        # 写入完成的缓冲区都已归还
+        self.assertGreater(len(pool._free), 0)
@@ -0,0 +1,221 @@
+import asyncio
+import os
+import re
+import tempfile
+import unittest
+from typing import Optional
+from unittest.mock import patch
+
+from aiohttp import ClientSession, web
+from aiohttp.client_exceptions import ClientError
+from aiohttp.test_utils import TestServer
+from rich.progress import Progress
+
+from kmdr.core.circuit import CircuitBreakerRegistry
+from kmdr.core.retry import RetryPolicy
+from kmdr.module.downloader import download_utils, stall
+from kmdr.module.downloader.planner import ChunkPlanner
+
+MB = 1024 * 1024
+DATA = bytes(range(256)) * (3 * MB // 256)
+
+
+class RangeServer:
+    """支持范围请求的测试服务器，可以按分片的起始位置模拟异常响应"""
+
+    def __init__(self):
+        self.data = DATA
+        self.requests: list[Optional[str]] = []
+        self.changed_from: Optional[int] = None
+        """从该位置开始的范围请求返回不同的 ETag"""
+        self.delay = 0.0
+        """除第一个分片外，每发送 64K 数据的间隔（秒）"""
+        self.stall_after: Optional[int] = None
+        """非范围请求发送该字节数后停止发送数据"""
+        self.fail_once: set[Optional[int]] = set()
+        """这些起始位置（非范围请求为 None）的第一次请求返回 502"""
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        range_header = request.headers.get("Range")
+        self.requests.append(range_header)
+
+        match = re.match(r"bytes=(\d+)-(\d*)", range_header or "")
+        start = int(match.group(1)) if match else None
+        if start in self.fail_once:
+            self.fail_once.discard(start)
+            return web.Response(status=502)
+
+        if range_header is None:
+            if self.stall_after is None:
+                return web.Response(body=self.data, headers={"ETag": '"v2"'})
+            response = web.StreamResponse(headers={"Content-Length": str(len(self.data))})
+            await response.prepare(request)
+            await response.write(self.data[: self.stall_after])
+            await asyncio.sleep(60)
+            return response
+
+        end = min(int(match.group(2)) if match.group(2) else len(self.data) - 1, len(self.data) - 1)
+        etag = '"v2"' if self.changed_from is not None and start >= self.changed_from else '"v1"'
+
+        body = self.data[start : end + 1]
+        response = web.StreamResponse(
+            status=206,
+            headers={"Content-Range": f"bytes {start}-{end}/{len(self.data)}", "Content-Length": str(len(body)), "ETag": etag},
+        )
+        await response.prepare(request)
+        for offset in range(0, len(body), 64 * 1024):
+            await response.write(body[offset : offset + 64 * 1024])
+            if start > 0 and self.delay:
+                await asyncio.sleep(self.delay)
+        return response
+
+
+class DownloadTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = RangeServer()
+        app = web.Application()
+        app.router.add_get("/file", self.server.handle)
+        self.test_server = TestServer(app)
+        await self.test_server.start_server()
+        self.addAsyncCleanup(self.test_server.close)
+
+        self.session = ClientSession()
+        self.addAsyncCleanup(self.session.close)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dest = tmp.name
+
+        # 不使用本地的历史传输数据，分片大小只由固定策略决定
+        planner = patch.object(download_utils, "get_chunk_planner", return_value=ChunkPlanner())
+        planner.start()
+        self.addCleanup(planner.stop)
+
+        # 每个测试使用独立的熔断器，缩短重试的等待时间
+        self.breakers = CircuitBreakerRegistry()
+        for target, value in (("get_circuit_breakers", self.breakers), ("get_retry_policy", RetryPolicy(base_delay=0.05, max_delay=0.1))):
+            patcher = patch.object(download_utils, target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.url = str(self.test_server.make_url("/file"))
+
+    def assert_downloaded(self, filename: str = "a.epub"):
+        with open(os.path.join(self.dest, filename), "rb") as f:
+            self.assertEqual(f.read(), self.server.data)
+
+
+class TestDownloadFileMultipart(DownloadTestCase):
+    async def download(self, **kwargs):
+        with Progress(disable=True) as progress:
+            await download_utils.download_file_multipart(
+                self.session, asyncio.Semaphore(4), progress, self.url, self.dest, "a.epub", retry_times=1, chunk_size_mb=1, **kwargs
+            )
+
+    async def test_plans_parts_from_first_content_range(self):
+        # 不单独探测文件大小，第一个分片的 Content-Range 给出文件大小后再规划其余分片
+        await self.download()
+
+        self.assertEqual(self.server.requests, [f"bytes=0-{MB - 1}", f"bytes={MB}-{2 * MB - 1}", f"bytes={2 * MB}-{3 * MB - 1}"])
+        self.assert_downloaded()
+        self.assertEqual(sorted(os.listdir(self.dest)), ["a.epub"])
+
+    async def test_file_smaller_than_first_range(self):
+        self.server.data = DATA[: 300 * 1024]
+
+        await self.download()
+
+        self.assertEqual(self.server.requests, [f"bytes=0-{MB - 1}"])
+        self.assert_downloaded()
+        self.assertEqual(sorted(os.listdir(self.dest)), ["a.epub"])
+
+    async def test_small_size_hint_uses_single_stream(self):
+        self.server.data = DATA[: 300 * 1024]
+
+        await self.download(size_hint=len(self.server.data))
+
+        self.assertEqual(self.server.requests, [None])
+        self.assert_downloaded()
+        self.assertEqual(sorted(os.listdir(self.dest)), ["a.epub"])
+
+    async def test_large_size_hint_uses_multipart(self):
+        await self.download(size_hint=len(DATA))
+
+        self.assertGreater(len(self.server.requests), 1)
+        self.assertTrue(all(range_header is not None for range_header in self.server.requests))
+        self.assert_downloaded()
+
+    async def test_small_size_hint_resumes_multipart(self):
+        # 已有续传日志时，即使预计大小较小也继续分片下载
+        self.server.data = DATA[: 300 * 1024]
+        with open(os.path.join(self.dest, "a.epub.mp.state"), "w") as f:
+            f.write("{}")
+
+        await self.download(size_hint=len(self.server.data))
+
+        self.assertEqual(self.server.requests, [f"bytes=0-{len(self.server.data) - 1}"])
+        self.assert_downloaded()
+        self.assertEqual(sorted(os.listdir(self.dest)), ["a.epub"])
+
+    async def test_transient_part_errors_do_not_open_circuit(self):
+        # 多个分片同时遇到一次短暂的 502，只说明主机出错了一次，分片重试后完成下载
+        self.server.data = bytes(range(256)) * (8 * MB // 256)
+        self.server.fail_once = {index * MB for index in range(1, 8)}
+
+        await self.download()
+
+        self.assert_downloaded()
+        self.assertEqual(sorted(os.listdir(self.dest)), ["a.epub"])
+        self.assertFalse(self.breakers.is_open(self.url))
+
+    async def test_fallback_stops_other_parts(self):
+        # 第二个分片发现文件已经变化，回退到普通下载时其余分片不能继续写入
+        self.server.changed_from = 2 * MB
+        self.server.delay = 0.05
+
+        await self.download()
+
+        workers = [task for task in asyncio.all_tasks() if task.get_coro().__name__ == "_download_part_worker"]
+        self.assertEqual(workers, [])
+        self.assert_downloaded()
+        self.assertEqual(sorted(os.listdir(self.dest)), ["a.epub"])
+
+    async def test_removes_legacy_part_files(self):
+        # 旧版本按分片保存的临时文件不会再被使用
+        for name in ("a.epub.mp.001.downloading", "a.epub.mp.002.downloading"):
+            with open(os.path.join(self.dest, name), "wb") as f:
+                f.write(b"old")
+
+        await self.download()
+
+        self.assert_downloaded()
+        self.assertEqual(sorted(os.listdir(self.dest)), ["a.epub"])
+
+
+class TestDownloadFile(DownloadTestCase):
+    async def test_stall_without_resume_consumes_attempts(self):
+        # 不能续传时每次都从头开始，总是在同一位置停滞的服务器不能无限重新连接
+        self.server.stall_after = 256 * 1024
+        with patch.object(stall, "STALL_WINDOW", 0.2), patch.object(stall, "CHECK_INTERVAL", 0.05):
+            with Progress(disable=True) as progress, self.assertRaises(ClientError):
+                await asyncio.wait_for(
+                    download_utils.download_file(
+                        self.session, asyncio.Semaphore(1), progress, self.url, self.dest, "a.epub", retry_times=1, resumable=False
+                    ),
+                    timeout=10,
+                )
+        self.assertEqual(self.server.requests, [None, None])
+
+    async def test_open_circuit_delays_retry(self):
+        # 熔断期间等待冷却结束后重试，而不是直接放弃
+        self.breakers = CircuitBreakerRegistry(threshold=1, cooldown=0.2)
+        self.server.fail_once = {None}
+        with patch.object(download_utils, "get_circuit_breakers", return_value=self.breakers), Progress(disable=True) as progress:
+            await download_utils.download_file(self.session, asyncio.Semaphore(1), progress, self.url, self.dest, "a.epub", retry_times=1)
+
+        self.assert_downloaded()
+        self.assertEqual(self.server.requests, [None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
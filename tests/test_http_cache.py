@@ -0,0 +1,131 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from kmdr.core.http_cache import CacheRule, HttpCache, parse_cache_ttl
+
+ETAG = '"v1"'
+
+
+class TestHttpCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests: list[web.Request] = []
+
+        async def book(request: web.Request) -> web.Response:
+            self.requests.append(request)
+            if request.headers.get("If-None-Match") == ETAG:
+                response = web.Response(status=304)
+                response.set_cookie("VLIBSID", "refreshed")
+                return response
+            return web.Response(text=f"book {request.match_info['id']}", headers={"ETag": ETAG})
+
+        async def other(request: web.Request) -> web.Response:
+            self.requests.append(request)
+            return web.Response(text="other")
+
+        app = web.Application()
+        app.router.add_get("/c/{id}.htm", book)
+        app.router.add_get("/other.php", other)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.addAsyncCleanup(self.server.close)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+        self.session = ClientSession(base_url=str(self.server.make_url("/")))
+        self.addAsyncCleanup(self.session.close)
+
+    def cache(self, ttl: float = 600, max_bytes: int = 1024) -> HttpCache:
+        return HttpCache(self.directory, rules=(CacheRule("book", r"^/c/\d+\.htm", ttl),), max_bytes=max_bytes)
+
+    async def test_fresh_entry_skips_request(self):
+        page = await self.cache().get(self.session, "/c/1.htm")
+        self.assertFalse(page.from_cache)
+
+        # 新的实例从磁盘读取缓存
+        page = await self.cache().get(self.session, "/c/1.htm")
+        self.assertTrue(page.from_cache)
+        self.assertEqual(page.text, "book 1")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_concurrent_hits_keep_index_readable(self):
+        cache = self.cache()
+        await cache.get(self.session, "/c/1.htm")
+
+        # 同时命中缓存时不会损坏索引
+        pages = await asyncio.gather(*(cache.get(self.session, "/c/1.htm") for _ in range(20)))
+        self.assertTrue(all(page.from_cache for page in pages))
+        self.assertTrue((await self.cache().get(self.session, "/c/1.htm")).from_cache)
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_expired_entry_revalidates(self):
+        cache = self.cache(ttl=0)
+        await cache.get(self.session, "/c/1.htm")
+        page = await cache.get(self.session, "/c/1.htm")
+
+        self.assertTrue(page.from_cache)
+        self.assertEqual(page.text, "book 1")
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1].headers.get("If-None-Match"), ETAG)
+        # 304 响应设置的 Cookie 同样返回给调用方，并保存到缓存中
+        self.assertEqual(page.cookies, {"VLIBSID": "refreshed"})
+        self.assertEqual((await self.cache(ttl=600).get(self.session, "/c/1.htm")).cookies, {"VLIBSID": "refreshed"})
+
+    async def test_fresh_hit_does_not_rewrite_index(self):
+        cache = self.cache()
+        await cache.get(self.session, "/c/1.htm")
+
+        with patch("kmdr.core.http_cache.write_json") as write_json:
+            page = await cache.get(self.session, "/c/1.htm")
+        self.assertTrue(page.from_cache)
+        write_json.assert_not_called()
+
+    async def test_cookies_are_part_of_key(self):
+        cache = self.cache()
+        await cache.get(self.session, "/c/1.htm")
+        page = await cache.get(self.session, "/c/1.htm", cookies={"VOLSKEY": "abc"})
+
+        self.assertFalse(page.from_cache)
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_unmatched_path_is_not_cached(self):
+        cache = self.cache()
+        await cache.get(self.session, "/other.php")
+        await cache.get(self.session, "/other.php")
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_evicts_least_recently_used(self):
+        # 每个页面 6 字节，上限只能容纳两个页面
+        cache = self.cache(max_bytes=12)
+        with patch("kmdr.core.http_cache.time.time", side_effect=range(100, 200)):
+            await cache.get(self.session, "/c/1.htm")
+            await cache.get(self.session, "/c/2.htm")
+            await cache.get(self.session, "/c/1.htm")
+            await cache.get(self.session, "/c/3.htm")
+
+            self.assertTrue((await cache.get(self.session, "/c/1.htm")).from_cache)
+            self.assertFalse((await cache.get(self.session, "/c/2.htm")).from_cache)
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.endswith(".html")]), 2)
+
+
+class TestParseCacheTtl(unittest.TestCase):
+    def test_parses_rules(self):
+        self.assertEqual(parse_cache_ttl("book=600, search=0"), {"book": 600.0, "search": 0.0})
+
+    def test_rejects_unknown_rule(self):
+        with self.assertRaises(ValueError):
+            parse_cache_ttl("unknown=10")
+
+        with self.assertRaises(ValueError):
+            parse_cache_ttl("book")
+
+
+if __name__ == "__main__":
+    unittest.main()
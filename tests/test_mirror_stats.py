@@ -0,0 +1,136 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from kmdr.core.mirror import SEED_BONUS, MirrorStats
+from kmdr.core.session import KmdrSessionManager
+from kmdr.core.utils import PrioritySorter
+
+A, B, C = "https://a.moe", "https://b.moe", "https://c.moe"
+
+
+class TestMirrorStats(unittest.TestCase):
+    def sorter(self) -> PrioritySorter[str]:
+        sorter = PrioritySorter[str]()
+        for url in (A, B, C):
+            sorter.set(url)
+        return sorter
+
+    def test_seed_prefers_fast_healthy_mirrors(self):
+        stats = MirrorStats()
+        stats.record_success(A, 0.8)
+        stats.record_success(B, 0.1)
+        stats.record_failure(C)
+
+        sorter = self.sorter()
+        stats.seed(sorter)
+
+        self.assertEqual(sorter.sort(), [B, A, C])
+        self.assertEqual(sorter.get(B), PrioritySorter.DEFAULT_ORDER + SEED_BONUS)
+        self.assertEqual(sorter.get(C), PrioritySorter.DEFAULT_ORDER - SEED_BONUS)
+
+    def test_seed_ignores_unknown_mirrors(self):
+        stats = MirrorStats()
+        stats.record_success("https://gone.moe", 0.1)
+
+        sorter = self.sorter()
+        stats.seed(sorter)
+        self.assertIsNone(sorter.get("https://gone.moe"))
+
+    def test_persists_across_runs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mirrors.json")
+            stats = MirrorStats(path)
+            stats.record_success(A, 0.2)
+            stats.dump()
+
+            sorter = self.sorter()
+            MirrorStats(path).seed(sorter)
+            self.assertEqual(sorter.sort()[0], A)
+
+
+class TestMirrorListRefresh(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.response = web.Response(text='{"default": "https://a.moe/", "alternatives": ["https://b.moe", "http://c.moe"]}')
+
+        async def mirrors(request: web.Request) -> web.Response:
+            return self.response
+
+        app = web.Application()
+        app.router.add_get("/mirrors.json", mirrors)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.addAsyncCleanup(self.server.close)
+
+        patcher = patch("kmdr.core.mirror.MIRROR_LIST_URL", str(self.server.make_url("/mirrors.json")))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def refresh(self, stats: MirrorStats):
+        async with ClientSession() as session:
+            await stats.refresh_list(session)
+
+    async def test_updates_list_after_success(self):
+        stats = MirrorStats()
+        await self.refresh(stats)
+
+        self.assertEqual(stats.listed(), [A, B])
+        self.assertFalse(stats.list_expired)
+
+    async def test_failure_keeps_list_expired(self):
+        # 获取失败时不能把原有的列表当作最新的列表保存
+        self.response = web.Response(status=502)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mirrors.json")
+            stats = MirrorStats(path)
+            await self.refresh(stats)
+            stats.dump()
+
+            self.assertTrue(stats.list_expired)
+            self.assertFalse(os.path.exists(path))
+
+
+class TestMirrorRace(unittest.IsolatedAsyncioTestCase):
+    async def race(self, results: dict) -> tuple:
+        started = []
+
+        async def probe(session, base_url):
+            started.append(base_url)
+            delay, healthy, redirect = results[base_url]
+            await asyncio.sleep(delay)
+            return healthy, redirect
+
+        manager = KmdrSessionManager.__new__(KmdrSessionManager)
+        with patch.object(manager, "_probe", side_effect=probe):
+            winner = await manager._race(None, [A, B, C])
+        return winner, started
+
+    async def test_first_healthy_responder_wins(self):
+        # A 没有响应时，稍后开始的 B 先通过探测
+        winner, started = await self.race({A: (5, True, None), B: (0.01, True, None), C: (0.01, True, None)})
+        self.assertEqual(winner, B)
+        self.assertEqual(started, [A, B])
+
+    async def test_failure_starts_next_probe_immediately(self):
+        winner, started = await self.race({A: (0, False, None), B: (0, False, None), C: (0, True, None)})
+        self.assertEqual(winner, C)
+
+    async def test_follows_redirect(self):
+        target = "https://new.moe"
+        results = {A: (0, False, target), B: (5, True, None), C: (5, True, None), target: (0, True, None)}
+        winner, started = await self.race(results)
+        self.assertEqual(winner, target)
+        self.assertEqual(started[:2], [A, target])
+
+    async def test_returns_none_when_all_fail(self):
+        winner, _ = await self.race({A: (0, False, None), B: (0, False, None), C: (0, False, None)})
+        self.assertIsNone(winner)
+
+
+if __name__ == "__main__":
+    unittest.main()
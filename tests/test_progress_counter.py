@@ -0,0 +1,32 @@
+import asyncio
+import unittest
+
+from rich.progress import Progress
+
+from kmdr.module.downloader.misc import ProgressCounter
+
+
+class TestProgressCounter(unittest.TestCase):
+    def test_flush_on_timer_and_close(self):
+        emitted = []
+
+        async def run(progress: Progress, task_id):
+            counter = ProgressCounter(progress, task_id, completed=100, total=1100, on_emit=emitted.append, emit_interval=300, flush_interval=0.01)
+            async with counter:
+                for _ in range(4):
+                    counter.add(100)
+                # 计数不会立即写入进度条
+                self.assertEqual(progress.tasks[task_id].completed, 100)
+
+                await asyncio.sleep(0.05)
+                self.assertEqual(progress.tasks[task_id].completed, 500)
+
+                for _ in range(6):
+                    counter.add(100)
+
+        with Progress(disable=True) as progress:
+            task_id = progress.add_task("download", total=1100, completed=100)
+            asyncio.run(run(progress, task_id))
+
+            self.assertEqual(progress.tasks[task_id].completed, 1100)
+        self.assertEqual(emitted, [45.5, 100.0])
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from kmdr.module.downloader.misc import PartRange, RangeScheduler, ResumeSidecar
+
+MB = 1024 * 1024
+
+
+class TestRangeScheduler(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.sidecar_path = os.path.join(self._tmp_dir.name, "volume.epub.mp.state")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def create_scheduler(self, ranges):
+        sidecar = ResumeSidecar(self.sidecar_path, sum(p.size for p in ranges), ranges)
+        return sidecar, RangeScheduler(sidecar, min_split_size=1 * MB)
+
+    def test_split_largest_streaming_range(self):
+        small = PartRange(start=0, end=4 * MB - 1, written=1 * MB, owned=True, streaming=True)
+        large = PartRange(start=4 * MB, end=12 * MB - 1, written=2 * MB, owned=True, streaming=True)
+        sidecar, scheduler = self.create_scheduler([small, large])
+
+        stolen = asyncio.run(scheduler.steal())
+
+        assert stolen is not None
+        self.assertEqual(large.end + 1, stolen.start)
+        self.assertEqual(stolen.end, 12 * MB - 1)
+        self.assertEqual(large.unclaimed, stolen.size)
+        self.assertEqual(len(sidecar.ranges), 3)
+        self.assertEqual(small.end, 4 * MB - 1)
+
+    def test_split_after_pending_write(self):
+        part = PartRange(start=0, end=4 * MB - 1, written=1 * MB, pending=1 * MB, owned=True, streaming=True)
+        _, scheduler = self.create_scheduler([part])
+
+        stolen = asyncio.run(scheduler.steal())
+
+        # 正在写入的数据不能被拆分出去
+        assert stolen is not None
+        self.assertGreaterEqual(stolen.start, part.start + part.written + part.pending)
+        self.assertEqual(part.end + 1, stolen.start)
+
+    def test_no_split_while_ranges_are_queued(self):
+        streaming = PartRange(start=0, end=8 * MB - 1, owned=True, streaming=True)
+        queued = PartRange(start=8 * MB, end=16 * MB - 1, owned=True)
+        _, scheduler = self.create_scheduler([streaming, queued])
+
+        async def steal_then_finish():
+            task = asyncio.ensure_future(scheduler.steal())
+            await asyncio.sleep(0)
+            self.assertFalse(task.done())
+
+            streaming.written = streaming.size
+            streaming.owned = streaming.streaming = False
+            queued.written = queued.size
+            queued.owned = False
+            scheduler.notify()
+            return await task
+
+        self.assertIsNone(asyncio.run(steal_then_finish()))
+
+    def test_no_split_for_small_remaining(self):
+        part = PartRange(start=0, end=3 * MB - 1, written=2 * MB, owned=False, streaming=True)
+        _, scheduler = self.create_scheduler([part])
+
+        self.assertIsNone(asyncio.run(scheduler.steal()))
+
+    def test_hedge_slow_tail_range(self):
+        fast = PartRange(start=0, end=1 * MB - 1, owned=True, streaming=True, streamed=1 * MB, streamed_at=time.monotonic() - 1)
+        fast.written = fast.size
+        slow = PartRange(start=1 * MB, end=2 * MB - 1, written=512 * 1024, owned=True, streaming=True)
+        slow.streamed, slow.streamed_at = slow.written, time.monotonic() - 10
+        sidecar, scheduler = self.create_scheduler([fast, slow])
+        scheduler.release(fast)
+
+        hedge = asyncio.run(scheduler.steal())
+
+        assert hedge is not None
+        self.assertIs(hedge.hedge_of, slow)
+        self.assertTrue(slow.hedged)
+        self.assertEqual(hedge.start, slow.claimed_end)
+        # 对冲请求完成前不会改变原分片
+        self.assertEqual(len(sidecar.ranges), 2)
+
+        slow.written += 128 * 1024
+        self.assertEqual(scheduler.commit_hedge(hedge), 1 * MB + 640 * 1024)
+        self.assertEqual(slow.end + 1, hedge.start)
+        self.assertTrue(slow.done)
+        self.assertEqual(len(sidecar.ranges), 3)
+
+    def test_hedge_abandoned_when_original_finishes(self):
+        slow = PartRange(start=0, end=1 * MB - 1, written=512 * 1024, owned=True, streaming=True, hedged=True)
+        _, scheduler = self.create_scheduler([slow])
+        hedge = PartRange(start=slow.claimed_end, end=slow.end, owned=True, hedge_of=slow)
+
+        slow.written = slow.size
+        self.assertIsNone(scheduler.commit_hedge(hedge))
+        self.assertEqual(slow.end, 1 * MB - 1)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from kmdr.core.defaults import Configurer
+from kmdr.core.utils import parse_byte_size
+from kmdr.module.downloader import concurrency, ratelimit
+from kmdr.module.downloader.ratelimit import TokenBucket
+from kmdr.module.downloader.ReferViaDownloader import ReferViaDownloader
+
+KB = 1024
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_parse_byte_size(self):
+        self.assertEqual(parse_byte_size("512"), 512)
+        self.assertEqual(parse_byte_size("2k"), 2 * KB)
+        self.assertEqual(parse_byte_size("1.5MB"), int(1.5 * KB * KB))
+        self.assertRaises(ValueError, parse_byte_size, "fast")
+        self.assertRaises(ValueError, parse_byte_size, "-1M")
+
+    def test_unlimited(self):
+        bucket = TokenBucket()
+
+        started = time.monotonic()
+        asyncio.run(bucket.acquire(100 * KB * KB))
+        self.assertLess(time.monotonic() - started, 0.1)
+
+    def test_limit_concurrent_acquire(self):
+        bucket = TokenBucket(rate=1024 * KB, burst=64 * KB)
+
+        async def consume():
+            for _ in range(8):
+                await bucket.acquire(32 * KB)
+
+        async def run():
+            started = time.monotonic()
+            await asyncio.gather(consume(), consume())
+            return time.monotonic() - started
+
+        # 共 512K，扣除 64K 的突发后按 1M/s 约需 0.44 秒
+        elapsed = asyncio.run(run())
+        self.assertGreater(elapsed, 0.35)
+        self.assertLess(elapsed, 1.0)
+
+    def test_downloader_configures_shared_limiter(self):
+        with patch.object(ratelimit, "_LIMITER", None), patch.object(concurrency, "_CONTROLLER", None):
+            ReferViaDownloader(rate_limit=64 * KB)
+
+            limiter = ratelimit.get_rate_limiter()
+            self.assertEqual(limiter._rate, 64 * KB)
+            self.assertEqual(limiter._config_path, Configurer().path)
+
+    def test_reload_from_config_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, ".kmdr")
+            with open(path, "w") as f:
+                json.dump({"option": {"rate_limit": 1024 * KB}}, f)
+
+            bucket = TokenBucket(rate=2048 * KB, config_path=path)
+            # 命令行指定的限速优先于启动时的配置
+            self.assertEqual(bucket.rate, 2048 * KB)
+
+            with open(path, "w") as f:
+                json.dump({"option": {"rate_limit": 512 * KB}}, f)
+            os.utime(path, (time.time() + 10, time.time() + 10))
+
+            async def run():
+                await bucket.acquire(1)
+                # 配置文件由后台任务读取，取用令牌本身不会等待
+                await asyncio.sleep(0.2)
+
+            original_interval = ratelimit.RELOAD_INTERVAL
+            ratelimit.RELOAD_INTERVAL = 0.05
+            try:
+                asyncio.run(run())
+            finally:
+                ratelimit.RELOAD_INTERVAL = original_interval
+            self.assertEqual(bucket.rate, 512 * KB)
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from kmdr.module.downloader.misc import PartRange, ResumeSidecar
+
+
+class TestResumeSidecar(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self._tmp_dir.name, "volume.epub.mp.downloading")
+        self.sidecar_path = os.path.join(self._tmp_dir.name, "volume.epub.mp.state")
+
+        self.data = os.urandom(4096)
+        with open(self.data_path, "wb") as f:
+            f.write(self.data)
+
+        ranges = [PartRange(start=0, end=2047), PartRange(start=2048, end=4095)]
+        for part in ranges:
+            part.update(self.data[part.start : part.start + 1000])
+            part.checkpoint()
+        asyncio.run(ResumeSidecar(self.sidecar_path, len(self.data), ranges, identity='"etag-1"').save())
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_verify_resets_damaged_ranges(self):
+        with open(self.data_path, "r+b") as f:
+            f.seek(2100)
+            f.write(b"\x00" if self.data[2100] else b"\x01")
+
+        sidecar = ResumeSidecar.load(self.sidecar_path, len(self.data), '"etag-1"')
+        assert sidecar is not None
+
+        self.assertEqual(sidecar.verify(self.data_path), 1)
+        self.assertEqual([p.written for p in sidecar.ranges], [1000, 0])
+
+    def test_ignore_changed_identity(self):
+        self.assertIsNone(ResumeSidecar.load(self.sidecar_path, len(self.data), '"etag-2"'))
+        self.assertIsNone(ResumeSidecar.load(self.sidecar_path, len(self.data) + 1, '"etag-1"'))
+
+        sidecar = ResumeSidecar.load(self.sidecar_path, len(self.data))
+        assert sidecar is not None
+        self.assertEqual(sidecar.identity, '"etag-1"')
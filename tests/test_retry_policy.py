@@ -0,0 +1,51 @@
+import unittest
+from email.utils import formatdate
+from time import time
+from unittest.mock import MagicMock
+
+import aiohttp
+
+from kmdr.core.retry import RetryPolicy, parse_retry_after
+
+
+def throttled(retry_after: str) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(request_info=MagicMock(), history=(), status=429, headers={"Retry-After": retry_after})
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_decorrelated_jitter_bounds(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=20.0)
+        state = policy.start()
+
+        previous = state.next_delay()
+        self.assertEqual(previous, 1.0)
+        for _ in range(20):
+            delay = state.next_delay()
+            assert delay is not None
+            self.assertGreaterEqual(delay, 1.0)
+            self.assertLessEqual(delay, min(20.0, previous * 3))
+            previous = delay
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("5"), 5.0)
+        self.assertEqual(parse_retry_after("100000"), 120.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertAlmostEqual(parse_retry_after(formatdate(time() + 30, usegmt=True)), 30.0, delta=2.0)
+
+    def test_retry_after_blocks_same_host(self):
+        policy = RetryPolicy(base_delay=0.5, jitter=False)
+
+        self.assertGreaterEqual(policy.start().next_delay(throttled("10"), "https://cdn.example.com/a"), 9.0)
+        # 同一主机的其他请求也会等待服务器要求的时间
+        self.assertGreaterEqual(policy.start().next_delay(None, "https://cdn.example.com/b"), 9.0)
+        self.assertEqual(policy.start().next_delay(None, "https://other.example.com/b"), 0.5)
+        self.assertEqual(policy.hosts["cdn.example.com"].retries, 2)
+
+    def test_budget(self):
+        policy = RetryPolicy(base_delay=0.1)
+        policy.reset_budget(2)
+
+        state = policy.start()
+        self.assertIsNotNone(state.next_delay())
+        self.assertIsNotNone(policy.start().next_delay())
+        self.assertIsNone(state.next_delay())
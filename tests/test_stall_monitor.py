@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from kmdr.module.downloader.stall import STALL_WINDOW, StallMonitor
+
+
+class TestStallMonitor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = patch("kmdr.module.downloader.stall.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.monitor = StallMonitor()
+
+    def run_for(self, seconds: float, speeds: dict) -> list:
+        stalled = []
+        for _ in range(int(seconds)):
+            self.now += 1.0
+            for watch, speed in speeds.items():
+                watch.add(speed)
+            stalled += self.monitor.check(self.now)
+        return stalled
+
+    async def test_aborts_connection_far_below_peers(self):
+        fast = [self.monitor.watch(MagicMock()) for _ in range(3)]
+        abort = MagicMock()
+        slow = self.monitor.watch(abort)
+
+        stalled = self.run_for(STALL_WINDOW + 1, {**{w: 1_000_000 for w in fast}, slow: 50_000})
+
+        self.assertEqual(stalled, [slow])
+        self.assertTrue(slow.stalled)
+        abort.assert_called_once()
+        self.assertFalse(any(w.stalled for w in fast))
+
+    async def test_waits_for_full_window(self):
+        fast = self.monitor.watch(MagicMock())
+        slow = self.monitor.watch(MagicMock())
+
+        self.assertEqual(self.run_for(STALL_WINDOW - 1, {fast: 1_000_000, slow: 0}), [])
+
+    async def test_single_connection_only_aborted_when_idle(self):
+        watch = self.monitor.watch(MagicMock())
+        self.assertEqual(self.run_for(STALL_WINDOW + 1, {watch: 1}), [])
+
+        self.assertEqual(self.run_for(STALL_WINDOW + 1, {watch: 0}), [watch])
+
+    async def test_uniformly_slow_connections_are_kept(self):
+        # 例如开启了限速，所有连接都很慢
+        watches = [self.monitor.watch(MagicMock()) for _ in range(4)]
+        self.assertEqual(self.run_for(STALL_WINDOW * 2, {w: 1_000 for w in watches}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from kmdr.core.throttle import BASE_PAUSE, RAMP_SPACING, ThrottleCoordinator
+
+HOST = "cdn.example.com"
+
+
+class TestThrottleCoordinator(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = patch("kmdr.core.throttle.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.sleep = AsyncMock()
+        patcher = patch("kmdr.core.throttle.asyncio.sleep", self.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.coordinator = ThrottleCoordinator()
+
+    def slept(self) -> list[float]:
+        delays = [call.args[0] for call in self.sleep.await_args_list]
+        self.sleep.reset_mock()
+        return delays
+
+    async def test_unthrottled_host_does_not_wait(self):
+        self.coordinator.on_response(HOST, 200)
+        await self.coordinator.wait(HOST)
+        self.assertEqual(self.slept(), [])
+
+    async def test_pauses_all_starts_then_ramps_up(self):
+        self.coordinator.on_response(HOST, 429, "5")
+
+        for _ in range(3):
+            await self.coordinator.wait(HOST)
+        self.assertEqual(self.slept(), [5.0, 5.0 + RAMP_SPACING, 5.0 + RAMP_SPACING * 2])
+
+        # 其他主机不受影响
+        await self.coordinator.wait("api.example.com")
+        self.assertEqual(self.slept(), [])
+
+    async def test_concurrent_throttles_do_not_stack(self):
+        for _ in range(5):
+            self.coordinator.on_response(HOST, 503)
+
+        await self.coordinator.wait(HOST)
+        self.assertEqual(self.slept(), [BASE_PAUSE])
+
+    async def test_throttled_again_while_ramping_doubles_pause(self):
+        self.coordinator.on_response(HOST, 429)
+        self.now += BASE_PAUSE + 0.1
+        self.coordinator.on_response(HOST, 429)
+
+        self.now += 0.01
+        await self.coordinator.wait(HOST)
+        self.assertAlmostEqual(self.slept()[0], BASE_PAUSE * 2 - 0.01)
+
+    async def test_successful_responses_restore_full_speed(self):
+        self.coordinator.on_response(HOST, 429)
+        self.now += 10.0
+        for _ in range(10):
+            self.coordinator.on_response(HOST, 200)
+
+        await self.coordinator.wait(HOST)
+        await self.coordinator.wait(HOST)
+        self.assertEqual(self.slept(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import patch
+
+from kmdr.module.downloader.resolver import URL_TTL, HostSpeeds, UrlResolver
+
+
+class TestUrlResolver(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.speeds = HostSpeeds()
+        patcher = patch("kmdr.module.downloader.resolver.get_host_speeds", return_value=self.speeds)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def supplier(self, *urls: str):
+        calls = []
+        results = iter(urls)
+
+        async def supply() -> str:
+            calls.append(None)
+            return next(results)
+
+        return supply, calls
+
+    async def test_caches_until_invalidated(self):
+        supply, calls = self.supplier("https://a.cdn/x", "https://b.cdn/x")
+        resolver = UrlResolver(supply)
+
+        self.assertEqual(await resolver.get(), "https://a.cdn/x")
+        self.assertEqual(await resolver.get(), "https://a.cdn/x")
+        self.assertEqual(len(calls), 1)
+
+        # 其他调用方已经换过的链接不会再次触发重新获取
+        resolver.invalidate("https://old.cdn/x")
+        self.assertEqual(await resolver.get(), "https://a.cdn/x")
+
+        resolver.invalidate("https://a.cdn/x")
+        self.assertEqual(await resolver.get(), "https://b.cdn/x")
+        self.assertEqual(len(calls), 2)
+
+    async def test_reroute_reuses_faster_alternate(self):
+        self.speeds.record("https://fast.cdn/x", 10_000_000, 1.0)
+        self.speeds.record("https://slow.cdn/x", 1_000_000, 1.0)
+
+        supply, calls = self.supplier("https://fast.cdn/x", "https://slow.cdn/y", "https://slow.cdn/z")
+        resolver = UrlResolver(supply)
+        await resolver.get()
+
+        # 出问题的链接不会马上再次使用
+        resolver.invalidate("https://fast.cdn/x")
+        self.assertEqual(await resolver.get(), "https://slow.cdn/y")
+        self.assertEqual(len(calls), 2)
+
+        # 新的链接仍然很慢时改用之前获取过的更快的链接
+        resolver.invalidate("https://slow.cdn/y")
+        self.assertEqual(await resolver.get(), "https://fast.cdn/x")
+        self.assertEqual(len(calls), 3)
+
+    async def test_reroute_fetches_once_per_invalidation(self):
+        self.speeds.record("https://b.cdn/x", 10_000_000, 1.0)
+        self.speeds.record("https://a.cdn/x", 1_000, 1.0)
+
+        supply, calls = self.supplier("https://a.cdn/x", "https://a.cdn/x", "https://b.cdn/x")
+        resolver = UrlResolver(supply)
+        await resolver.get()
+
+        resolver.invalidate("https://a.cdn/x")
+        self.assertEqual(await resolver.get(), "https://a.cdn/x")
+        self.assertEqual(len(calls), 2)
+
+    async def test_refreshes_unused_url_after_ttl(self):
+        now = [1000.0]
+        supply, calls = self.supplier("https://a.cdn/x", "https://b.cdn/x", "https://c.cdn/x")
+        with patch("kmdr.module.downloader.resolver.time.monotonic", side_effect=lambda: now[0]):
+            resolver = UrlResolver(supply)
+            await resolver.get()
+
+            now[0] += URL_TTL + 1
+            self.assertEqual(await resolver.get(), "https://b.cdn/x")
+
+            # 已经开始传输的链接不会因为过期被替换
+            resolver.mark_used()
+            now[0] += URL_TTL + 1
+            self.assertEqual(await resolver.get(), "https://b.cdn/x")
+            self.assertEqual(len(calls), 2)
+
+    async def test_plain_url_is_never_refreshed(self):
+        resolver = UrlResolver("https://a.cdn/x")
+        resolver.invalidate("https://a.cdn/x")
+        self.assertEqual(await resolver.get(), "https://a.cdn/x")
+
+
+if __name__ == "__main__":
+    unittest.main()